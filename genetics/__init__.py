@@ -0,0 +1,45 @@
+"""Mendelian modes of inheritance, inferred from pedigrees drawn in ASCII art.
+
+The names below are imported from their modules on first use, so importing the
+package is cheap and a process only loads what it needs. NumPy is only imported
+once the NUMPY backend or the sampler is used.
+"""
+from importlib import import_module
+
+# name -> the module it is defined in
+_EXPORTS = {
+    'Pedigree': 'pedigree',
+    'genotypes_n_mode': 'genotype_analysis',
+    'marginal_likelihoods': 'mode_analysis',
+    'mode_likelihoods': 'mode_analysis',
+    'rank_modes': 'mode_analysis',
+    'cohort_analysis': 'cohort',
+    'cohort_mode_likelihoods': 'cohort',
+    'cohort_posteriors': 'cohort',
+    'ResultCache': 'cache',
+    'ALL_MODES': 'core',
+    'AUTOSOMAL_DOMINANT': 'core',
+    'AUTOSOMAL_RECESSIVE': 'core',
+    'X_LINKED_DOMINANT': 'core',
+    'X_LINKED_RECESSIVE': 'core',
+    'Y_LINKED': 'core',
+    'EXACT': 'numeric',
+    'FLOAT': 'numeric',
+    'LOG': 'numeric',
+    'NUMPY': 'numeric',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
+    # Later lookups find it without coming back here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,281 @@
+"""Time the inference engines on synthetic pedigrees of growing size.
+
+    python -m genetics.benchmark --output results.json
+    python -m genetics.benchmark --quick --baseline results.json
+
+Results are JSON, one record per benchmark and curve point. Comparing to a
+baseline lists every benchmark that got slower by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from statistics import median
+
+from .cohort import cohort_mode_likelihoods
+from .core import ALL_MODES, AUTOSOMAL_DOMINANT, FEMALE, MALE
+from .core import genotype_possibilities
+from .core import punnet_square
+from .parser import parse_text
+from .genotype_analysis import genotypes_n_mode, parent_likelihood, SUBTREE_CACHE
+from .incremental import IncrementalPeeler
+from .numeric import EXACT, FLOAT, LOG, NUMPY
+from .peeling import peel_all
+from .synthetic import synthetic_pedigree, synthetic_text
+
+__all__ = ['BENCHMARKS', 'Case', 'compare', 'DEFAULT_SYNTHETIC', 'Regression', 'run_benchmarks', 'Synthetic']
+
+# The parameters of the synthetic pedigrees, see synthetic.synthetic_text
+Synthetic = namedtuple('Synthetic', ['sibship_size', 'marry_in_rate', 'affected_rate', 'mode', 'seed'])
+DEFAULT_SYNTHETIC = Synthetic(sibship_size=3, marry_in_rate=0.5, affected_rate=0.1, mode=AUTOSOMAL_DOMINANT, seed=1)
+
+# A point on a curve. run is timed number times per repeat, after calling reset
+# (if any) so that every repeat starts cold. individuals is the size of the
+# pedigree, None when the benchmark isn't of a pedigree. size is the number of
+# bytes run produces, for the benchmarks of an output.
+Case = namedtuple('Case', ['run', 'reset', 'number', 'individuals', 'size'], defaults=(None,))
+
+# A benchmark whose median time per call grew by more than the threshold
+Regression = namedtuple('Regression', ['benchmark', 'value', 'baseline', 'current'])
+
+
+def _pedigree(generations, synthetic):
+    return synthetic_pedigree(generations, *synthetic)
+
+
+def _parse_text(generations, synthetic):
+    text = synthetic_text(generations, *synthetic)
+    return Case(lambda: parse_text(text), None, 1, len(_pedigree(generations, synthetic).store.sex))
+
+
+def _punnet_square(mode, synthetic):
+    mother, father = genotype_possibilities(mode, FEMALE), genotype_possibilities(mode, MALE)
+    return Case(lambda: punnet_square(mother, father), None, 1000, None)
+
+
+def _parent_likelihood(generations, synthetic):
+    pedigree = _pedigree(generations, synthetic)
+    founder = pedigree.observations[0]
+    mode = synthetic.mode
+    mother, father = genotype_possibilities(mode, FEMALE), genotype_possibilities(mode, MALE)
+    return Case(lambda: parent_likelihood(mode, founder.children, mother, father), SUBTREE_CACHE.clear, 1,
+                len(pedigree.store.sex))
+
+
+def _genotypes_n_mode(generations, synthetic):
+    pedigree = _pedigree(generations, synthetic)
+    leaf = pedigree.observations[-1]
+    return Case(lambda: genotypes_n_mode(synthetic.mode, leaf), SUBTREE_CACHE.clear, 1, len(pedigree.store.sex))
+
+
+def _peel(backend):
+    def case(generations, synthetic):
+        pedigree = _pedigree(generations, synthetic)
+        units = [(synthetic.mode, pedigree.graph)]
+        return Case(lambda: peel_all(units, backend=backend), None, 1, len(pedigree.store.sex))
+    return case
+
+
+def _incremental(generations, synthetic):
+    pedigree = _pedigree(generations, synthetic)
+    peeler = IncrementalPeeler(synthetic.mode, pedigree.graph)
+    peeler.likelihood
+    leaf = len(pedigree.store.sex) - 1
+    phenotypes = [pedigree.graph.phenotypes[leaf], pedigree.graph.phenotypes[leaf].swapcase()]
+
+    def run():
+        # Flip the leaf back and forth, the likelihood may be zero after a flip
+        phenotypes.reverse()
+        peeler.set_phenotype(leaf, phenotypes[0])
+        peeler.likelihood
+    return Case(run, None, 1, len(pedigree.store.sex))
+
+
+def _posteriors_json(unordered, synthetic):
+    """Writing the posteriors of a peeled pedigree as JSON. The pedigree is peeled
+    before timing, so this measures the size of the output rather than the peeling."""
+    pedigree = _pedigree(8, synthetic)
+    pedigree.posteriors(synthetic.mode, FLOAT, unordered=unordered)
+
+    def run():
+        posteriors = pedigree.posteriors(synthetic.mode, FLOAT, unordered=unordered)
+        return json.dumps({'{},{}'.format(*generation): genotypes for generation, genotypes in posteriors.items()})
+    return Case(run, None, 10, len(pedigree.store.sex), len(run()))
+
+
+def _sample(method):
+    def case(generations, synthetic):
+        from .sampler import sample
+        pedigree = _pedigree(generations, synthetic)
+        return Case(lambda: sample(synthetic.mode, pedigree.graph, method, chains=64, samples=20, burn_in=5,
+                                   seed=synthetic.seed), None, 1, len(pedigree.store.sex))
+    return case
+
+
+def _cohort(backend):
+    def case(pedigrees, synthetic):
+        cohort = [_pedigree(6, synthetic._replace(seed=synthetic.seed + seed)) for seed in range(pedigrees)]
+        return Case(lambda: cohort_mode_likelihoods(cohort, backend=backend), None, 1,
+                    sum(len(pedigree.store.sex) for pedigree in cohort))
+    return case
+
+
+# The code a fresh interpreter runs to time each stage of importing and using
+# the pure exact path. NumPy must not be imported along the way.
+_IMPORT_STAGES = {
+    'python': 'pass',
+    'package': 'import genetics',
+    'pedigree': 'import genetics; genetics.Pedigree',
+    'likelihood': "import sys, genetics; genetics.Pedigree('f-m\\n|\\nF').likelihood(genetics.AUTOSOMAL_RECESSIVE); "
+                  "assert 'numpy' not in sys.modules",
+}
+
+
+def _import_exact(stage, synthetic):
+    command = [sys.executable, '-c', _IMPORT_STAGES[stage]]
+    # Import this copy of the package, whether or not it is installed
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (root, os.environ.get('PYTHONPATH')))))
+    return Case(lambda: subprocess.run(command, env=environment, check=True), None, 1, None)
+
+
+_GENERATIONS = (4, 6, 8, 10, 12)
+_QUICK_GENERATIONS = (3, 4)
+
+# name -> (parameter of the curve, values, quick values, case of a value and a Synthetic)
+BENCHMARKS = {
+    'parse_text': ('generations', (4, 8, 12, 16, 20), _QUICK_GENERATIONS, _parse_text),
+    'punnet_square': ('mode', ALL_MODES, ALL_MODES[:1], _punnet_square),
+    'parent_likelihood': ('generations', _GENERATIONS, _QUICK_GENERATIONS, _parent_likelihood),
+    'genotypes_n_mode': ('generations', _GENERATIONS, _QUICK_GENERATIONS, _genotypes_n_mode),
+    'peel_exact': ('generations', _GENERATIONS, _QUICK_GENERATIONS, _peel(EXACT)),
+    'peel_float': ('generations', _GENERATIONS, _QUICK_GENERATIONS, _peel(FLOAT)),
+    'peel_log': ('generations', _GENERATIONS, _QUICK_GENERATIONS, _peel(LOG)),
+    'incremental': ('generations', _GENERATIONS, _QUICK_GENERATIONS, _incremental),
+    'cohort_exact': ('pedigrees', (1, 4, 16, 64), (1, 2), _cohort(EXACT)),
+    'posteriors_json': ('unordered', (False, True), (False, True), _posteriors_json),
+    'import_exact': ('stage', tuple(_IMPORT_STAGES), ('python', 'likelihood'), _import_exact),
+}
+if find_spec('numpy') is not None:
+    from .sampler import FORWARD, GIBBS
+    BENCHMARKS.update({
+        'peel_numpy': ('generations', _GENERATIONS, _QUICK_GENERATIONS, _peel(NUMPY)),
+        'cohort_numpy': ('pedigrees', (1, 4, 16, 64), (1, 2), _cohort(NUMPY)),
+        'sample_forward': ('generations', _GENERATIONS, _QUICK_GENERATIONS, _sample(FORWARD)),
+        'sample_gibbs': ('generations', _GENERATIONS, _QUICK_GENERATIONS, _sample(GIBBS)),
+    })
+
+
+def _time(case, repeat):
+    """The seconds per call of each repeat"""
+    times = []
+    for _ in range(repeat):
+        if case.reset is not None:
+            case.reset()
+        start = time.perf_counter()
+        for _ in range(case.number):
+            case.run()
+        times.append((time.perf_counter() - start) / case.number)
+    return times
+
+
+def run_benchmarks(names=None, quick=False, repeat=5, synthetic=DEFAULT_SYNTHETIC):
+    """Run benchmarks over their curves
+
+    Args:
+        names: The benchmarks to run, defaults to all of BENCHMARKS
+        quick: Only run the small end of each curve
+        repeat: The number of times each point is timed
+        synthetic: The parameters of the synthetic pedigrees
+
+    Returns: dict that can be written as JSON
+    """
+    results = []
+    for name in names or BENCHMARKS:
+        parameter, values, quick_values, case = BENCHMARKS[name]
+        for value in quick_values if quick else values:
+            point = case(value, synthetic)
+            times = _time(point, repeat)
+            results.append({'benchmark': name, 'parameter': parameter, 'value': value,
+                            'individuals': point.individuals, 'size': point.size, 'best': min(times),
+                            'median': median(times), 'times': times})
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'synthetic': synthetic._asdict(),
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=1.25):
+    """Find the benchmarks of current that are slower than in baseline
+
+    Args:
+        baseline: The results of an earlier run_benchmarks
+        current: The results of run_benchmarks
+        threshold: The ratio of median times that counts as a regression
+
+    Returns: list of Regression
+    """
+    before = {(result['benchmark'], result['value']): result['median'] for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        key = (result['benchmark'], result['value'])
+        if key in before and result['median'] > threshold * before[key]:
+            regressions.append(Regression(result['benchmark'], result['value'], before[key], result['median']))
+    return regressions
+
+
+def _arguments(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('names', nargs='*', metavar='benchmark',
+                        help=f'the benchmarks to run, defaults to all of: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--quick', action='store_true', help='only run the small end of each curve')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write the results to a file rather than standard output')
+    parser.add_argument('--baseline', help='results of an earlier run to check for regressions')
+    parser.add_argument('--threshold', type=float, default=1.25)
+    parser.add_argument('--sibship-size', type=int, default=DEFAULT_SYNTHETIC.sibship_size)
+    parser.add_argument('--marry-in-rate', type=float, default=DEFAULT_SYNTHETIC.marry_in_rate)
+    parser.add_argument('--affected-rate', type=float, default=DEFAULT_SYNTHETIC.affected_rate)
+    parser.add_argument('--mode', choices=ALL_MODES, default=DEFAULT_SYNTHETIC.mode)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SYNTHETIC.seed)
+    arguments = parser.parse_args(argv)
+    unknown = [name for name in arguments.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f'unknown benchmarks: {", ".join(unknown)}')
+    return arguments
+
+
+def main(argv=None):
+    arguments = _arguments(argv)
+    synthetic = Synthetic(arguments.sibship_size, arguments.marry_in_rate, arguments.affected_rate,
+                          arguments.mode, arguments.seed)
+    results = run_benchmarks(arguments.names, arguments.quick, arguments.repeat, synthetic)
+    if arguments.output:
+        with open(arguments.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if arguments.baseline:
+        with open(arguments.baseline) as f:
+            regressions = compare(json.load(f), results, arguments.threshold)
+        for regression in regressions:
+            print(f'{regression.benchmark} ({regression.value}): {regression.baseline:.6f}s -> '
+                  f'{regression.current:.6f}s', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
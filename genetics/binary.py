@@ -0,0 +1,193 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from .exceptions import ParserException
+from .store import PedigreeStore
+
+__all__ = ['Archive', 'load_store', 'MAGIC', 'read_stores', 'save_stores', 'VERSION']
+
+MAGIC = b'PEDB'
+VERSION = 1
+
+# Little endian throughout. The archive header is the magic number, the format
+# version and the number of pedigrees.
+_HEADER = struct.Struct('<4sHxxQ')
+
+# Each pedigree starts with the number of individuals, followed by a fixed width
+# record array for each column of the store: a byte each for sex and affected
+# then a 4 byte int each for mother, father, partner, row and column. Every array
+# starts on a multiple of its width so it can be viewed in place.
+_COUNT = struct.Struct('<Q')
+_BYTE_COLUMNS = ('sex', 'affected')
+_INT_COLUMNS = ('mother', 'father', 'partner', 'row', 'column')
+_INT = 4
+
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def _pad(offset, width):
+    return -offset % width
+
+
+def _block_size(n):
+    size = _COUNT.size + len(_BYTE_COLUMNS) * n
+    size += _pad(size, _INT) + len(_INT_COLUMNS) * _INT * n
+    return size + _pad(size, _COUNT.size)
+
+
+def _encode(store):
+    """The bytes of a single pedigree"""
+    n = len(store.sex)
+    chunks = [_COUNT.pack(n)]
+    for name in _BYTE_COLUMNS:
+        chunks.append(array('b', getattr(store, name)).tobytes())
+    chunks.append(bytes(_pad(_COUNT.size + len(_BYTE_COLUMNS) * n, _INT)))
+    for name in _INT_COLUMNS:
+        column = array('i', getattr(store, name))
+        if not _LITTLE_ENDIAN:
+            column.byteswap()
+        chunks.append(column.tobytes())
+    chunks.append(bytes(_pad(sum(map(len, chunks)), _COUNT.size)))
+    return b''.join(chunks)
+
+
+def _block_end(buffer, offset):
+    """The number of individuals of the pedigree at offset and the offset of the
+    next pedigree, checked against the length of the buffer"""
+    if offset + _COUNT.size > len(buffer):
+        raise ParserException(f'Truncated pedigree archive, the pedigree at byte {offset} has no header')
+    n, = _COUNT.unpack_from(buffer, offset)
+    end = offset + _block_size(n)
+    if end > len(buffer):
+        raise ParserException(f'Truncated pedigree archive, the pedigree at byte {offset} ends at byte {end} '
+                              f'of {len(buffer)}')
+    return n, end
+
+
+def _decode(buffer, offset):
+    """The store of the pedigree at offset, the columns are views of the buffer
+
+    Returns: tuple of the PedigreeStore and the offset of the next pedigree"""
+    n, end = _block_end(buffer, offset)
+    view = memoryview(buffer)
+    columns = {}
+    position = offset + _COUNT.size
+    for name in _BYTE_COLUMNS:
+        columns[name] = view[position:position + n].cast('b')
+        position += n
+    position += _pad(position - offset, _INT)
+    for name in _INT_COLUMNS:
+        column = view[position:position + _INT * n].cast('i')
+        if not _LITTLE_ENDIAN:
+            # A swapped copy, viewed so every column has the same interface
+            swapped = array('i', column)
+            swapped.byteswap()
+            column = memoryview(swapped)
+        columns[name] = column
+        position += _INT * n
+    return PedigreeStore(**columns), end
+
+
+def _check_header(buffer):
+    if len(buffer) < _HEADER.size:
+        raise ParserException('Not a pedigree archive, the file is too short')
+    magic, version, count = _HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ParserException('Not a pedigree archive, the magic number is wrong')
+    if version != VERSION:
+        raise ParserException(f'Unsupported pedigree archive version {version}')
+    return count
+
+
+def save_stores(file, stores):
+    """Write an archive of pedigrees, one at a time
+
+    Args:
+        file: A file name
+        stores: An iterable of PedigreeStores
+    """
+    with open(file, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, 0))
+        count = 0
+        for count, store in enumerate(stores, 1):
+            f.write(_encode(store))
+        # The number of pedigrees isn't known until they have all been written
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, VERSION, count))
+
+
+def read_stores(buffer):
+    """Decode every pedigree of an archive held in a buffer, without copying
+
+    Args:
+        buffer: bytes, bytearray or mmap of an archive
+
+    Returns: list of PedigreeStore
+    """
+    count = _check_header(buffer)
+    offset = _HEADER.size
+    stores = []
+    for _ in range(count):
+        store, offset = _decode(buffer, offset)
+        stores.append(store)
+    return stores
+
+
+def load_store(file, index=0):
+    """Read a single pedigree of an archive into memory
+
+    Args:
+        file: A file name
+        index: The position of the pedigree in the archive
+
+    Returns: PedigreeStore
+    """
+    with Archive(file) as archive:
+        return PedigreeStore(*(array(column.format, column) for column in archive.store(index)))
+
+
+class Archive(object):
+    """A memory mapped archive of pedigrees.
+
+    Only the header of each pedigree is read when the archive is opened, the
+    columns of each PedigreeStore are views of the mapped file. Pedigree.from_store
+    keeps those views, so the archive can't be closed (BufferError) while any store
+    or Pedigree built from one is still referenced.
+    """
+
+    def __init__(self, file):
+        self._file = open(file, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._offsets = []
+        try:
+            count = _check_header(self._mmap)
+            offset = _HEADER.size
+            for _ in range(count):
+                self._offsets.append(offset)
+                offset = _block_end(self._mmap, offset)[1]
+        except ParserException:
+            self.close()
+            raise
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def store(self, index):
+        """The PedigreeStore at index"""
+        return _decode(self._mmap, self._offsets[index])[0]
+
+    def stores(self):
+        """Every PedigreeStore in order"""
+        return (self.store(index) for index in range(len(self)))
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,165 @@
+import pickle
+import sqlite3
+from collections import namedtuple
+
+from .fingerprint import fingerprint
+from .numeric import EXACT
+from .peeling import peel_all, Peeled
+
+__all__ = ['CacheStats', 'DEFAULT_MAX_SIZE', 'ResultCache']
+
+# Bytes of pickled results kept on disk before the least recently used are evicted
+DEFAULT_MAX_SIZE = 256 * 2 ** 20
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'entries', 'size'])
+
+# Stored for a pedigree that isn't valid for the mode
+_INVALID = None
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL
+)'''
+
+
+def _to_canonical(peeled, order):
+    return [peeled.genotypes[individual] for individual in order], peeled.likelihood
+
+
+def _from_canonical(value, order):
+    if value is _INVALID:
+        return None
+    genotypes, likelihood = value
+    result = [None] * len(genotypes)
+    for individual, distribution in zip(order, genotypes):
+        result[individual] = distribution
+    return Peeled(result, likelihood)
+
+
+class ResultCache(object):
+    """A persistent cache of peeling results in a SQLite database, keyed by the
+    fingerprint of each (mode, FamilyGraph) and the numeric backend.
+
+    Isomorphic pedigrees share an entry, the genotype probabilities of each
+    individual are stored in canonical order. Once the stored results are larger
+    than max_size bytes the least recently used are evicted. Pass a cache to
+    Pedigree.posteriors, mode_analysis or cohort to skip inference on a hit.
+    """
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        """
+        Args:
+            path: The database file, ':memory:' keeps the cache for this process only
+            max_size: The bytes of results to keep
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(_SCHEMA)
+        self._connection.commit()
+
+    @property
+    def stats(self):
+        entries, size = self._connection.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        return CacheStats(self.hits, self.misses, entries, size)
+
+    def _get(self, key):
+        row = self._connection.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def _touch(self, keys):
+        """Mark entries as just used and commit at once, so a lookup doesn't hold the
+        write lock of a database shared with other processes while the misses are peeled.
+        The clock is the database's own, so the order is shared by every process."""
+        if keys:
+            self._connection.executemany('UPDATE results SET used = (SELECT MAX(used) + 1 FROM results) '
+                                         'WHERE key = ?', [(key,) for key in keys])
+        self._connection.commit()
+
+    def _put(self, key, value):
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self._connection.execute('INSERT OR REPLACE INTO results '
+                                 'VALUES (?, ?, ?, (SELECT COALESCE(MAX(used), 0) + 1 FROM results))',
+                                 (key, blob, len(blob)))
+
+    def _evict(self):
+        size, = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()
+        rows = self._connection.execute('SELECT key, size FROM results ORDER BY used')
+        evicted = []
+        for key, entry_size in rows:
+            if size <= self.max_size:
+                break
+            evicted.append((key,))
+            size -= entry_size
+        self._connection.executemany('DELETE FROM results WHERE key = ?', evicted)
+
+    def lookup(self, units, backend):
+        """Look every unit up
+
+        Returns: tuple of the fingerprint of each unit, the results with None for
+        each miss, and dict of the key of each missing structure -> positions of
+        the units with it
+        """
+        fingerprints = [fingerprint(mode, graph) for mode, graph in units]
+        keys = [f'{backend}:{structure.digest}' for structure in fingerprints]
+
+        result = [None] * len(units)
+        missing = {}
+        hits = []
+        for position, key in enumerate(keys):
+            hit, value = self._get(key)
+            if hit:
+                self.hits += 1
+                hits.append(key)
+                result[position] = _from_canonical(value, fingerprints[position].order)
+            else:
+                self.misses += 1
+                # Repeats of a structure in this call are only peeled once
+                missing.setdefault(key, []).append(position)
+        self._touch(hits)
+        return fingerprints, result, missing
+
+    def store(self, fingerprints, result, missing, peeled):
+        """Store the peeled units of each missing structure and fill in the results"""
+        for (key, positions), unit in zip(missing.items(), peeled):
+            value = _INVALID if unit is None else _to_canonical(unit, fingerprints[positions[0]].order)
+            self._put(key, value)
+            for position in positions:
+                result[position] = _from_canonical(value, fingerprints[position].order)
+        self._evict()
+        self._connection.commit()
+        return result
+
+    def peel_all(self, units, workers=1, backend=EXACT):
+        """peeling.peel_all, only peeling the units that aren't cached
+
+        Args:
+            units: A list of (mode, FamilyGraph)
+            workers: The number of processes to spread the misses over, None uses every CPU
+            backend: The numeric backend
+
+        Returns: list of Peeled, None where the unit is not valid for its mode
+        """
+        units = list(units)
+        fingerprints, result, missing = self.lookup(units, backend)
+        peeled = peel_all([units[positions[0]] for positions in missing.values()], workers, backend)
+        return self.store(fingerprints, result, missing, peeled)
+
+    def clear(self):
+        self._connection.execute('DELETE FROM results')
+        self._connection.commit()
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,208 @@
+"""Score pedigrees from the command line.
+
+    python -m genetics score pedigrees/*.txt cohort.ped --posteriors --workers 4
+    python -m genetics serve --port 8080
+
+Each pedigree is written as a line of JSON as soon as it is scored.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from array import array
+from collections import namedtuple
+from functools import partial
+
+from .binary import Archive
+from .core import ALL_MODES
+from .exceptions import MendelianInferenceException, NonMendelianPattern, ParserException
+from .mode_analysis import peel_modes, rank_modes
+from .numeric import BACKENDS, EXACT, json_number, LOG
+from .ped import read_ped_stores
+from .pedigree import Pedigree
+from .reader import read_blocks, STDIN
+from .store import PedigreeStore
+
+__all__ = ['FORMATS', 'Job', 'main', 'Options', 'read_jobs', 'score']
+
+TEXT = 'text'
+PED = 'ped'
+PEDB = 'pedb'
+FORMATS = (TEXT, PED, PEDB)
+
+# A pedigree to score. Exactly one of text, store and error is set. location holds
+# the fields that find the pedigree in its source (lines of a text file or a PED
+# family), names the output key of each individual by ID, None keys them by
+# generation index. error describes a pedigree that couldn't be read, Eg. a PED
+# family with an unknown parent, which is written as an error row.
+Job = namedtuple('Job', ['source', 'index', 'location', 'text', 'store', 'names', 'error'], defaults=(None,))
+
+# What to work out for each pedigree
+Options = namedtuple('Options', ['ranking', 'posteriors', 'modes', 'backend'])
+
+
+def _format(file, selected):
+    if selected is not None:
+        return selected
+    extension = os.path.splitext(file)[1].lower()
+    return {'.ped': PED, '.pedb': PEDB}.get(extension, TEXT)
+
+
+def _copy(store):
+    """Copy the columns of a memory mapped store so it can be sent to a worker"""
+    return PedigreeStore(*(array(column.format, column) for column in store))
+
+
+def read_jobs(files, selected_format=None):
+    """Read the pedigrees of each file as jobs, one at a time
+
+    Args:
+        files: File names, glob patterns or reader.STDIN
+        selected_format: One of FORMATS, by default chosen by file extension with
+            text for standard input
+
+    Returns: generator of Job. A PED family that can't be read is a Job with an
+    error, a file that can't be read at all raises
+    """
+    for pattern in files:
+        matches = [pattern] if pattern == STDIN or os.path.exists(pattern) else sorted(glob.glob(pattern))
+        if not matches:
+            raise FileNotFoundError(f'No files match {pattern}')
+        for file in matches:
+            file_format = _format(file, selected_format)
+            if file_format == PED:
+                for index, (family, store, individuals) in enumerate(read_ped_stores(file, errors=True)):
+                    if isinstance(store, ParserException):
+                        yield Job(file, index, {'family': family}, None, None, None, _describe(store))
+                    else:
+                        yield Job(file, index, {'family': family}, None, store, individuals)
+            elif file_format == PEDB:
+                with Archive(file) as archive:
+                    for index in range(len(archive)):
+                        yield Job(file, index, {}, None, _copy(archive.store(index)), None)
+            else:
+                for index, block in enumerate(read_blocks(file)):
+                    yield Job(file, index, {'first_line': block.first_line, 'last_line': block.last_line},
+                              block.text, None, None)
+
+
+def _describe(error):
+    return f'{type(error).__name__}: {error}'
+
+
+def score(job, options):
+    """Score a pedigree
+
+    Args:
+        job: Job
+        options: Options
+
+    Returns: dict, the row of JSON output
+    """
+    start = time.perf_counter()
+    row = {'source': job.source, 'index': job.index, **job.location}
+    if job.error is not None:
+        row['error'] = job.error
+        row['seconds'] = time.perf_counter() - start
+        return row
+    try:
+        if job.text is not None:
+            pedigree = Pedigree(job.text, options.backend)
+        else:
+            pedigree = Pedigree.from_store(job.store, options.backend)
+        names = job.names or ['{},{}'.format(*generation) for generation in pedigree.generations]
+        row['individuals'] = len(names)
+
+        if options.ranking:
+            likelihoods, possible = peel_modes(pedigree, 1, options.backend, None)
+            row['likelihoods'] = {mode: json_number(likelihood) for mode, likelihood in likelihoods.items()}
+            row['modes'] = {mode: json_number(probability)
+                            for mode, probability in rank_modes(likelihoods, options.backend, possible).items()}
+
+        if options.posteriors:
+            row['posteriors'] = {}
+            for mode in options.modes:
+                try:
+                    posteriors = pedigree.posteriors(mode)
+                except NonMendelianPattern:
+                    row['posteriors'][mode] = None
+                    continue
+                row['posteriors'][mode] = {
+                    name: {genotype: json_number(probability)
+                           for genotype, probability in posteriors[generation].items()}
+                    for name, generation in zip(names, pedigree.generations)}
+    except Exception as error:
+        row['error'] = _describe(error)
+    row['seconds'] = time.perf_counter() - start
+    return row
+
+
+def _score_all(jobs, options, workers):
+    """Score each job, yielding the rows as they finish. With more than one worker
+    only a few jobs per worker are read ahead, so a large input is never held in
+    memory."""
+    function = partial(score, options=options)
+    if workers == 1:
+        yield from map(function, jobs)
+        return
+    from concurrent.futures import as_completed, FIRST_COMPLETED, ProcessPoolExecutor, wait
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for job in jobs:
+            pending.add(executor.submit(function, job))
+            if len(pending) >= 4 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from (future.result() for future in done)
+        yield from (future.result() for future in as_completed(pending))
+
+
+def _arguments(argv):
+    parser = argparse.ArgumentParser(prog='python -m genetics', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    scorer = commands.add_parser('score', help='rank the modes of inheritance and work out genotype probabilities')
+    scorer.add_argument('files', nargs='*', default=[STDIN],
+                        help='pedigree files or glob patterns, - (the default) reads standard input')
+    scorer.add_argument('--format', choices=FORMATS,
+                        help='the format of every file, by default .ped and .pedb files are read as such '
+                             'and anything else as text drawings')
+    scorer.add_argument('--posteriors', action='store_true', help='write the genotype probabilities of each '
+                                                                  'individual')
+    scorer.add_argument('--mode', action='append', choices=ALL_MODES, dest='modes',
+                        help='only write posteriors for this mode, can be repeated')
+    scorer.add_argument('--no-ranking', dest='ranking', action='store_false', help="don't rank the modes")
+    scorer.add_argument('--backend', choices=list(BACKENDS), default=LOG,
+                        help='the numeric backend, likelihoods are natural logarithms for LOG and NUMPY '
+                             f'and fractions for {EXACT} (default: {LOG})')
+    scorer.add_argument('--workers', type=int, default=1, help='processes to score with, 0 uses every CPU')
+    # Parsed by service.main, see main
+    commands.add_parser('serve', add_help=False, help='score pedigrees sent over HTTP, see serve --help')
+    return parser.parse_args(argv)
+
+
+def main(argv=None, output=None):
+    """Run the command line
+
+    Returns: The exit status, 1 when any pedigree couldn't be read or scored and
+    2 when a file couldn't be read at all
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['serve']:
+        from . import service
+        return service.main(argv[1:])
+    arguments = _arguments(argv)
+    output = output or sys.stdout
+    options = Options(arguments.ranking, arguments.posteriors, tuple(arguments.modes or ALL_MODES),
+                      arguments.backend)
+    status = 0
+    try:
+        for row in _score_all(read_jobs(arguments.files, arguments.format), options, arguments.workers or None):
+            status = status or int('error' in row)
+            output.write(json.dumps(row) + '\n')
+            output.flush()
+    except (OSError, ValueError, MendelianInferenceException) as error:
+        print(f'error: {error}', file=sys.stderr)
+        return 2
+    return status
@@ -0,0 +1,97 @@
+from collections import namedtuple
+
+from .core import ALL_MODES
+from .mode_analysis import rank_modes
+from .numeric import BACKENDS, EXACT, NUMPY
+from .peeling import peel_all
+
+__all__ = ['cohort_analysis', 'cohort_mode_likelihoods', 'cohort_posteriors', 'CohortResult']
+
+CohortResult = namedtuple('CohortResult', ['mode_likelihoods', 'posteriors'])
+
+
+def _graphs(pedigrees):
+    """Flatten each pedigree, keeping the generation index of each observation"""
+    return [(pedigree.generations, pedigree.graph) for pedigree in pedigrees]
+
+
+def cohort_posteriors(pedigrees, mode, workers=1, backend=EXACT, cache=None):
+    """Calculate the genotype probabilities of every observation of many pedigrees
+
+    Args:
+        pedigrees: An iterable of Pedigrees
+        mode: The mode of inheritance
+        workers: The number of processes, 1 runs in this process and None uses every CPU
+        backend: The numeric backend
+        cache: An optional cache.ResultCache, only the units that miss are peeled
+
+    Returns: list of dicts of generation index -> dict of genotype probabilities, None
+    where the pedigree is not valid for the mode
+    """
+    graphs = _graphs(pedigrees)
+    peeled = peel_all(((mode, graph) for _, graph in graphs), workers=workers, backend=backend, cache=cache)
+    return [None if result is None else dict(zip(generations, result.genotypes))
+            for (generations, _), result in zip(graphs, peeled)]
+
+
+def cohort_mode_likelihoods(pedigrees, workers=1, backend=EXACT, cache=None):
+    """Rank the modes of inheritance for many pedigrees.
+
+    Every (pedigree, mode) pair is an independent unit of work.
+
+    Args:
+        pedigrees: An iterable of Pedigrees
+        workers: The number of processes, 1 runs in this process and None uses every CPU
+        backend: The numeric backend
+        cache: An optional cache.ResultCache, only the units that miss are peeled
+
+    Returns: list of dicts of mode -> probability, None where the pedigree is not
+    valid for any mode. Raises LikelihoodUnderflow if every valid FLOAT likelihood
+    of a pedigree underflows
+    """
+    graphs = [graph for _, graph in _graphs(pedigrees)]
+    peeled = iter(peel_all(((mode, graph) for graph in graphs for mode in ALL_MODES),
+                           workers=workers, backend=backend, cache=cache))
+    zero = BACKENDS[backend].zero
+    result = []
+    for _ in graphs:
+        units = dict(zip(ALL_MODES, peeled))
+        likelihoods = {mode: zero if unit is None else unit.likelihood for mode, unit in units.items()}
+        possible = {mode for mode, unit in units.items() if unit is not None}
+        result.append(rank_modes(likelihoods, backend, possible) if possible else None)
+    return result
+
+
+def cohort_analysis(pedigrees, workers=1, backend=NUMPY, cache=None):
+    """Rank the modes of inheritance and calculate the genotype probabilities under
+    every mode for many pedigrees at once.
+
+    With the NUMPY backend the pedigrees that share a structure are stacked and
+    each mode is peeled once per structure, so many small family files cost little
+    more than their distinct structures.
+
+    Args:
+        pedigrees: An iterable of Pedigrees
+        workers: The number of processes, 1 runs in this process and None uses every CPU
+        backend: The numeric backend
+        cache: An optional cache.ResultCache, only the units that miss are peeled
+
+    Returns: list of CohortResult. mode_likelihoods is a dict of mode -> probability,
+    None where the pedigree is not valid for any mode. posteriors is a dict of
+    mode -> dict of generation index -> dict of genotype probabilities, None where
+    the pedigree is not valid for the mode
+    """
+    graphs = _graphs(pedigrees)
+    peeled = iter(peel_all(((mode, graph) for _, graph in graphs for mode in ALL_MODES),
+                           workers=workers, backend=backend, cache=cache))
+    zero = BACKENDS[backend].zero
+    result = []
+    for generations, _ in graphs:
+        units = dict(zip(ALL_MODES, peeled))
+        likelihoods = {mode: zero if unit is None else unit.likelihood for mode, unit in units.items()}
+        possible = {mode for mode, unit in units.items() if unit is not None}
+        result.append(CohortResult(
+            rank_modes(likelihoods, backend, possible) if possible else None,
+            {mode: None if unit is None else dict(zip(generations, unit.genotypes)) for mode, unit in units.items()}
+        ))
+    return result
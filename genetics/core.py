@@ -2,12 +2,13 @@ from collections import Counter, defaultdict
 from fractions import Fraction
 from itertools import product, chain
 
-from exceptions import NonMendelianPattern
+from .exceptions import NonMendelianPattern
 
-__all__ = ['affected_genotype','ALL_MODES', 'AUTOSOMAL_CHROMOSOMES', 'AUTOSOMAL_DOMINANT', 'AUTOSOMAL_MODES', 'AUTOSOMAL_RECESSIVE',
-           'constrain_probabilities', 'count', 'FEMALE', 'FEMALE_SEX_LINKED_CHROMOSOMES', 'FEMALES',
-           'genotype_possibilities', 'MALE', 'MALE_SEX_LINKED_CHROMOSOMES', 'MALES', 'normalize_probabilities',
-           'phenotypes', 'punnet_occurrences', 'punnet_square', 'SEX_LINKED_MODES', 'VALID_INSTRUCTIONS',
+__all__ = ['AFFECTED_TABLES', 'affected_genotype','ALL_MODES', 'AUTOSOMAL_CHROMOSOMES', 'AUTOSOMAL_DOMINANT', 'AUTOSOMAL_MODES', 'AUTOSOMAL_RECESSIVE',
+           'collapse_phase', 'constrain_probabilities', 'count', 'FEMALE', 'FEMALE_SEX_LINKED_CHROMOSOMES', 'FEMALES', 'FOUNDER_PRIORS',
+           'GENOTYPE_CODES', 'GENOTYPE_INDEX', 'genotype_possibilities', 'GENOTYPES', 'MALE', 'MALE_SEX_LINKED_CHROMOSOMES', 'MALES',
+           'normalize_probabilities', 'observable_genotypes', 'PHENOTYPE_TABLES', 'phenotypes', 'punnet_occurrences', 'punnet_square',
+           'SEX_LINKED_MODES', 'TRANSITION_TABLE', 'UNORDERED_CODES', 'UNORDERED_INDEX', 'VALID_INSTRUCTIONS',
            'VALID_OBSERVATIONS', 'X_LINKED_DOMINANT', 'X_LINKED_RECESSIVE', 'Y_LINKED']
 
 FEMALES = {'f', 'F'}
@@ -40,13 +41,23 @@ def count(sequence):
     return {key: Fraction(count, denominator) for key, count in Counter(sequence).items()}
 
 
-def _punnet_square(mother_genotypes, father_genotypes):
-    """Combine two possible parent genotypes.
+def _cross(mother_genotype, father_genotype):
+    """Combine two parent genotypes from scratch.
     Equivalent to a punnet square
     """
     return count(list(chain.from_iterable(list(''.join(genotype) for genotype in product(mother, father))
                                           for mother, father in
-                                          list(product(mother_genotypes, father_genotypes)))))
+                                          list(product(mother_genotype, father_genotype)))))
+
+
+def _punnet_square(mother_genotype, father_genotype):
+    """Combine two parent genotypes.
+    Equivalent to a punnet square. The result is shared, do not mutate it.
+    """
+    try:
+        return TRANSITION_TABLE[mother_genotype, father_genotype]
+    except KeyError:
+        return _cross(mother_genotype, father_genotype)
 
 
 def _probabilistic_punnet_square(mother_genotypes, father_genotypes):
@@ -62,6 +73,8 @@ def _probabilistic_punnet_square(mother_genotypes, father_genotypes):
 
 
 def punnet_square(mother_genotypes, father_genotypes):
+    if isinstance(mother_genotypes, str) and isinstance(father_genotypes, str):
+        return dict(_punnet_square(mother_genotypes, father_genotypes))
     if isinstance(mother_genotypes, str):
         mother_genotypes = [mother_genotypes]
     if isinstance(father_genotypes, str):
@@ -76,8 +89,9 @@ def punnet_square(mother_genotypes, father_genotypes):
 
 
 
-def affected_genotype(mode, genotype):
-    """Determine if the genotype will have an affected phenotype
+def _affected_genotype(mode, genotype):
+    """Determine if the genotype will have an affected phenotype, by the rules of
+    the mode. See affected_genotype
     Args:
         genotype: Eg. 'Aa' / 'Xy'
         mode: mode of inheritance
@@ -105,8 +119,10 @@ def affected_genotype(mode, genotype):
         return True
     return False
 
-def phenotypes(genotype, mode):
-    """Return the possible phenotypes for a given genotype and mode of inheritance
+
+def _phenotypes(genotype, mode):
+    """Return the possible phenotypes for a given genotype and mode of inheritance,
+    by the rules of the mode. See phenotypes
     """
     if mode == AUTOSOMAL_DOMINANT:
         if 'A' in genotype:
@@ -148,6 +164,90 @@ def phenotypes(genotype, mode):
             return 'f'
 
 
+
+# Every genotype of every mode, a genotype's code is its position
+GENOTYPES = tuple(sorted(AUTOSOMAL_CHROMOSOMES | FEMALE_SEX_LINKED_CHROMOSOMES | MALE_SEX_LINKED_CHROMOSOMES))
+GENOTYPE_CODES = {genotype: code for code, genotype in enumerate(GENOTYPES)}
+
+# (mother, father) genotype -> child genotype probabilities, for every pair of
+# GENOTYPES whatever the mode. Any other pair (Eg. a genotype string from outside
+# the table) is crossed on each call rather than remembered, so the table can't
+# grow with the input.
+TRANSITION_TABLE = {(mother, father): _cross(mother, father) for mother, father in product(GENOTYPES, repeat=2)}
+
+# mode -> the possible phenotypes of each genotype code
+PHENOTYPE_TABLES = {mode: tuple(_phenotypes(genotype, mode) for genotype in GENOTYPES) for mode in ALL_MODES}
+
+# mode -> whether each genotype code is affected
+AFFECTED_TABLES = {mode: tuple(_affected_genotype(mode, genotype) for genotype in GENOTYPES) for mode in ALL_MODES}
+
+# (mode, observation symbol) -> the genotypes that can be observed as it
+_OBSERVABLE = {(mode, observed): frozenset(genotype for genotype, possible in zip(GENOTYPES, PHENOTYPE_TABLES[mode])
+                                           if observed in possible)
+               for mode in ALL_MODES for observed in 'fFmM'}
+
+# The code of each genotype with its alleles in a fixed order, so that the
+# heterozygotes aA and Aa (or xX and Xx) share a code. A male's X and Y alleles
+# are told apart, so his genotypes keep their own codes.
+UNORDERED_CODES = tuple(GENOTYPE_CODES[''.join(sorted(genotype)) if genotype.lower() not in MALE_SEX_LINKED_CHROMOSOMES
+                                       else genotype] for genotype in GENOTYPES)
+
+
+def affected_genotype(mode, genotype):
+    """Determine if the genotype will have an affected phenotype
+    Args:
+        genotype: Eg. 'Aa' / 'Xy'
+        mode: mode of inheritance
+    Returns: bool
+    """
+    try:
+        return AFFECTED_TABLES[mode][GENOTYPE_CODES[genotype]]
+    except KeyError:
+        return _affected_genotype(mode, genotype)
+
+
+def phenotypes(genotype, mode):
+    """Return the possible phenotypes for a given genotype and mode of inheritance
+    """
+    try:
+        return PHENOTYPE_TABLES[mode][GENOTYPE_CODES[genotype]]
+    except KeyError:
+        return _phenotypes(genotype, mode)
+
+
+def observable_genotypes(mode, observed):
+    """The genotypes that can produce an observation given a mode of inheritance
+
+    Args:
+        mode: The mode of inheritance
+        observed: The symbol of the observation, Eg. 'F', or None if unobserved
+
+    Returns: frozenset of genotypes
+    """
+    if observed is None:
+        return frozenset(GENOTYPES)
+    try:
+        return _OBSERVABLE[mode, observed]
+    except KeyError:
+        return frozenset(genotype for genotype in GENOTYPES if observed in _phenotypes(genotype, mode))
+
+
+def collapse_phase(genotype_probabilities):
+    """Merge the probabilities of genotypes that only differ in the order of their
+    alleles, Eg. aA into Aa
+
+    Args:
+        genotype_probabilities: dict of genotype probabilities
+
+    Returns: dict of probabilities of unordered genotypes
+    """
+    result = {}
+    for genotype, probability in genotype_probabilities.items():
+        unordered = GENOTYPES[UNORDERED_CODES[GENOTYPE_CODES[genotype]]]
+        result[unordered] = result[unordered] + probability if unordered in result else probability
+    return result
+
+
 def genotype_possibilities(mode, gender, affected=None, observation=None):
     """Return valid genotypes for a given observation and mode
 
@@ -184,6 +284,22 @@ def genotype_possibilities(mode, gender, affected=None, observation=None):
     return {chromosome: prior for chromosome in chromosomes}
 
 
+# A fixed position for every genotype of each mode and gender
+GENOTYPE_INDEX = {(mode, gender): tuple(sorted(genotype_possibilities(mode, gender)))
+                  for mode in ALL_MODES for gender in (FEMALE, MALE)}
+
+# GENOTYPE_INDEX with the phase of each heterozygote dropped (see UNORDERED_CODES),
+# Eg. AA, Aa, aa for an autosomal mode, so a pair of parents has 9 states not 16
+UNORDERED_INDEX = {key: tuple(sorted(set(collapse_phase(dict.fromkeys(genotypes, 0)))))
+                   for key, genotypes in GENOTYPE_INDEX.items()}
+
+# The prior of a founder's genotype, uniform over ordered allele pairs. An unordered
+# heterozygote stands for two of them, Eg. 1/4 AA, 1/2 Aa and 1/4 aa.
+FOUNDER_PRIORS = {(mode, gender, unordered): collapse_phase(dict.fromkeys(genotypes, Fraction(1, len(genotypes))))
+                  if unordered else dict.fromkeys(genotypes, Fraction(1, len(genotypes)))
+                  for (mode, gender), genotypes in GENOTYPE_INDEX.items() for unordered in (False, True)}
+
+
 def normalize_probabilities(probabilities):
     """Normalize a set of probabilities.
 
@@ -201,19 +317,25 @@ def normalize_probabilities(probabilities):
             if value != 0}
 
 
+def _phenotype(observation):
+    """The observed symbol of an Observation or a plain symbol, None if unobserved"""
+    return getattr(observation, 'phenotype', observation)
+
+
 def constrain_probabilities(mode, observation, genotype_probabilities):
     """Given a dict of genotype probabilities remove all genotypes that
     don't match the observation given a mode of inheritance.
 
     Args:
         mode: The mode of inheritance
-        observation: Observation to match
+        observation: Observation or symbol to match, Eg. 'F'
         genotype_probabilities: dict of genotype probabilities
 
     Returns: dict of probabilities
     """
+    observable = observable_genotypes(mode, _phenotype(observation))
     constrained = {genotype: probability for genotype, probability in genotype_probabilities.items()
-                   if observation in phenotypes(genotype, mode)}
+                   if genotype in observable}
     if constrained:
         constrained = normalize_probabilities(constrained)
     return constrained
@@ -227,10 +349,11 @@ def punnet_occurrences(mode, observation, genotype_probabilities):
 
     Args:
         mode: The mode of inheritance
-        observation: The observation to match
+        observation: The Observation or symbol to match, Eg. 'F'
         genotype_probabilities: A dict of genotype probabilities
 
     Returns: Fraction indicating probability
     """
+    observable = observable_genotypes(mode, _phenotype(observation))
     return sum(probability for genotype, probability in genotype_probabilities.items()
-               if observation in phenotypes(genotype, mode))
+               if genotype in observable)
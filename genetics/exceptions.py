@@ -17,4 +17,7 @@ class InvalidState(AnalysisException):
     pass
 
 class NonMendelianPattern(AnalysisException):
+    pass
+
+class LikelihoodUnderflow(AnalysisException):
     pass
\ No newline at end of file
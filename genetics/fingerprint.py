@@ -0,0 +1,145 @@
+from collections import namedtuple
+from hashlib import blake2b
+
+from .peeling import nuclear_families
+
+__all__ = ['bipartite_graph', 'connected_components', 'fingerprint', 'Fingerprint', 'tree_centers']
+
+# digest is the same for any two isomorphic family graphs under the same mode.
+# order lists the individuals of the graph in canonical order, so that results
+# calculated for one graph can be given to the individuals of an isomorphic one.
+Fingerprint = namedtuple('Fingerprint', ['digest', 'order'])
+
+# The role of an edge of the bipartite individual - family graph, seen from the
+# node it leaves
+_PARENT, _CHILD = b'p', b'c'
+_MOTHER, _FATHER, _OFFSPRING = b'M', b'F', b'C'
+_FAMILY = b'family'
+
+
+def _hash(*parts):
+    result = blake2b(digest_size=16)
+    for part in parts:
+        result.update(part)
+    return result.digest()
+
+
+def bipartite_graph(graph):
+    """The labels and adjacency of the individual - family graph. Individuals are
+    the first nodes, followed by a node per family"""
+    individuals = len(graph.genders)
+    labels = [f'{gender}:{phenotype}'.encode() for gender, phenotype in zip(graph.genders, graph.phenotypes)]
+    adjacency = [[] for _ in range(individuals)]
+    for family in nuclear_families(graph):
+        node = len(labels)
+        labels.append(_FAMILY)
+        adjacency.append([])
+        for member, role in [(family.mother, _MOTHER), (family.father, _FATHER)] + \
+                            [(child, _OFFSPRING) for child in family.children]:
+            adjacency[node].append((member, role))
+            adjacency[member].append((node, _CHILD if role == _OFFSPRING else _PARENT))
+    return labels, adjacency
+
+
+def connected_components(adjacency):
+    """The nodes of each connected component, Eg. each unrelated pedigree"""
+    seen = set()
+    for start in range(len(adjacency)):
+        if start not in seen:
+            seen.add(start)
+            component = [start]
+            for node in component:
+                for neighbour, _ in adjacency[node]:
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        component.append(neighbour)
+            yield component
+
+
+def tree_centers(component, adjacency):
+    """The one or two nodes in the middle of a tree, found by removing leaves"""
+    degree = {node: len(adjacency[node]) for node in component}
+    leaves = [node for node in component if degree[node] <= 1]
+    remaining = len(component)
+    while remaining > 2:
+        remaining -= len(leaves)
+        next_leaves = []
+        for leaf in leaves:
+            for neighbour, _ in adjacency[leaf]:
+                degree[neighbour] -= 1
+                if degree[neighbour] == 1:
+                    next_leaves.append(neighbour)
+        leaves = next_leaves
+    return leaves
+
+
+def _rooted(root, labels, adjacency):
+    """Hash the tree hanging from root, bottom up so that deep pedigrees don't recurse
+
+    Returns: tuple of the hash of every node and its parent"""
+    parent = {root: None}
+    breadth_first = [root]
+    for node in breadth_first:
+        for neighbour, _ in adjacency[node]:
+            if neighbour not in parent:
+                parent[neighbour] = node
+                breadth_first.append(neighbour)
+
+    hashes = {}
+    for node in reversed(breadth_first):
+        branches = sorted(role + hashes[neighbour] for neighbour, role in adjacency[node]
+                          if neighbour != parent[node])
+        hashes[node] = _hash(labels[node], b'|', *branches)
+    return hashes, parent
+
+
+def _canonical_order(root, hashes, parent, adjacency, individuals):
+    order = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if node < individuals:
+            order.append(node)
+        branches = sorted(((role + hashes[neighbour], neighbour) for neighbour, role in adjacency[node]
+                           if neighbour != parent[node]), reverse=True)
+        stack.extend(neighbour for _, neighbour in branches)
+    return order
+
+
+def fingerprint(mode, graph):
+    """A canonical structural hash of a family graph: its topology, sexes and
+    phenotypes under a mode of inheritance.
+
+    Pedigrees without loops are trees of individuals and families, which are
+    hashed from their center so that isomorphic pedigrees share a digest. A
+    pedigree with a loop is hashed in ID order, so it only matches itself.
+
+    Args:
+        mode: The mode of inheritance
+        graph: FamilyGraph
+
+    Returns: Fingerprint
+    """
+    individuals = len(graph.genders)
+    labels, adjacency = bipartite_graph(graph)
+    components = list(connected_components(adjacency))
+    edges = sum(map(len, adjacency)) // 2
+
+    if edges != len(labels) - len(components):
+        digest = _hash(b'loop', mode.encode(), repr(tuple(graph)).encode())
+        return Fingerprint(digest.hex(), list(range(individuals)))
+
+    rooted = []
+    for component in components:
+        candidates = []
+        for center in tree_centers(component, adjacency):
+            hashes, parent = _rooted(center, labels, adjacency)
+            candidates.append((hashes[center], center, hashes, parent))
+        rooted.append(min(candidates, key=lambda candidate: candidate[0]))
+    rooted.sort(key=lambda candidate: candidate[0])
+
+    order = []
+    for _, center, hashes, parent in rooted:
+        order.extend(_canonical_order(center, hashes, parent, adjacency, individuals))
+    digest = _hash(b'tree', mode.encode(), *(candidate[0] for candidate in rooted))
+    return Fingerprint(digest.hex(), order)
@@ -1,17 +1,84 @@
-from collections import defaultdict
+from collections import defaultdict, namedtuple, OrderedDict
 from functools import reduce
 from itertools import product
 from operator import mul
 
-from core import FEMALE, MALE
-from core import constrain_probabilities
-from core import genotype_possibilities
-from core import normalize_probabilities
-from core import punnet_occurrences
-from core import punnet_square
-from exceptions import NonMendelianPattern
+from .core import FEMALE, MALE
+from .core import constrain_probabilities
+from .core import genotype_possibilities
+from .core import normalize_probabilities
+from .core import punnet_occurrences
+from .core import punnet_square
+from .exceptions import NonMendelianPattern
+
+__all__ = ['parent_likelihood', 'genotypes_n_mode', 'SUBTREE_CACHE', 'SubtreeCache', 'SubtreeCacheInfo']
+
+SubtreeCacheInfo = namedtuple('SubtreeCacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class SubtreeCache(object):
+    """A bounded, least recently used cache of parent_likelihood results.
+
+    Entries are keyed by (mode, children, mother genotypes, father genotypes). The
+    children themselves are part of the key, so an entry keeps its subtree alive
+    and can't be confused with a later subtree at the same address. Pedigree
+    invalidates the subtrees above an observation when it is changed.
+    """
+
+    def __init__(self, maxsize=2 ** 16):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """The cached value of key, or None"""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, observation):
+        """Forget every subtree that depends on the observation. Those are the
+        subtrees of the observation, its partners and their ancestors, which are
+        all ancestors of the observation's children"""
+        ancestors = {observation, *observation.children}
+        stack = list(ancestors)
+        while stack:
+            current = stack.pop()
+            for parent in (current.mother, current.father):
+                if parent is not None and parent not in ancestors:
+                    ancestors.add(parent)
+                    stack.append(parent)
+        stale = [key for key in self._entries if any(child in ancestors for child in key[1])]
+        for key in stale:
+            del self._entries[key]
+
+    def info(self):
+        return SubtreeCacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        self.hits = self.misses = 0
+        self._entries.clear()
+
+
+# Shared by every genotypes_n_mode call in the process
+SUBTREE_CACHE = SubtreeCache()
+
+
+def _freeze(genotypes):
+    """A hashable key of a genotype or a dict of genotype probabilities"""
+    return genotypes if isinstance(genotypes, str) else tuple(sorted(genotypes.items()))
 
-__all__ = ['parent_likelihood', 'genotypes_n_mode']
 
 def _forward_propagate(mode, child, genotype_probabilities):
     """Create the next mother and father genotypes for the parent probabilities
@@ -43,8 +110,13 @@ def parent_likelihood(mode, children, mother_genotypes, father_genotypes):
         mother_genotypes: The probabilities of mother genotypes
         father_genotypes: the probabilities of father genotypes
 
+    Results are cached in SUBTREE_CACHE.
     """
-
+    children = tuple(children)
+    key = (mode, children, _freeze(mother_genotypes), _freeze(father_genotypes))
+    cached = SUBTREE_CACHE.get(key)
+    if cached is not None:
+        return cached
 
     genotypes_probabilities = punnet_square(mother_genotypes, father_genotypes)
     result = [1]
@@ -54,7 +126,9 @@ def parent_likelihood(mode, children, mother_genotypes, father_genotypes):
             parent_likelihood(mode, child.children,
                               *_forward_propagate(mode, child, genotypes_probabilities))
         )
-    return reduce(mul, result)
+    likelihood = reduce(mul, result)
+    SUBTREE_CACHE.put(key, likelihood)
+    return likelihood
 
 
 def _fit_parent_probabilities(mode, children, mother_genotypes, father_genotypes):
@@ -1,10 +1,9 @@
 
 def reverse(obj):
-    try:
-        return reversed(obj)
-    except TypeError:
-        if isinstance(obj, dict):
-            return {v: k for k, v in obj.items()}
+    # dicts are reversible since python 3.8, so they must be checked first
+    if isinstance(obj, dict):
+        return {v: k for k, v in obj.items()}
+    return reversed(obj)
 
 
 def horizontal_index(n, mapping, offset=0):
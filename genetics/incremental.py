@@ -0,0 +1,213 @@
+from .fingerprint import bipartite_graph, connected_components, tree_centers
+from .exceptions import NonMendelianPattern
+from .numeric import BACKENDS, EXACT
+from .peeling import family_messages, local_probabilities, message_product, normalize_message, nuclear_families
+from .peeling import peeling_schedule
+from .peeling import FamilyGraph, Peeled
+
+__all__ = ['IncrementalPeeler']
+
+
+class IncrementalPeeler(object):
+    """Peel a family graph once and keep every message, so that changing the
+    phenotype of one individual only recomputes what depends on it.
+
+    The individual-family tree is rooted at its center. Each individual and
+    family counts the changes made below it, which takes one walk up the tree per
+    change. A message from a family to a member depends on everything on the far
+    side of the family, so it is stale once that count has moved and is only
+    recomputed when it is next needed. After a change the likelihood only needs
+    the messages towards the changed individual, none of which depend on it, and
+    the posterior of another individual only recomputes the messages on the path
+    between them.
+    """
+
+    def __init__(self, mode, graph, backend=EXACT, unordered=False):
+        """
+        Args:
+            mode: The mode of inheritance
+            graph: FamilyGraph, a pedigree with a loop raises InvalidState, see junction.JunctionPeeler
+            backend: The numeric backend
+            unordered: Sum over genotypes without phase, see peeling.peel
+        """
+        self.mode = mode
+        self.backend = backend
+        self.unordered = unordered
+        self._numeric = BACKENDS[backend]
+        self._graph = FamilyGraph(graph.genders, list(graph.phenotypes), graph.mothers, graph.fathers)
+        self._families = nuclear_families(graph)
+        self._membership, _, _ = peeling_schedule(graph, self._families)
+        self._local = [local_probabilities(backend, mode, self._graph, individual, unordered)
+                       for individual in range(len(graph.genders))]
+
+        # Root each component of the individual-family tree at its center. Families
+        # are the nodes after the individuals.
+        _, adjacency = bipartite_graph(graph)
+        self._parent = [None] * len(adjacency)
+        self._component = [None] * len(adjacency)
+        self._roots = []
+        self._anchors = []
+        for component in connected_components(adjacency):
+            root = tree_centers(component, adjacency)[0]
+            self._roots.append(root)
+            self._anchors.append(root if root < len(graph.genders) else component[0])
+            seen = {root}
+            stack = [root]
+            while stack:
+                node = stack.pop()
+                self._component[node] = len(self._anchors) - 1
+                for neighbour, _ in adjacency[node]:
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        self._parent[neighbour] = node
+                        stack.append(neighbour)
+
+        self._changes = [0] * len(adjacency)
+        self._total_changes = 0
+
+        # (family, member) -> (stamp, normalized message, likelihood of the far side, possible)
+        self._messages = {}
+        # component -> (changes, likelihood, possible)
+        self._likelihoods = {}
+        self._computed = 0
+
+    def _stamp(self, position, target):
+        """The number of changes on the far side of a message"""
+        family = len(self._local) + position
+        if self._parent[family] == target:
+            return self._changes[family]
+        return self._total_changes - self._changes[target]
+
+    def _valid(self, key):
+        entry = self._messages.get(key)
+        return entry is not None and entry[0] == self._stamp(*key)
+
+    def _dependencies(self, position, target):
+        family = self._families[position]
+        return [(source, member) for member in (family.mother, family.father) + family.children if member != target
+                for source in self._membership[member] if source != position]
+
+    def _compute(self, position, target):
+        family = self._families[position]
+        numeric = self._numeric
+        incoming = {}
+        likelihood, possible = numeric.one, True
+        for member in (family.mother, family.father) + family.children:
+            if member == target:
+                continue
+            messages = []
+            for source in self._membership[member]:
+                if source != position:
+                    _, message, source_likelihood, source_possible = self._messages[source, member]
+                    messages.append(message)
+                    likelihood = numeric.combine(likelihood, source_likelihood)
+                    possible = possible and source_possible
+            incoming[member] = message_product(self._local[member], messages)
+        message = family_messages(self.backend, self.mode, self._graph, family, incoming, [target],
+                                   self.unordered)[target]
+        message, total = normalize_message(message)
+        if total == 0:
+            likelihood, possible = numeric.zero, False
+        else:
+            likelihood = numeric.scale(likelihood, total)
+        self._messages[position, target] = (self._stamp(position, target), message, likelihood, possible)
+        self._computed += 1
+
+    def _message(self, position, target):
+        """The message from a family to a member, computing any stale messages it
+        depends on first. Iterative so that deep pedigrees don't recurse."""
+        stack = [(position, target)]
+        while stack:
+            key = stack[-1]
+            if self._valid(key):
+                stack.pop()
+                continue
+            stale = [dependency for dependency in self._dependencies(*key) if not self._valid(dependency)]
+            if stale:
+                stack.extend(stale)
+            else:
+                stack.pop()
+                self._compute(*key)
+        return self._messages[position, target]
+
+    def _belief(self, individual):
+        """The unnormalized genotype probabilities of an individual, the likelihood of
+        everything else in its component and whether that is possible"""
+        numeric = self._numeric
+        likelihood, possible = numeric.one, True
+        messages = []
+        for position in self._membership[individual]:
+            _, message, source_likelihood, source_possible = self._message(position, individual)
+            messages.append(message)
+            likelihood = numeric.combine(likelihood, source_likelihood)
+            possible = possible and source_possible
+        return message_product(self._local[individual], messages), likelihood, possible
+
+    def _component_likelihood(self, component):
+        changes = self._changes[self._roots[component]]
+        cached = self._likelihoods.get(component)
+        if cached is not None and cached[0] == changes:
+            return cached[1:]
+        belief, likelihood, possible = self._belief(self._anchors[component])
+        total = sum(belief.values())
+        if not possible or total == 0:
+            result = (self._numeric.zero, False)
+        else:
+            result = (self._numeric.scale(likelihood, total), True)
+        self._likelihoods[component] = (changes,) + result
+        return result
+
+    @property
+    def possible(self):
+        """Whether the observed phenotypes are valid given the mode"""
+        return all(self._component_likelihood(component)[1] for component in range(len(self._anchors)))
+
+    @property
+    def likelihood(self):
+        """The probability of the observed phenotypes, in the representation of the
+        backend. Zero when they are not valid given the mode"""
+        numeric = self._numeric
+        result = numeric.one
+        for component in range(len(self._anchors)):
+            likelihood, possible = self._component_likelihood(component)
+            if not possible:
+                return numeric.zero
+            result = numeric.combine(result, likelihood)
+        return result
+
+    def set_phenotype(self, individual, phenotype):
+        """Change the observed phenotype of an individual
+
+        Args:
+            individual: The ID of the individual
+            phenotype: The new observation, Eg. 'F'. Its gender must not change
+        """
+        self._graph.phenotypes[individual] = phenotype
+        self._local[individual] = local_probabilities(self.backend, self.mode, self._graph, individual,
+                                                       self.unordered)
+        node = individual
+        while node is not None:
+            self._changes[node] += 1
+            node = self._parent[node]
+        self._total_changes += 1
+        # The messages towards the changed individual are still valid, so its
+        # component's likelihood is cheapest to recompute from there
+        self._anchors[self._component[individual]] = individual
+
+    def posterior(self, individual):
+        """The genotype probabilities of a single individual
+
+        Returns: dict of genotype probabilities
+        """
+        if not self.possible:
+            raise NonMendelianPattern(f'The observed phenotypes are not valid given a {self.mode} '
+                                      f'mode of inheritance.')
+        belief, _ = normalize_message(self._belief(individual)[0])
+        return {genotype: probability for genotype, probability in belief.items() if probability != 0}
+
+    def peeled(self):
+        """The genotype probabilities of every individual and the likelihood, see peeling.peel
+
+        Returns: Peeled
+        """
+        return Peeled([self.posterior(individual) for individual in range(len(self._local))], self.likelihood)
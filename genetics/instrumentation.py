@@ -0,0 +1,135 @@
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from fractions import Fraction
+
+from . import core
+from . import genotype_analysis
+from .exceptions import InvalidState
+
+__all__ = ['FunctionStats', 'INSTRUMENTED', 'Profile', 'profile']
+
+# module -> the functions of it that are counted and timed. A module that calls one
+# of them through its own global (Eg. genotype_analysis imports punnet_square) has
+# that global replaced too, so every call is seen.
+INSTRUMENTED = {
+    core: ('punnet_square',),
+    genotype_analysis: ('punnet_square', 'parent_likelihood', '_back_propagate', '_fit_parent_probabilities'),
+}
+
+# calls: The number of calls
+# seconds: The time spent in the outermost calls, so recursion isn't counted twice
+# max_depth: The deepest the function recursed into itself
+# max_denominator_bits: The bit length of the largest Fraction denominator returned
+FunctionStats = namedtuple('FunctionStats', ['calls', 'seconds', 'max_depth', 'max_denominator_bits'])
+
+
+def _denominator_bits(value):
+    """The bit length of the largest denominator of a Fraction or a dict of them"""
+    if isinstance(value, dict):
+        return max(map(_denominator_bits, value.values()), default=0)
+    if isinstance(value, Fraction):
+        return value.denominator.bit_length()
+    return 0
+
+
+class Profile(object):
+    """The statistics of a profile, filled in while it is active.
+
+    Denominators are only measured while profiling, they grow with the size of
+    the pedigree and are what makes exact arithmetic slow.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.seconds = {}
+        self.max_depth = 0
+        # The largest denominator returned at each depth of nested instrumented
+        # calls, 1 being the outermost
+        self.denominator_bits = {}
+        self.subtree_cache_hits = 0
+        self.subtree_cache_misses = 0
+        self._depth = 0
+        self._depths = {}
+        self._max_depths = {}
+        self._denominators = {}
+
+    def functions(self):
+        """The statistics of each function that was called
+
+        Returns: dict of function name -> FunctionStats
+        """
+        return {name: FunctionStats(calls, self.seconds[name], self._max_depths[name], self._denominators[name])
+                for name, calls in self.calls.items()}
+
+    def _wrap(self, name, function):
+        def instrumented(*args, **kwargs):
+            if name not in self.calls:
+                self.calls[name] = 0
+                self.seconds[name] = 0.0
+                self._depths[name] = self._max_depths[name] = self._denominators[name] = 0
+            self.calls[name] += 1
+            self._depth += 1
+            self._depths[name] += 1
+            self.max_depth = max(self.max_depth, self._depth)
+            self._max_depths[name] = max(self._max_depths[name], self._depths[name])
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                if self._depths[name] == 1:
+                    self.seconds[name] += time.perf_counter() - start
+                self._depths[name] -= 1
+                depth = self._depth
+                self._depth -= 1
+
+            bits = _denominator_bits(result)
+            self._denominators[name] = max(self._denominators[name], bits)
+            self.denominator_bits[depth] = max(self.denominator_bits.get(depth, 0), bits)
+            return result
+        instrumented.__wrapped__ = function
+        return instrumented
+
+    def report(self):
+        """A table of the function statistics, slowest first"""
+        lines = [f'{"function":<28}{"calls":>10}{"seconds":>12}{"depth":>8}{"bits":>8}']
+        for name, stats in sorted(self.functions().items(), key=lambda item: -item[1].seconds):
+            lines.append(f'{name:<28}{stats.calls:>10}{stats.seconds:>12.6f}{stats.max_depth:>8}'
+                         f'{stats.max_denominator_bits:>8}')
+        return '\n'.join(lines)
+
+
+_ACTIVE = None
+
+
+@contextmanager
+def profile():
+    """Count and time the inference functions of core and genotype_analysis while
+    the block runs. The functions are only replaced inside the block, so there is
+    no overhead otherwise. Callers that imported a function by name before the
+    block (Eg. from genotype_analysis import parent_likelihood) still call it
+    directly, only the calls it makes are seen.
+
+        with profile() as stats:
+            genotypes_n_mode(AUTOSOMAL_DOMINANT, pedigree[2, 0])
+        print(stats.report())
+
+    Returns: Profile
+    """
+    global _ACTIVE
+    if _ACTIVE is not None:
+        raise InvalidState('A profile is already active.')
+    stats = _ACTIVE = Profile()
+    cache = genotype_analysis.SUBTREE_CACHE
+    hits, misses = cache.hits, cache.misses
+    originals = [(module, name, getattr(module, name)) for module, names in INSTRUMENTED.items() for name in names]
+    for module, name, function in originals:
+        setattr(module, name, stats._wrap(name, function))
+    try:
+        yield stats
+    finally:
+        for module, name, function in originals:
+            setattr(module, name, function)
+        stats.subtree_cache_hits = cache.hits - hits
+        stats.subtree_cache_misses = cache.misses - misses
+        _ACTIVE = None
@@ -0,0 +1,295 @@
+import heapq
+from itertools import product
+
+from .exceptions import NonMendelianPattern
+from .numeric import BACKENDS, EXACT
+from .peeling import CHILD_TRANSITIONS, FamilyGraph, local_probabilities, normalize_message, Peeled
+
+__all__ = ['JunctionPeeler', 'JunctionTree', 'peel']
+
+# (backend, mode, gender, unordered) -> dict of (mother, father, child) genotype -> probability
+_TRANSITION_FACTORS = {}
+
+
+def _transition_factor(backend, mode, gender, unordered=False):
+    key = (backend, mode, gender, unordered)
+    if key not in _TRANSITION_FACTORS:
+        _TRANSITION_FACTORS[key] = {(m_genotype, f_genotype, genotype): probability
+                                    for (m_genotype, f_genotype), children
+                                    in CHILD_TRANSITIONS[key].items()
+                                    for genotype, probability in children.items()}
+    return _TRANSITION_FACTORS[key]
+
+
+def _moral_graph(graph):
+    """Join each child to its parents and the parents to each other"""
+    neighbours = [set() for _ in graph.genders]
+    for child, parents in enumerate(zip(graph.mothers, graph.fathers)):
+        if parents != (None, None):
+            scope = parents + (child,)
+            for individual in scope:
+                neighbours[individual].update(other for other in scope if other != individual)
+    return neighbours
+
+
+def _fill(neighbours, individual):
+    """The number of edges eliminating an individual would add between its neighbours"""
+    adjacent = list(neighbours[individual])
+    return sum(1 for position, first in enumerate(adjacent) for second in adjacent[position + 1:]
+               if second not in neighbours[first])
+
+
+def _elimination_order(graph):
+    """Greedily eliminate the individual that adds the fewest edges, then the one
+    with the fewest neighbours. A heap of scores is kept, and only the scores of
+    individuals near an eliminated one are recomputed.
+
+    Returns: tuple of the order and the neighbours of each individual when it was eliminated
+    """
+    neighbours = _moral_graph(graph)
+    score = lambda individual: (_fill(neighbours, individual), len(neighbours[individual]), individual)
+    scores = [score(individual) for individual in range(len(neighbours))]
+    heap = list(scores)
+    heapq.heapify(heap)
+    eliminated = [False] * len(neighbours)
+    order, separators = [], []
+    while heap:
+        current = heapq.heappop(heap)
+        individual = current[2]
+        if eliminated[individual] or current != scores[individual]:
+            continue
+        eliminated[individual] = True
+        adjacent = neighbours[individual]
+        order.append(individual)
+        separators.append(tuple(sorted(adjacent)))
+        for neighbour in adjacent:
+            neighbours[neighbour].discard(individual)
+            neighbours[neighbour].update(other for other in adjacent if other != neighbour)
+        affected = set(adjacent).union(*(neighbours[neighbour] for neighbour in adjacent))
+        for other in affected:
+            if not eliminated[other]:
+                scores[other] = score(other)
+                heapq.heappush(heap, scores[other])
+    return order, separators
+
+
+class JunctionTree(object):
+    """The cliques of a pedigree, found by eliminating its individuals one at a time.
+
+    Eliminating an individual forms a clique of it and its remaining neighbours,
+    which sends a message over those neighbours (the separator) to the clique of
+    the first of them to be eliminated. The cost of summing out a clique grows with
+    the number of genotypes to the power of its size, so it is bounded by the
+    treewidth of the pedigree rather than the number of loops. Only the structure
+    is kept, so one tree serves any phenotypes.
+    """
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph: FamilyGraph
+        """
+        order, self.separators = _elimination_order(graph)
+        self.order = order
+        step = {individual: position for position, individual in enumerate(order)}
+        self.cliques = [(individual,) + separator for individual, separator in zip(order, self.separators)]
+        self.parents = [min((step[member] for member in separator), default=None) for separator in self.separators]
+        self.children = [[] for _ in order]
+        for position, parent in enumerate(self.parents):
+            if parent is not None:
+                self.children[parent].append(position)
+
+        # Every individual's own factor and the transition of every child go to the
+        # clique of the first member of their scope to be eliminated, which holds
+        # the whole scope
+        self.locals = [[] for _ in order]
+        self.transitions = [[] for _ in order]
+        for individual, parents in enumerate(zip(graph.mothers, graph.fathers)):
+            self.locals[step[individual]].append(individual)
+            if parents != (None, None):
+                self.transitions[min(step[member] for member in parents + (individual,))].append(individual)
+
+    @property
+    def width(self):
+        """The size of the largest clique, less one"""
+        return max(map(len, self.cliques), default=1) - 1
+
+
+def _project(table, variables, onto):
+    positions = [variables.index(variable) for variable in onto]
+    result = {}
+    for assignment, value in table.items():
+        key = tuple(assignment[position] for position in positions)
+        result[key] = result.get(key, 0) + value
+    return result
+
+
+class _Calibration(object):
+    """Messages passed over a JunctionTree for one mode, backend and set of phenotypes"""
+
+    def __init__(self, tree, mode, graph, backend, unordered=False):
+        self.tree = tree
+        self.graph = graph
+        self.local = [local_probabilities(backend, mode, graph, individual, unordered)
+                      for individual in range(len(graph.genders))]
+        # Genotypes that can't produce the phenotype never need to be enumerated
+        self.domains = [[genotype for genotype, value in local.items() if value != 0] for local in self.local]
+        self.factors = [_transition_factor(backend, mode, gender, unordered) for gender in graph.genders]
+        self.upward = [None] * len(tree.cliques)
+        self.downward = [None] * len(tree.cliques)
+
+    def table(self, position, exclude=None):
+        """The product of the factors of a clique and the messages it received,
+        other than the one from exclude, over every possible assignment"""
+        tree, graph = self.tree, self.graph
+        clique = tree.cliques[position]
+        index = {member: offset for offset, member in enumerate(clique)}
+        messages = [(tuple(index[member] for member in tree.separators[child]), self.upward[child])
+                    for child in tree.children[position] if child != exclude]
+        if tree.parents[position] is not None and self.downward[position] is not None:
+            messages.append((tuple(range(1, len(clique))), self.downward[position]))
+        transitions = [(index[graph.mothers[child]], index[graph.fathers[child]], index[child], self.factors[child])
+                       for child in tree.transitions[position]]
+        locals_ = [(index[individual], self.local[individual]) for individual in tree.locals[position]]
+
+        result = {}
+        for assignment in product(*(self.domains[member] for member in clique)):
+            value = 1
+            for offset, local in locals_:
+                value *= local[assignment[offset]]
+            for mother, father, child, factor in transitions:
+                if not value:
+                    break
+                value *= factor.get((assignment[mother], assignment[father], assignment[child]), 0)
+            for positions, message in messages:
+                if not value:
+                    break
+                value *= message.get(tuple(assignment[offset] for offset in positions), 0)
+            if value:
+                result[assignment] = value
+        return result
+
+    def collect(self):
+        """Pass messages from the first cliques eliminated to the last
+
+        Returns: list of the normalizing constant of each message and of each root"""
+        tree = self.tree
+        totals = []
+        for position, clique in enumerate(tree.cliques):
+            table = self.table(position)
+            if tree.parents[position] is None:
+                totals.append(sum(table.values()))
+            else:
+                message, total = normalize_message(_project(table, clique, tree.separators[position]))
+                totals.append(total)
+                self.upward[position] = message
+            if totals[-1] == 0:
+                break
+        return totals
+
+    def distribute(self):
+        tree = self.tree
+        for position in reversed(range(len(tree.cliques))):
+            parent = tree.parents[position]
+            if parent is not None:
+                table = self.table(parent, exclude=position)
+                self.downward[position] = normalize_message(_project(table, tree.cliques[parent],
+                                                              tree.separators[position]))[0]
+
+    def marginals(self):
+        """The genotype probabilities of each individual, from the clique it was eliminated in"""
+        genotypes = [None] * len(self.graph.genders)
+        for position, clique in enumerate(self.tree.cliques):
+            belief, _ = normalize_message(_project(self.table(position), clique, clique[:1]))
+            genotypes[clique[0]] = {genotype: belief[genotype,] for genotype in self.local[clique[0]]
+                                    if belief.get((genotype,), 0) != 0}
+        return genotypes
+
+
+def _peel(tree, mode, graph, backend, unordered=False):
+    calibration = _Calibration(tree, mode, graph, backend, unordered)
+    totals = calibration.collect()
+    if 0 in totals:
+        raise NonMendelianPattern(f'The observed phenotypes are not valid given a {mode} mode of inheritance.')
+    calibration.distribute()
+
+    numeric = BACKENDS[backend]
+    likelihood = numeric.one
+    for total in totals:
+        likelihood = numeric.scale(likelihood, total)
+    return Peeled(calibration.marginals(), likelihood)
+
+
+def peel(mode, graph, backend=EXACT, tree=None, unordered=False):
+    """Calculate the genotype probabilities of every individual in a family graph,
+    which may have loops, by passing messages over its junction tree.
+
+    Gives the same results as peeling.peel, which uses it for pedigrees with loops.
+
+    Args:
+        mode: The mode of inheritance
+        graph: FamilyGraph
+        backend: The numeric backend
+        tree: The JunctionTree of the graph, built if it isn't supplied
+        unordered: Sum over genotypes without phase, see peeling.peel
+
+    Returns: Peeled
+    """
+    return _peel(tree or JunctionTree(graph), mode, graph, backend, unordered)
+
+
+class JunctionPeeler(object):
+    """incremental.IncrementalPeeler for pedigrees with loops. The junction tree is
+    only built once, a change of phenotype passes every message again."""
+
+    def __init__(self, mode, graph, backend=EXACT, unordered=False):
+        """
+        Args:
+            mode: The mode of inheritance
+            graph: FamilyGraph
+            backend: The numeric backend
+            unordered: Sum over genotypes without phase, see peeling.peel
+        """
+        self.mode = mode
+        self.backend = backend
+        self.unordered = unordered
+        self._graph = FamilyGraph(graph.genders, list(graph.phenotypes), graph.mothers, graph.fathers)
+        self._tree = JunctionTree(graph)
+        self._peeled = None
+        self._possible = None
+
+    def _peel(self):
+        if self._possible is None:
+            try:
+                self._peeled = _peel(self._tree, self.mode, self._graph, self.backend, self.unordered)
+                self._possible = True
+            except NonMendelianPattern:
+                self._possible = False
+        return self._peeled
+
+    @property
+    def possible(self):
+        """Whether the observed phenotypes are valid given the mode"""
+        self._peel()
+        return self._possible
+
+    @property
+    def likelihood(self):
+        """The probability of the observed phenotypes, zero when they are not valid"""
+        return self._peel().likelihood if self.possible else BACKENDS[self.backend].zero
+
+    def set_phenotype(self, individual, phenotype):
+        """Change the observed phenotype of an individual, its gender must not change"""
+        self._graph.phenotypes[individual] = phenotype
+        self._peeled = self._possible = None
+
+    def peeled(self):
+        """Returns: Peeled, see peel"""
+        if not self.possible:
+            raise NonMendelianPattern(f'The observed phenotypes are not valid given a {self.mode} '
+                                      f'mode of inheritance.')
+        return self._peeled
+
+    def posterior(self, individual):
+        """The genotype probabilities of a single individual"""
+        return self.peeled().genotypes[individual]
@@ -1,9 +1,9 @@
 
-from pedigree import Pedigree
-from core import *
-from genotype_analysis import *
-from observation import Observation
-from mode_analysis import *
+from genetics.pedigree import Pedigree
+from genetics.core import *
+from genetics.genotype_analysis import *
+from genetics.observation import Observation
+from genetics.mode_analysis import *
 from pprint import pprint as pp
 
 p1 = Pedigree.from_file(r'C:\Users\James\PycharmProjects\genetics\pedigree_1.txt')
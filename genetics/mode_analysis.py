@@ -1,8 +1,88 @@
-from genotype_analysis import parent_likelihood
-from core import normalize_probabilities
-from core import genotype_possibilities
-from core import ALL_MODES, FEMALE, MALE
-from collections import defaultdict
-from exceptions import NonMendelianPattern
-from functools import reduce
-from operator import mul
+from .core import ALL_MODES
+from .exceptions import LikelihoodUnderflow, NonMendelianPattern
+from .numeric import BACKENDS, EXACT
+from .peeling import peel_all
+
+__all__ = ['marginal_likelihoods', 'mode_likelihoods', 'peel_modes', 'rank_modes']
+
+
+def peel_modes(pedigree, workers=1, backend=None, cache=None):
+    """Calculate the likelihood of each mode and which modes the pedigree is valid for.
+    Unlike a likelihood of 0, an invalid mode can't be mistaken for a FLOAT underflow.
+
+    Args:
+        pedigree: The Pedigree in question
+        workers: The number of processes to spread the modes over, None uses every CPU
+        backend: The numeric backend, defaults to the backend of the pedigree
+        cache: An optional cache.ResultCache, only the modes that miss are peeled
+
+    Returns: tuple of dict of mode -> likelihood and the set of valid modes, see rank_modes
+    """
+    backend = backend or pedigree.backend
+    if workers == 1 and cache is None:
+        peelers = {mode: pedigree.peeler(mode, backend) for mode in ALL_MODES}
+        return ({mode: peeler.likelihood for mode, peeler in peelers.items()},
+                {mode for mode, peeler in peelers.items() if peeler.possible})
+    peeled = peel_all(((mode, pedigree.graph) for mode in ALL_MODES), workers=workers, backend=backend, cache=cache)
+    return ({mode: BACKENDS[backend].zero if result is None else result.likelihood
+             for mode, result in zip(ALL_MODES, peeled)},
+            {mode for mode, result in zip(ALL_MODES, peeled) if result is not None})
+
+
+def marginal_likelihoods(pedigree, workers=1, backend=None, cache=None):
+    """Calculate the probability of the observed phenotypes under each mode of inheritance
+
+    Each mode is a single peeling pass over the pedigree. A mode the pedigree is
+    not valid for has a likelihood of 0. In a single process the pedigree keeps
+    the messages of each mode, so a change of affection status is cheap to rescore.
+
+    Args:
+        pedigree: The Pedigree in question
+        workers: The number of processes to spread the modes over, None uses every CPU
+        backend: The numeric backend, defaults to the backend of the pedigree. LOG
+            likelihoods are natural logarithms
+        cache: An optional cache.ResultCache, only the modes that miss are peeled
+
+    Returns: dict of mode -> likelihood
+    """
+    return peel_modes(pedigree, workers, backend, cache)[0]
+
+
+def rank_modes(likelihoods, backend=EXACT, possible=None):
+    """Apply bayes rule to the marginal likelihood of each mode with a null prior.
+
+    Args:
+        likelihoods: dict of mode -> likelihood
+        backend: The numeric backend the likelihoods were calculated with
+        possible: The modes the pedigree is valid for, as reported by peeling.
+            Defaults to the modes with a non zero likelihood, which can't tell an
+            invalid mode from a FLOAT likelihood that underflowed
+
+    Returns: dict of mode -> probability
+    """
+    zero = BACKENDS[backend].zero
+    if possible is None:
+        possible = {mode for mode, likelihood in likelihoods.items() if likelihood != zero}
+    if not possible:
+        raise NonMendelianPattern('The pedigree is not valid given any mode of inheritance.')
+    if all(likelihoods[mode] == zero for mode in possible):
+        raise LikelihoodUnderflow(f'The likelihood of every valid mode underflowed to 0 with the {backend} '
+                                  f'backend, use the LOG backend for a pedigree this large.')
+    return BACKENDS[backend].normalize({mode: likelihood if mode in possible else zero
+                                        for mode, likelihood in likelihoods.items()})
+
+
+def mode_likelihoods(pedigree, workers=1, backend=None, cache=None):
+    """Rank the modes of inheritance for a pedigree
+
+    Args:
+        pedigree: The Pedigree in question
+        workers: The number of processes to spread the modes over, None uses every CPU
+        backend: The numeric backend, defaults to the backend of the pedigree
+        cache: An optional cache.ResultCache, only the modes that miss are peeled
+
+    Returns: dict of mode -> probability
+    """
+    backend = backend or pedigree.backend
+    likelihoods, possible = peel_modes(pedigree, workers, backend, cache)
+    return rank_modes(likelihoods, backend, possible)
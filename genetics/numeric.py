@@ -0,0 +1,62 @@
+from collections import namedtuple
+from fractions import Fraction
+from math import exp, inf, isinf, log
+from operator import add, mul
+
+__all__ = ['BACKENDS', 'EXACT', 'FLOAT', 'json_number', 'LOG', 'NUMPY', 'TOLERANCE']
+
+EXACT = 'EXACT'
+FLOAT = 'FLOAT'
+LOG = 'LOG'
+NUMPY = 'NUMPY'
+
+# Genotype and mode probabilities of the FLOAT, LOG and NUMPY backends agree with EXACT to
+# within this relative tolerance. Every message is normalized as it is passed, so
+# rounding error grows with the number of families rather than their depth.
+TOLERANCE = 1e-9
+
+# scale multiplies a likelihood by a normalizing constant, combine multiplies two
+# likelihoods
+Backend = namedtuple('Backend', ['name', 'number', 'one', 'zero', 'scale', 'combine', 'normalize'])
+
+
+def _normalize_exact(likelihoods):
+    total = sum(likelihoods.values())
+    return {key: Fraction(value) / total for key, value in likelihoods.items()}
+
+
+def _normalize_float(likelihoods):
+    total = sum(likelihoods.values())
+    return {key: value / total for key, value in likelihoods.items()}
+
+
+def _normalize_log(likelihoods):
+    peak = max(likelihoods.values())
+    scaled = {key: exp(value - peak) for key, value in likelihoods.items()}
+    return _normalize_float(scaled)
+
+
+# Probabilities are always plain numbers, only the likelihood that accumulates the
+# normalizing constants of every message differs. The LOG backend holds it as a
+# natural logarithm so that deep pedigrees don't underflow to 0. NUMPY peels with
+# array operations (see vectorized) and also holds a natural logarithm.
+BACKENDS = {
+    EXACT: Backend(EXACT, Fraction, Fraction(1), 0, lambda likelihood, total: likelihood * total, mul,
+                   _normalize_exact),
+    FLOAT: Backend(FLOAT, float, 1.0, 0.0, lambda likelihood, total: likelihood * total, mul,
+                   _normalize_float),
+    LOG: Backend(LOG, float, 0.0, -inf, lambda likelihood, total: likelihood + log(total), add,
+                 _normalize_log),
+    NUMPY: Backend(NUMPY, float, 0.0, -inf, lambda likelihood, total: likelihood + log(total), add,
+                   _normalize_log),
+}
+
+
+def json_number(value):
+    """A JSON value of a probability or likelihood, Fractions are written as strings
+    and the log of zero as null"""
+    if isinstance(value, Fraction):
+        return str(value)
+    if isinstance(value, float) and isinf(value):
+        return None
+    return value
@@ -1,18 +1,20 @@
-from core import MALE, FEMALE, MALES, FEMALES
-from core import VALID_OBSERVATIONS
-from exceptions import InvalidObservation
+from .core import MALE, FEMALE, MALES, FEMALES
+from .core import VALID_OBSERVATIONS
+from .exceptions import InvalidObservation
 
 __all__ = ['Observation']
 
 
-class Observation(str):
+class Observation(object):
+    # No per instance __dict__, large pedigrees hold a lot of these
+    __slots__ = ('symbol', 'observed', 'generation', '_mother', '_father', '_partner', '_children', '_children_tuple')
 
     @property
     def gender(self):
         gender = None
-        if self in FEMALES:
+        if self.symbol in FEMALES:
             gender = FEMALE
-        elif self in MALES:
+        elif self.symbol in MALES:
             gender = MALE
         return gender
 
@@ -56,13 +58,16 @@ class Observation(str):
         if self.mother:
             result = self.mother
         elif self.father:
-            result = self.mother
+            result = self.father
         return result
 
     ### CHILDREN ###
     @property
     def children(self):
-        return self._children
+        # Built once per change, the recursive inference reads it in its inner loops
+        if self._children_tuple is None:
+            self._children_tuple = tuple(self._children)
+        return self._children_tuple
 
     ### SIBLINGS ###
     @property
@@ -82,7 +87,14 @@ class Observation(str):
     ### AFFECTED ###
     @property
     def affected(self):
-        return self.isupper()
+        """None if the phenotype wasn't observed"""
+        return self.symbol.isupper() if self.observed else None
+
+    ### PHENOTYPE ###
+    @property
+    def phenotype(self):
+        """The observed symbol, None if the phenotype wasn't observed"""
+        return self.symbol if self.observed else None
 
     ### MOTHER FATHER ###
     @property
@@ -92,25 +104,46 @@ class Observation(str):
 
     def add_children(self, value):
         # Validate children are Observations
-        if isinstance(value, (tuple, list)):
-            if all(map(lambda x: isinstance(x, Observation), value)):
-                self._children += value
-        elif isinstance(value, Observation):
-            self._children += (value,)
-
+        if isinstance(value, Observation):
+            value = (value,)
+        elif not (isinstance(value, (tuple, list)) and all(map(lambda x: isinstance(x, Observation), value))):
+            return
+
+        # Only the new children need their parents set, so adding children one at
+        # a time stays linear in the size of the family
+        self._children.extend(value)
+        self._children_tuple = None
         mother, father = self.mother_father
-        for child in self._children:
+        for child in value:
             child._mother, child._father = mother, father
 
-    def __new__(cls, value):
+    def set_parents(self, mother, father):
+        """Link both parents at once. Unlike the mother and father setters the father
+        doesn't have to be the mother's partner, so either may be None"""
+        self._mother, self._father = mother, father
+        for parent in (mother, father):
+            if parent is not None:
+                parent._children.append(self)
+                parent._children_tuple = None
+
+    def __init__(self, value, observed=True):
+        """An individual drawn as value, Eg. 'F'. An unobserved individual (Eg. a
+        missing phenotype in a PED file) is drawn as its lowercase symbol."""
         if value not in VALID_OBSERVATIONS:
             raise InvalidObservation
-        return super().__new__(cls, value)
-
-    def __init__(self, value):
-        super().__init__()
+        self.symbol = value
+        self.observed = observed
+        self.generation = None
         self._mother = None
         self._father = None
         self._partner = None
-        self._children = ()
-        self._index = None
+        self._children = []
+        self._children_tuple = None
+
+    def __str__(self):
+        return self.symbol
+
+    def __repr__(self):
+        if not self.observed:
+            return f'{type(self).__name__}({self.symbol!r}, observed=False)'
+        return f'{type(self).__name__}({self.symbol!r})'
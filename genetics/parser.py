@@ -1,125 +1,133 @@
+import re
+from bisect import bisect_left
 from collections import namedtuple
 
-from core import VALID_OBSERVATIONS, VALID_INSTRUCTIONS
-from helpers import reverse
-from observation import Observation
+from .core import VALID_OBSERVATIONS, VALID_INSTRUCTIONS
+from .exceptions import InvalidChild, ParserException
+from .helpers import reverse
+from .observation import Observation
 
 __all__ = ['parse_text']
 
-ParsedText = namedtuple('ParsedText', ['array', 'shape'])
-
 Index = namedtuple('Index', ['generation', 'child'])
 
-ReifiedResults = namedtuple('ReifiedResults', ['indexed_observations', 'affected_observations', 'commands'])
+Tokens = namedtuple('Tokens', ['indexed_observations', 'affected_observations', 'commands', 'row_columns'])
 
 GenerationMapping = namedtuple('GenerationMapping', ['row', 'column'])
 
 ParsedInput = namedtuple('ParsedInput',
                          ['array', 'indexed_observations', 'shape', 'affected_observations', 'generation_mapping'])
 
-
-def _create_text_array(text):
-    rows = text.split('\n')
-    # Pad out each row to the max len row
-    max_len = max(map(len, rows))
-
-    array = [list(str(row).ljust(max_len, ' ')) for row in rows]
-
-    shape = (len(array), max_len)
-
-    return ParsedText(array, shape)
+# Anything that isn't white space is a token
+_TOKEN = re.compile(r'\S')
 
 
-def _reify_observations(array, typ, valid_observations, valid_instructions):
-    """Reify each element into an Observation
+def _tokenize(lines, typ, valid_observations, valid_instructions):
+    """Reify each observation and collect each instruction in a single pass of each line
 
     Args:
-        array: numpy array
+        lines: A list of lines of text
         typ: the type to reify each valid observation into
         valid_observations: A set of valid observations. Eg 'f' or 'M'
         valid_instructions: A set of valid instructions. Eg, '-' or '|'
 
-    Returns:"""
+    Returns:
+        Tokens, where row_columns is the interval index of the pedigree. For each
+        row, the columns holding an observation in increasing order"""
     indexed_observations = {}
     affected_observations = []
     commands = []
+    row_columns = []
 
-    for row_idx, row in enumerate(array):
-        for column_idx, character in enumerate(row):
+    for row_idx, line in enumerate(lines):
+        columns = []
+        for match in _TOKEN.finditer(line):
+            character, column_idx = match.group(), match.start()
 
             if character in valid_instructions:
                 commands.append((row_idx, column_idx, character))
 
             elif character in valid_observations:
                 observation = typ(character)
-                indexed_observations.update({(row_idx, column_idx): observation})
-                array[row_idx][column_idx] = observation
+                indexed_observations[row_idx, column_idx] = observation
+                columns.append(column_idx)
 
                 if observation.affected:
                     affected_observations.append((row_idx, column_idx))
+        row_columns.append(columns)
 
-    return ReifiedResults(indexed_observations, affected_observations, commands)
+    return Tokens(indexed_observations, affected_observations, commands, row_columns)
 
 
-def _link_partners(array, skip, commands, link_symbol):
+def _link_partners(indexed_observations, commands, link_symbol):
     """Link partners in the pedigree
 
     Args:
-        array: numpy array containing the pedigree information
-        skip: a set of array indexes to skip linking
+        indexed_observations: A mapping of the array index to the observations
         commands: A list of commands itemizing what to link
         link_symbol: The symbol to indicate a link
 
     Returns:
-        skip
+        The set of array indexes of the right hand partners, which aren't children
+        of the family above them
     """
-
+    married_in = set()
     for row, column, instruction in filter(lambda x: x[2] == link_symbol, reversed(commands)):
-        partner_column = column + 1
-        array[row][column - 1].partner = array[row][partner_column]
-        skip.add((row, partner_column))  # Stop partners from being added to
-        # the children of the same mother/father
-    return skip
+        partner, other = indexed_observations.get((row, column - 1)), indexed_observations.get((row, column + 1))
+        if partner is None or other is None:
+            raise ParserException(f'The partner link at {(row, column)} needs an observation either side')
+        partner.partner = other
+        married_in.add((row, column + 1))
+    return married_in
 
 
-def _link_children(array, shape, skip, commands, link_symbol, typ):
+def _link_children(indexed_observations, row_columns, married_in, commands, link_symbol):
     """Link children to parents
 
+    The children of a link are the observations of the row below it, from the
+    column of the link up to the next link of the same row. Right hand partners
+    are skipped unless they are directly below the link.
+
     Args:
-        array: numpy array
-        skip: a set of array indexes to skip
+        indexed_observations: A mapping of the array index to the observations
+        row_columns: The interval index, see _tokenize
+        married_in: The set of array indexes to skip
         commands: A list of commands itemizing what to link
         link_symbol: the symbol to indicate what to link
-        typ: the type of a valid observation
-
-    Returns:
-        skip
     """
+    links = [(row, column) for row, column, instruction in commands if instruction == link_symbol]
 
     # Link children
-    for row, column, instruction in filter(lambda x: x[2] == link_symbol, reversed(commands)):
-        parent = array[row - 1][column]
+    for position in reversed(range(len(links))):
+        row, column = links[position]
+        parent = indexed_observations.get((row - 1, column))
+        if parent is None:
+            raise InvalidChild(f'The child link at {(row, column)} needs an observation above it')
         mother, father = parent.mother_father
+
         child_row = row + 1
-        for child_idx in range(column, shape[1]):
-            if (child_row, child_idx) not in skip or child_idx == column:
-                skip.add((child_row, child_idx))
-                observation = array[child_row][child_idx]
-                if isinstance(observation, typ):
-                    observation.mother = mother
-                    observation.father = father
-    return skip
+        columns = row_columns[child_row] if child_row < len(row_columns) else []
+        start = bisect_left(columns, column)
+        stop = len(columns)
+        if position + 1 < len(links) and links[position + 1][0] == row:
+            stop = bisect_left(columns, links[position + 1][1], start)
+
+        for child_idx in columns[start:stop]:
+            if (child_row, child_idx) not in married_in or child_idx == column:
+                observation = indexed_observations[child_row, child_idx]
+                observation.mother = mother
+                observation.father = father
 
 
-def _create_generation_mapping(indexed_observations):
+def _create_generation_mapping(row_columns):
     """Create individual mappings for generational indexes
      that map row and column values to the array index
 
      Args:
-         indexed_observations: A mapping of the array index to to the observations
+         row_columns: The interval index, see _tokenize
     """
-    generation_rows = dict(enumerate(sorted(set(map(lambda x: x[0], indexed_observations.keys())))))
-    generation_columns = dict(enumerate(sorted(set(map(lambda x: x[1], indexed_observations.keys())))))
+    generation_rows = dict(enumerate(row for row, columns in enumerate(row_columns) if columns))
+    generation_columns = dict(enumerate(sorted(set(column for columns in row_columns for column in columns))))
     return GenerationMapping(generation_rows, generation_columns)
 
 
@@ -131,62 +139,63 @@ def _add_generation_index(indexed_observations, generation_rows, generation_colu
         generation_rows: A mapping from array index row to generation index row
         generation_columns: A mapping from array index column to generation row
     """
-    # generation_rows = dict(reverse(generation_rows))
-    # generation_columns = dict(reverse(generation_columns))
     generation_rows, generation_columns = reverse(generation_rows), reverse(generation_columns)
     for (row, column), observation in indexed_observations.items():
         observation.generation = (generation_rows[row], generation_columns[column])
 
 
-def parse_text(text):
-    array, shape = _create_text_array(text)
+def _create_array(lines, width, indexed_observations):
+    """The padded grid a Pedigree is indexed and displayed with, holding the
+    observations in place of their symbols"""
+    array = [list(line.ljust(width, ' ')) for line in lines]
+    for (row, column), observation in indexed_observations.items():
+        array[row][column] = observation
+    return array
 
-    # Used to indicate that subsequent operations on each observation
-    # should be skipped
-    skip = set()
 
-    # Instantiate Observation instances form the array
-    reified_result = _reify_observations(
-        array=array,
+def parse_text(text):
+    lines = text.split('\n')
+    shape = (len(lines), max(map(len, lines)))
+
+    # Instantiate Observation instances from each line
+    tokens = _tokenize(
+        lines=lines,
         typ=Observation,
         valid_observations=VALID_OBSERVATIONS,
         valid_instructions=VALID_INSTRUCTIONS
     )
 
     # Create the partner relationships between observations
-    skip = _link_partners(
-        array=array,
-        skip=skip,
-        commands=reified_result.commands,
+    married_in = _link_partners(
+        indexed_observations=tokens.indexed_observations,
+        commands=tokens.commands,
         link_symbol='-'
     )
 
     # Create the children relationships between observations
     _link_children(
-        array=array,
-        shape=shape,
-        skip=skip,
-        commands=reified_result.commands,
+        indexed_observations=tokens.indexed_observations,
+        row_columns=tokens.row_columns,
+        married_in=married_in,
+        commands=tokens.commands,
         link_symbol='|',
-        typ=Observation,
     )
 
     # A generation index is designed to indexes that correspond to 'Third generation fourth child'
     generation_mapping = _create_generation_mapping(
-        indexed_observations=reified_result.indexed_observations
+        row_columns=tokens.row_columns
     )
 
     # Add each observations generation to the observation so that the observation
     # knows where it sits in the pedigree
     _add_generation_index(
-        indexed_observations=reified_result.indexed_observations,
+        indexed_observations=tokens.indexed_observations,
         generation_rows=generation_mapping.row,
         generation_columns=generation_mapping.column
     )
 
-    return ParsedInput(array=array,
+    return ParsedInput(array=_create_array(lines, shape[1], tokens.indexed_observations),
                        shape=shape,
-                       indexed_observations=reified_result.indexed_observations,
-
-                       affected_observations=reified_result.affected_observations,
+                       indexed_observations=tokens.indexed_observations,
+                       affected_observations=tokens.affected_observations,
                        generation_mapping=generation_mapping)
@@ -0,0 +1,247 @@
+from array import array
+from collections import namedtuple
+from itertools import count
+
+from .core import FEMALE, MALE
+from .exceptions import InvalidObservation, ParserException
+from .numeric import EXACT
+from .pedigree import Pedigree
+from .reader import open_text
+from .store import MISSING, PedigreeStore, SEXES
+
+__all__ = ['PedFamily', 'read_ped', 'read_ped_stores', 'write_ped']
+
+# The codes of the sex and phenotype columns of a PED file. An unknown sex (0) is
+# taken from the individual's role as a parent, an unknown phenotype (0 or -9) is
+# an unobserved individual.
+_SEXES = {'1': MALE, '2': FEMALE, '0': None}
+_PHENOTYPES = {'1': False, '2': True, '0': None, '-9': None}
+_UNKNOWN_PARENT = '0'
+_AFFECTED_CODES = {0: '1', 1: '2', MISSING: '0'}
+
+# A family of a PED file, individuals is the PED ID of each individual indexed by
+# its ID in the pedigree
+PedFamily = namedtuple('PedFamily', ['family', 'pedigree', 'individuals'])
+
+
+def _rows(parents, lines):
+    """The generation row of each individual. A child is a row below its lowest
+    parent and a founder sits a row above its highest child."""
+    rows = [None] * len(parents)
+
+    for individual in range(len(parents)):
+        path = [individual]
+        while path:
+            current = path[-1]
+            pending = [parent for parent in parents[current] if parent != MISSING and rows[parent] is None]
+            if not pending:
+                rows[current] = 1 + max((rows[parent] for parent in parents[current] if parent != MISSING),
+                                        default=-1)
+                path.pop()
+            elif pending[0] in path:
+                raise ParserException(f'line {lines[current]}: an individual is their own ancestor')
+            else:
+                path.append(pending[0])
+
+    children = [[] for _ in parents]
+    for child, (mother, father) in enumerate(parents):
+        for parent in (mother, father):
+            if parent != MISSING:
+                children[parent].append(child)
+    for individual, (mother, father) in enumerate(parents):
+        if mother == MISSING and father == MISSING and children[individual]:
+            rows[individual] = min(rows[child] for child in children[individual]) - 1
+    offset = min(rows, default=0)
+    return [row - offset for row in rows]
+
+
+def _sexes(records, parents):
+    """The sex of each individual. An unknown sex is taken from the individual's
+    role as a mother or father, a parent listed with the other sex is an error."""
+    sexes = [record[4] for record in records]
+    for (line, *_), child_parents in zip(records, parents):
+        for parent, sex in zip(child_parents, (FEMALE, MALE)):
+            if parent == MISSING:
+                continue
+            if sexes[parent] is None:
+                sexes[parent] = sex
+            elif sexes[parent] != sex:
+                role = {FEMALE: 'mother', MALE: 'father'}[sex]
+                raise ParserException(f'line {line}: the {role} {records[parent][1]} is not '
+                                      f'{sex.lower()} (line {records[parent][0]})')
+    for (line, individual, *_), sex in zip(records, sexes):
+        if sex is None:
+            raise InvalidObservation(f'line {line}: the sex of {individual} is unknown (0) and they are not a parent')
+    return sexes
+
+
+def _family_store(records):
+    """Build the store of a family from its (line number, individual, father, mother,
+    sex, affected) records, ordered by generation index
+
+    Returns: tuple of the PedigreeStore and the PED ID of each individual"""
+    index = {}
+    for position, (line, individual, *_) in enumerate(records):
+        if individual in index:
+            raise ParserException(f'line {line}: individual {individual} is listed twice')
+        index[individual] = position
+
+    def lookup(line, individual):
+        if individual == _UNKNOWN_PARENT:
+            return MISSING
+        if individual not in index:
+            raise ParserException(f'line {line}: parent {individual} is not in the family')
+        return index[individual]
+
+    parents = [(lookup(line, mother), lookup(line, father)) for line, _, father, mother, *_ in records]
+    sexes = _sexes(records, parents)
+    rows = _rows(parents, [record[0] for record in records])
+
+    # Individuals are numbered in generation index order, each row in file order
+    order = sorted(range(len(records)), key=lambda position: (rows[position], position))
+    identity = {position: new for new, position in enumerate(order)}
+    renumber = lambda position: MISSING if position == MISSING else identity[position]
+    columns = {}
+    column = []
+    for position in order:
+        column.append(columns.get(rows[position], 0))
+        columns[rows[position]] = column[-1] + 1
+
+    partner = [MISSING] * len(records)
+    for mother, father in parents:
+        if mother != MISSING and father != MISSING:
+            partner[identity[mother]], partner[identity[father]] = identity[father], identity[mother]
+
+    store = PedigreeStore(
+        sex=array('b', (SEXES.index(sexes[position]) for position in order)),
+        affected=array('b', (MISSING if records[position][5] is None else records[position][5]
+                             for position in order)),
+        mother=array('i', (renumber(parents[position][0]) for position in order)),
+        father=array('i', (renumber(parents[position][1]) for position in order)),
+        partner=array('i', partner),
+        row=array('i', (rows[position] for position in order)),
+        column=array('i', column),
+    )
+    return store, [records[position][1] for position in order]
+
+
+def _record(line, fields):
+    """The (line number, individual, father, mother, sex, affected) record of the
+    fields of a line. Columns after the sixth (Eg. marker genotypes) are ignored."""
+    if len(fields) < 6:
+        raise ParserException(f'line {line}: expected 6 columns, found {len(fields)}')
+    _, individual, father, mother, sex, phenotype = fields[:6]
+    if sex not in _SEXES:
+        raise InvalidObservation(f'line {line}: sex must be 1 (male), 2 (female) or 0 (unknown), found {sex!r}')
+    if phenotype not in _PHENOTYPES:
+        raise InvalidObservation(f'line {line}: phenotype must be 1 (unaffected), 2 (affected) or 0 or -9 '
+                                 f'(unknown), found {phenotype!r}')
+    return line, individual, father, mother, _SEXES[sex], _PHENOTYPES[phenotype]
+
+
+def _records(f):
+    """Split each line of a PED file into (family, line number, record), skipping
+    blank lines and comments. The record of a line that can't be read is its
+    ParserException."""
+    for line, text in enumerate(f, 1):
+        fields = text.split()
+        if not fields or fields[0].startswith('#'):
+            continue
+        try:
+            yield fields[0], line, _record(line, fields)
+        except ParserException as error:
+            yield fields[0], line, error
+
+
+def _family(family, records):
+    for record in records:
+        if isinstance(record, ParserException):
+            raise record
+    return (family,) + _family_store(records)
+
+
+def read_ped_stores(file, errors=False):
+    """Read each family of a PED file as a PedigreeStore, one family at a time.
+
+    The lines of a family must be contiguous, as PED files are normally written.
+    Only the current family is held in memory.
+
+    Args:
+        file: A file name, reader.STDIN or an open text file
+        errors: If True a family that can't be read is yielded as (family ID,
+            ParserException, None) and reading carries on with the next family,
+            otherwise the exception is raised
+
+    Returns: generator of (family ID, PedigreeStore, PED ID of each individual)
+    """
+    def family_store(family, records):
+        try:
+            return _family(family, records)
+        except ParserException as error:
+            if not errors:
+                raise
+            return family, error, None
+
+    seen = set()
+    family, records = None, []
+    with open_text(file) as f:
+        for record_family, line, record in _records(f):
+            if record_family != family:
+                if records:
+                    yield family_store(family, records)
+                family, records = record_family, []
+                if record_family in seen:
+                    records.append(ParserException(f'line {line}: the lines of family {record_family} '
+                                                   f'are not together'))
+                seen.add(record_family)
+            records.append(record)
+        if records:
+            yield family_store(family, records)
+
+
+def read_ped(file, backend=EXACT):
+    """Read each family of a PED file (family, individual, father, mother, sex,
+    phenotype) as a Pedigree, one family at a time.
+
+    Sex is 1 for male and 2 for female, phenotype is 1 for unaffected and 2 for
+    affected. A parent of 0 is unknown. Generation indexes are assigned so that
+    each child is below its parents.
+
+    A phenotype of 0 or -9 is missing, the individual is kept as unobserved. A
+    sex of 0 is unknown, which is only allowed for a parent, whose sex is then
+    taken from whether they are listed as a mother or father. Every mode of
+    inheritance depends on sex, so any other individual of unknown sex raises
+    InvalidObservation. A mother who isn't female or a father who isn't male
+    raises ParserException.
+
+    Args:
+        file: A file name, reader.STDIN or an open text file
+        backend: The numeric backend of each Pedigree
+
+    Returns: generator of PedFamily
+    """
+    for family, store, individuals in read_ped_stores(file):
+        yield PedFamily(family, Pedigree.from_store(store, backend), individuals)
+
+
+def write_ped(file, pedigrees, families=None):
+    """Write pedigrees to a PED file, one at a time
+
+    Args:
+        file: A file name or an open text file
+        pedigrees: An iterable of Pedigrees
+        families: An iterable of family IDs, defaults to counting from 1.
+            Individuals are numbered from 1 within each family
+    """
+    if isinstance(file, str):
+        with open(file, 'w') as f:
+            return write_ped(f, pedigrees, families)
+
+    codes = {MALE: '1', FEMALE: '2'}
+    ped_id = lambda individual: _UNKNOWN_PARENT if individual == MISSING else str(individual + 1)
+    for family, pedigree in zip(families if families is not None else map(str, count(1)), pedigrees):
+        store = pedigree.store
+        for individual in range(len(store.sex)):
+            file.write(' '.join((family, ped_id(individual), ped_id(store.father[individual]),
+                                 ped_id(store.mother[individual]), codes[SEXES[store.sex[individual]]],
+                                 _AFFECTED_CODES[store.affected[individual]])) + '\n')
@@ -1,7 +1,15 @@
-from genetics.parser import parse_text
-from helpers import horizontal_index
-from helpers import reverse
-from helpers import vertical_index
+from bisect import insort
+
+from .core import collapse_phase, VALID_OBSERVATIONS
+from .exceptions import InvalidState, NonMendelianPattern
+from .parser import parse_text
+from .helpers import horizontal_index
+from .helpers import reverse
+from .helpers import vertical_index
+from .numeric import EXACT
+from .observation import Observation
+from .peeling import has_loop, peel_all
+from .store import from_store, MISSING, store_graph, to_store
 
 __all__ = ['Pedigree']
 
@@ -27,12 +35,38 @@ class Pedigree(object):
         column_map = reverse(self._columns)
         return tuple((row_map[row], column_map[column]) for row, column in self._affected)
 
+    @property
+    def observations(self):
+        """Every observation in generation index order"""
+        return sorted(self._indexed_observations.values(), key=lambda observation: observation.generation)
+
+    @property
+    def store(self):
+        """The columns of every observation, an observation's ID is its position in
+        generation index order"""
+        if self._store is None:
+            self._store = to_store(self.observations)
+        return self._store
+
+    @property
+    def graph(self):
+        """The FamilyGraph of the pedigree, built from the store"""
+        if self._graph is None:
+            self._graph = store_graph(self.store)
+        return self._graph
+
+    @property
+    def generations(self):
+        """The generation index of every observation, indexed by ID"""
+        return list(zip(self.store.row, self.store.column))
+
     @property
     def roots(self):
         return tuple(observation for observation in self._indexed_observations.values()
                      if observation.root)
 
-    def __init__(self, text):
+    def __init__(self, text, backend=EXACT):
+        self.backend = backend
         parsed_input = parse_text(text)
         self._array = parsed_input.array
         self._shape = parsed_input.shape
@@ -40,14 +74,145 @@ class Pedigree(object):
         self._affected = parsed_input.affected_observations
         self._rows = parsed_input.generation_mapping.row
         self._columns = parsed_input.generation_mapping.column
+        self._store = None
+        self._graph = None
+        self._peelers = {}
+        self._ids = None
 
     def __getitem__(self, index):
         row, column = index
         return self._array[self._rows[row]][self._columns[column]]
 
     def __setitem__(self, key, value):
+        """Change the affection status of an observation, Eg. p[1, 1] = 'M'.
+
+        The observation and its links are kept, so any inference so far is updated
+        rather than started again. Other edits (a change of gender, or adding or
+        removing an observation or a line) change the structure of the pedigree,
+        which needs the changed drawing to be parsed as a new Pedigree.
+
+        Raises: InvalidState for any edit other than a change of affection status
+        """
         row, column = key
-        self._array[self._rows[row]][self._columns[column]] = value
+        index = (self._rows[row], self._columns[column])
+        current = self._array[index[0]][index[1]]
+        if not (isinstance(current, Observation) and value in VALID_OBSERVATIONS and
+                value.lower() == current.symbol.lower()):
+            raise InvalidState(f'Only the affection status of an observation can be changed, not '
+                               f'{str(current)!r} to {value!r} at {key}. Parse the changed drawing as a new Pedigree.')
+
+        from .genotype_analysis import SUBTREE_CACHE
+        SUBTREE_CACHE.invalidate(current)
+        current.symbol = value
+        current.observed = True
+        if index in self._affected:
+            self._affected.remove(index)
+        if current.affected:
+            insort(self._affected, index)
+        for peeler in self._peelers.values():
+            peeler.set_phenotype(self._id(key), value)
+        self._store = None
+        self._graph = None
+
+    def _id(self, index):
+        if self._ids is None:
+            self._ids = {generation: identity for identity, generation in enumerate(self.generations)}
+        return self._ids[tuple(index)]
+
+    def peeler(self, mode, backend=None, unordered=False):
+        """The peeler of a mode, kept so that a change through __setitem__ only
+        passes the messages that depend on it again
+
+        Args:
+            mode: The mode of inheritance
+            backend: The numeric backend, defaults to the backend of the pedigree
+            unordered: Peel over genotypes without phase, see peeling.peel
+
+        Returns: incremental.IncrementalPeeler, or junction.JunctionPeeler for a pedigree with a loop
+        """
+        backend = backend or self.backend
+        if (mode, backend, unordered) not in self._peelers:
+            if has_loop(self.graph):
+                from .junction import JunctionPeeler as engine
+            else:
+                from .incremental import IncrementalPeeler as engine
+            self._peelers[mode, backend, unordered] = engine(mode, self.graph, backend, unordered)
+        return self._peelers[mode, backend, unordered]
+
+    def posteriors(self, mode, backend=None, cache=None, unordered=False):
+        """Calculate the genotype probabilities of every observation in a single pass.
+
+        The messages passed are kept, so after a change of affection status through
+        __setitem__ only the messages that depend on it are passed again.
+
+        Args:
+            mode: The mode of inheritance
+            backend: The numeric backend, defaults to the backend of the pedigree
+            cache: An optional cache.ResultCache to look the result up in
+            unordered: Peel over genotypes without phase, see peeling.peel. Cached
+                results are ordered and merged with core.collapse_phase instead
+
+        Returns: dict of generation index -> dict of genotype probabilities
+        """
+        backend = backend or self.backend
+        if cache is None:
+            return dict(zip(self.generations, self.peeler(mode, backend, unordered).peeled().genotypes))
+        peeled, = peel_all([(mode, self.graph)], backend=backend, cache=cache)
+        if peeled is None:
+            raise NonMendelianPattern(f'The observed phenotypes are not valid given a {mode} mode of inheritance.')
+        genotypes = map(collapse_phase, peeled.genotypes) if unordered else peeled.genotypes
+        return dict(zip(self.generations, genotypes))
+
+    def posterior(self, mode, index, backend=None):
+        """Calculate the genotype probabilities of a single observation. After a change
+        through __setitem__ this only passes the messages between the two observations.
+
+        Args:
+            mode: The mode of inheritance
+            index: The generation index of the observation
+            backend: The numeric backend, defaults to the backend of the pedigree
+
+        Returns: dict of genotype probabilities
+        """
+        return self.peeler(mode, backend).posterior(self._id(index))
+
+    def likelihood(self, mode, backend=None):
+        """The probability of the observed phenotypes given the mode of inheritance.
+        After a change through __setitem__ this only passes the messages towards the
+        changed observation.
+
+        Args:
+            mode: The mode of inheritance
+            backend: The numeric backend, defaults to the backend of the pedigree. LOG
+                and NUMPY likelihoods are natural logarithms
+
+        Returns: The likelihood, zero when the pedigree is not valid for the mode
+        """
+        return self.peeler(mode, backend).likelihood
+
+    def sample(self, mode, **options):
+        """Estimate the genotype probabilities of every observation by Monte Carlo,
+        see sampler.sample for the options. Needs numpy.
+
+        Args:
+            mode: The mode of inheritance
+
+        Returns: sampler.Sampled, with genotypes and standard_errors keyed by generation index
+        """
+        from . import sampler
+        sampled = sampler.sample(mode, self.graph, **options)
+        generations = self.generations
+        return sampled._replace(genotypes=dict(zip(generations, sampled.genotypes)),
+                                standard_errors=dict(zip(generations, sampled.standard_errors)))
+
+    def save(self, file):
+        """Write the pedigree to a binary archive, see binary
+
+        Args:
+            file: A file name
+        """
+        from .binary import save_stores
+        save_stores(file, [self.store])
 
     def __repr__(self):
         """Create a nice console display
@@ -67,6 +232,67 @@ class Pedigree(object):
                f'{result}'
 
     @classmethod
-    def from_file(cls, file):
+    def from_store(cls, store, backend=EXACT):
+        """Create a pedigree from its columns, without parsing any text
+
+        Args:
+            store: PedigreeStore where every individual has a generation index
+            backend: The numeric backend
+
+        Returns: Pedigree
+        """
+        if MISSING in store.row or MISSING in store.column:
+            raise InvalidState('Every individual needs a generation index')
+        observations = from_store(store)
+        rows = sorted(set(store.row))
+        columns = sorted(set(store.column))
+
+        # Lay the observations out on a grid with a gap between each generation index
+        # so that the display reads like a parsed pedigree
+        pedigree = cls.__new__(cls)
+        pedigree.backend = backend
+        pedigree._rows = {row: 2 * position for position, row in enumerate(rows)}
+        pedigree._columns = {column: 2 * position for position, column in enumerate(columns)}
+        pedigree._shape = (2 * len(rows) - 1, 2 * len(columns) - 1) if observations else (0, 0)
+        pedigree._array = [[' '] * pedigree._shape[1] for _ in range(pedigree._shape[0])]
+        pedigree._indexed_observations = {}
+        pedigree._affected = []
+        for observation in observations:
+            row, column = observation.generation
+            index = (pedigree._rows[row], pedigree._columns[column])
+            pedigree._array[index[0]][index[1]] = observation
+            pedigree._indexed_observations[index] = observation
+            if observation.affected:
+                pedigree._affected.append(index)
+            if observation.partner is not None:
+                (row, left), (partner_row, right) = sorted((observation.generation, observation.partner.generation),
+                                                           key=lambda x: x[1])
+                if row == partner_row and pedigree._columns[right] - pedigree._columns[left] == 2:
+                    pedigree._array[pedigree._rows[row]][pedigree._columns[left] + 1] = '-'
+
+        # The store was built in generation index order, so it can be kept
+        pedigree._store = store if list(zip(store.row, store.column)) == sorted(zip(store.row, store.column)) else None
+        pedigree._graph = None
+        pedigree._peelers = {}
+        pedigree._ids = None
+        return pedigree
+
+    @classmethod
+    def load(cls, file, index=0, backend=EXACT):
+        """Read a pedigree from a binary archive, see binary.Archive to map a large
+        archive without reading it
+
+        Args:
+            file: A file name
+            index: The position of the pedigree in the archive
+            backend: The numeric backend
+
+        Returns: Pedigree
+        """
+        from .binary import load_store
+        return cls.from_store(load_store(file, index), backend)
+
+    @classmethod
+    def from_file(cls, file, backend=EXACT):
         with open(file, 'r') as f:
-            return cls(f.read())
+            return cls(f.read(), backend)
@@ -0,0 +1,458 @@
+import os
+from collections import namedtuple
+from functools import partial
+from itertools import product
+
+from .core import collapse_phase, FEMALE, MALE
+from .core import FOUNDER_PRIORS, GENOTYPE_INDEX, UNORDERED_INDEX
+from .core import TRANSITION_TABLE
+from .core import observable_genotypes
+from .exceptions import InvalidState, NonMendelianPattern
+from .numeric import BACKENDS, EXACT, NUMPY
+
+__all__ = ['all_genotypes_n_mode', 'CHILD_TRANSITIONS', 'child_transitions', 'family_graph', 'family_messages',
+           'FamilyGraph', 'has_loop', 'local_probabilities', 'map_units', 'message_product', 'normalize_message',
+           'nuclear_families', 'peel', 'peel_all', 'peel_unit', 'Peeled', 'peeling_schedule', 'unobserved_parents']
+
+FamilyGraph = namedtuple('FamilyGraph', ['genders', 'phenotypes', 'mothers', 'fathers'])
+
+Family = namedtuple('Family', ['mother', 'father', 'children'])
+
+Peeled = namedtuple('Peeled', ['genotypes', 'likelihood'])
+
+
+def _states(mode, gender, unordered=False):
+    """The genotypes an individual is summed over, see core.UNORDERED_INDEX"""
+    return (UNORDERED_INDEX if unordered else GENOTYPE_INDEX)[mode, gender]
+
+
+def child_transitions(backend, mode, gender, unordered=False):
+    """Punnet squares for a child of a known gender. Each cross is restricted
+    to the genotypes of that gender and renormalized, as the gender of every
+    child is observed. Unordered crosses are between unordered parents, with the
+    phase of each child merged.
+
+    Returns: dict with keys in the form of (mother, father) genotype
+    """
+    number = BACKENDS[backend].number
+    states = _states(mode, gender, unordered)
+    result = {}
+    for pair in product(_states(mode, FEMALE, unordered), _states(mode, MALE, unordered)):
+        children = collapse_phase(TRANSITION_TABLE[pair]) if unordered else TRANSITION_TABLE[pair]
+        children = {genotype: probability for genotype, probability in children.items() if genotype in states}
+        total = sum(children.values())
+        result[pair] = {genotype: number(probability / total) for genotype, probability in children.items()}
+    return result
+
+
+class _ChildTransitions(dict):
+    """The child_transitions of each (backend, mode, gender, unordered), worked out
+    on first use so that a process only builds the tables of the backends it selects"""
+
+    def __missing__(self, key):
+        self[key] = child_transitions(*key)
+        return self[key]
+
+
+CHILD_TRANSITIONS = _ChildTransitions()
+
+
+def _connected(observations):
+    """Collect every observation reachable from the supplied observations,
+    the supplied observations first and in order"""
+    seen = {id(observation) for observation in observations}
+    result = list(observations)
+    stack = list(observations)
+    while stack:
+        observation = stack.pop()
+        for relative in (observation.mother, observation.father, observation.partner) + tuple(observation.children):
+            if relative is not None and id(relative) not in seen:
+                seen.add(id(relative))
+                result.append(relative)
+                stack.append(relative)
+    return result
+
+
+def family_graph(observations):
+    """Flatten the observation graph into integer indexed columns.
+
+    The supplied observations keep their position, any other connected observation
+    is appended after them. A missing parent is replaced with an unobserved individual
+    (phenotype of None) shared by all children of the known parent.
+
+    Args:
+        observations: An iterable of Observations
+
+    Returns: FamilyGraph
+    """
+    observations = _connected(list(observations))
+    index = {id(observation): position for position, observation in enumerate(observations)}
+    return unobserved_parents(
+        genders=[observation.gender for observation in observations],
+        phenotype=[observation.phenotype for observation in observations],
+        mothers=[index.get(id(observation.mother)) for observation in observations],
+        fathers=[index.get(id(observation.father)) for observation in observations],
+    )
+
+
+def unobserved_parents(genders, phenotype, mothers, fathers):
+    """Replace each missing parent with an unobserved individual shared by all
+    children of the known parent.
+
+    Args:
+        genders: list of genders
+        phenotype: list of observed phenotypes
+        mothers: list of mother indexes, None where unknown
+        fathers: list of father indexes, None where unknown
+
+    Returns: FamilyGraph
+    """
+    genders, phenotype, mothers, fathers = list(genders), list(phenotype), list(mothers), list(fathers)
+    unobserved = {}
+    for child in range(len(genders)):
+        mother, father = mothers[child], fathers[child]
+        if mother is None and father is None:
+            continue
+        for parents, gender, known in ((mothers, FEMALE, father), (fathers, MALE, mother)):
+            if parents[child] is None:
+                if known not in unobserved:
+                    unobserved[known] = len(genders)
+                    genders.append(gender)
+                    phenotype.append(None)
+                    mothers.append(None)
+                    fathers.append(None)
+                parents[child] = unobserved[known]
+
+    return FamilyGraph(tuple(genders), tuple(phenotype), tuple(mothers), tuple(fathers))
+
+
+def nuclear_families(graph):
+    """The Family of each pair of parents, in order of their first child"""
+    families = {}
+    for child, parents in enumerate(zip(graph.mothers, graph.fathers)):
+        if parents != (None, None):
+            families.setdefault(parents, []).append(child)
+    return [Family(mother, father, tuple(children)) for (mother, father), children in families.items()]
+
+
+def has_loop(graph, families=None):
+    """Whether the individual-family graph has a cycle, Eg. a marriage between
+    cousins. A family closes a cycle when two of its members are already joined."""
+    joined = list(range(len(graph.genders)))
+
+    def find(individual):
+        while joined[individual] != individual:
+            joined[individual] = joined[joined[individual]]
+            individual = joined[individual]
+        return individual
+
+    for family in families if families is not None else nuclear_families(graph):
+        roots = {find(member) for member in (family.mother, family.father) + family.children}
+        if len(roots) < 2 + len(family.children):
+            return True
+        first = roots.pop()
+        for root in roots:
+            joined[root] = first
+    return False
+
+
+def local_probabilities(backend, mode, graph, individual, unordered=False):
+    """The founder prior multiplied by the phenotype evidence of an individual"""
+    number = BACKENDS[backend].number
+    gender = graph.genders[individual]
+    if graph.mothers[individual] is None:
+        prior = {genotype: number(probability) for genotype, probability
+                 in FOUNDER_PRIORS[mode, gender, unordered].items()}
+    else:
+        prior = dict.fromkeys(_states(mode, gender, unordered), number(1))
+    observed = graph.phenotypes[individual]
+    if observed is None:
+        return prior
+    observable = observable_genotypes(mode, observed)
+    return {genotype: probability if genotype in observable else 0 for genotype, probability in prior.items()}
+
+
+def normalize_message(message):
+    """Scale genotype probabilities to sum to 1
+
+    Returns: tuple of the scaled message and the total it was divided by, a message
+    that sums to 0 is returned as is"""
+    total = sum(message.values())
+    if total == 0:
+        return message, total
+    return {genotype: probability / total for genotype, probability in message.items()}, total
+
+
+def message_product(local, messages):
+    """Multiply local genotype probabilities by each message, genotype by genotype"""
+    result = dict(local)
+    for message in messages:
+        for genotype in result:
+            result[genotype] *= message[genotype]
+    return result
+
+
+def family_messages(backend, mode, graph, family, incoming, targets, unordered=False):
+    """Sum out a nuclear family for each of the target members.
+
+    Args:
+        backend: The numeric backend
+        mode: The mode of inheritance
+        graph: FamilyGraph
+        family: Family
+        incoming: dict of member -> genotype probabilities sent to the family
+        targets: The members to create messages for
+        unordered: Sum over unordered genotypes, see core.UNORDERED_INDEX
+
+    Returns: dict of member -> genotype probabilities
+    """
+    mother_states = _states(mode, FEMALE, unordered)
+    father_states = _states(mode, MALE, unordered)
+    pairs = [(m_genotype, f_genotype) for m_genotype in mother_states for f_genotype in father_states]
+
+    # How well each parent combination explains each child
+    explained = []
+    for child in family.children:
+        transitions = CHILD_TRANSITIONS[backend, mode, graph.genders[child], unordered]
+        message = incoming.get(child)
+        explained.append({
+            pair: sum(probability * (1 if message is None else message[genotype])
+                      for genotype, probability in transitions[pair].items())
+            for pair in pairs
+        })
+
+    # Leave one child out products, without division so zeros are safe
+    n = len(explained)
+    prefix = [dict.fromkeys(pairs, 1)]
+    for child_explained in explained:
+        prefix.append({pair: prefix[-1][pair] * child_explained[pair] for pair in pairs})
+    suffix = [dict.fromkeys(pairs, 1)]
+    for child_explained in reversed(explained):
+        suffix.append({pair: suffix[-1][pair] * child_explained[pair] for pair in pairs})
+    suffix.reverse()
+
+    mother_message = incoming.get(family.mother)
+    father_message = incoming.get(family.father)
+
+    def parent_weight(pair):
+        m_genotype, f_genotype = pair
+        return (1 if mother_message is None else mother_message[m_genotype]) * \
+               (1 if father_message is None else father_message[f_genotype])
+
+    positions = {child: position for position, child in enumerate(family.children)}
+    messages = {}
+    for target in targets:
+        if target == family.mother:
+            message = dict.fromkeys(mother_states, 0)
+            for m_genotype, f_genotype in pairs:
+                message[m_genotype] += prefix[n][m_genotype, f_genotype] * \
+                                       (1 if father_message is None else father_message[f_genotype])
+        elif target == family.father:
+            message = dict.fromkeys(father_states, 0)
+            for m_genotype, f_genotype in pairs:
+                message[f_genotype] += prefix[n][m_genotype, f_genotype] * \
+                                       (1 if mother_message is None else mother_message[m_genotype])
+        else:
+            position = positions[target]
+            transitions = CHILD_TRANSITIONS[backend, mode, graph.genders[target], unordered]
+            message = dict.fromkeys(_states(mode, graph.genders[target], unordered), 0)
+            for pair in pairs:
+                weight = parent_weight(pair) * prefix[position][pair] * suffix[position + 1][pair]
+                if weight:
+                    for genotype, probability in transitions[pair].items():
+                        message[genotype] += weight * probability
+        messages[target] = message
+    return messages
+
+
+def peeling_schedule(graph, families):
+    """Order the individual-family tree so that messages can be passed from the
+    leaves to a root and back again.
+
+    Returns: tuple of the families of each individual, a list of (family, member towards
+    the root) in leaf to root order and the root of each connected component
+    """
+    membership = [[] for _ in graph.genders]
+    for position, family in enumerate(families):
+        for member in (family.mother, family.father) + family.children:
+            membership[member].append(position)
+
+    visited_individuals = set()
+    visited_families = set()
+    order = []
+    roots = []
+    for root in range(len(graph.genders)):
+        if root in visited_individuals:
+            continue
+        visited_individuals.add(root)
+        roots.append(root)
+        stack = [root]
+        while stack:
+            individual = stack.pop()
+            for position in membership[individual]:
+                if position in visited_families:
+                    continue
+                visited_families.add(position)
+                order.append((position, individual))
+                family = families[position]
+                for member in (family.mother, family.father) + family.children:
+                    if member == individual:
+                        continue
+                    if member in visited_individuals:
+                        raise InvalidState('The pedigree contains a loop, an individual is reachable '
+                                           'through more than one family.')
+                    visited_individuals.add(member)
+                    stack.append(member)
+    order.reverse()
+    return membership, order, roots
+
+
+def peel(mode, graph, backend=EXACT, unordered=False):
+    """Calculate the genotype probabilities of every individual in a family graph.
+
+    Elston-Stewart style peeling. Messages are passed from the leaves of the
+    individual-family tree to a root and back again, so each nuclear family is
+    summed out twice regardless of which individuals are of interest. A pedigree
+    with a loop isn't a tree, it is peeled over its junction tree instead, see junction.
+
+    Args:
+        mode: The mode of inheritance
+        graph: FamilyGraph
+        backend: The numeric backend, EXACT, FLOAT, LOG or NUMPY
+        unordered: Sum over genotypes without phase, Eg. Aa for both aA and Aa, which
+            leaves 3 autosomal states rather than 4. The result is the same as merging
+            the ordered genotypes with core.collapse_phase
+
+    Returns: Peeled of the genotype probabilities for each individual and the
+    likelihood of the observed phenotypes, a natural logarithm for the LOG and NUMPY backends
+    """
+    families = nuclear_families(graph)
+    if has_loop(graph, families):
+        from . import junction
+        return junction.peel(mode, graph, backend, unordered=unordered)
+    if backend == NUMPY:
+        # Only pay for importing numpy when it is asked for. The arrays are laid out
+        # over ordered genotypes, so phase is merged afterwards.
+        from . import vectorized
+        peeled = vectorized.peel(mode, graph)
+        return peeled._replace(genotypes=list(map(collapse_phase, peeled.genotypes))) if unordered else peeled
+
+    membership, order, roots = peeling_schedule(graph, families)
+    local = [local_probabilities(backend, mode, graph, individual, unordered)
+             for individual in range(len(graph.genders))]
+
+    # family -> individual messages
+    received = [{} for _ in graph.genders]
+
+    def to_family(individual, position):
+        return message_product(local[individual], (message for source, message in received[individual].items()
+                                            if source != position))
+
+    # Leaves to root. Impossibility is checked on each normalizing constant
+    # rather than the likelihood, as the FLOAT likelihood may underflow.
+    totals = []
+    for position, towards in order:
+        family = families[position]
+        incoming = {member: to_family(member, position)
+                    for member in (family.mother, family.father) + family.children if member != towards}
+        message, total = normalize_message(family_messages(backend, mode, graph, family, incoming, [towards],
+                                                     unordered)[towards])
+        totals.append(total)
+        if total == 0:
+            break
+        received[towards][position] = message
+    else:
+        totals.extend(sum(message_product(local[root], received[root].values()).values()) for root in roots)
+
+    if 0 in totals:
+        raise NonMendelianPattern(f'The observed phenotypes are not valid given a {mode} mode of inheritance.')
+
+    # Root to leaves
+    for position, towards in reversed(order):
+        family = families[position]
+        members = (family.mother, family.father) + family.children
+        incoming = {member: to_family(member, position) for member in members}
+        targets = [member for member in members if member != towards]
+        for target, message in family_messages(backend, mode, graph, family, incoming, targets, unordered).items():
+            received[target][position] = normalize_message(message)[0]
+
+    numeric = BACKENDS[backend]
+    likelihood = numeric.one
+    for total in totals:
+        likelihood = numeric.scale(likelihood, total)
+
+    genotypes = []
+    for individual in range(len(graph.genders)):
+        belief, _ = normalize_message(message_product(local[individual], received[individual].values()))
+        genotypes.append({genotype: probability for genotype, probability in belief.items() if probability != 0})
+    return Peeled(genotypes, likelihood)
+
+
+def peel_unit(unit, backend):
+    """Peel a (mode, FamilyGraph), None if it is not valid for its mode"""
+    mode, graph = unit
+    try:
+        return peel(mode, graph, backend)
+    except NonMendelianPattern:
+        return None
+
+
+def map_units(function, units, workers=1):
+    """Apply a function to every unit, in this process or over a process pool.
+
+    Args:
+        function: A picklable function of one unit
+        units: A list of units
+        workers: The number of processes, 1 runs in this process and None uses
+            every CPU
+
+    Returns: list of results in the order of the units
+    """
+    if workers == 1 or len(units) < 2:
+        return [function(unit) for unit in units]
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count()
+    # A few chunks per worker keeps the pool busy without paying for a round trip per unit
+    chunksize = max(1, len(units) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, units, chunksize=chunksize))
+
+
+def peel_all(units, workers=1, backend=EXACT, cache=None):
+    """Peel many independent (mode, FamilyGraph) work units.
+
+    With more than one worker the units are fanned out over a process pool. Only
+    the FamilyGraph columns are sent to the workers, and the results come back in
+    the order of the units, identical to peeling them one after the other. The
+    NUMPY backend stacks units of the same structure and peels them together.
+
+    Args:
+        units: An iterable of (mode, FamilyGraph)
+        workers: The number of processes, 1 peels in this process and None uses
+            every CPU
+        backend: The numeric backend
+        cache: An optional cache.ResultCache, only the units that miss are peeled
+
+    Returns: list of Peeled, None where the unit is not valid for its mode
+    """
+    units = list(units)
+    if cache is not None:
+        return cache.peel_all(units, workers, backend)
+    if backend == NUMPY:
+        from . import vectorized
+        return vectorized.peel_all(units, workers)
+    return map_units(partial(peel_unit, backend=backend), units, workers)
+
+
+def all_genotypes_n_mode(mode, observations, backend=EXACT):
+    """Calculate the genotype probabilities for every observation in a single pass
+
+    Args:
+        mode: Mode of inheritance
+        observations: The observations in question
+        backend: The numeric backend
+
+    Returns: list of dicts of genotype probabilities, in the order of the observations
+    """
+    observations = list(observations)
+    return peel(mode, family_graph(observations), backend).genotypes[:len(observations)]
@@ -0,0 +1,92 @@
+import sys
+from collections import namedtuple
+from contextlib import contextmanager
+
+from .exceptions import ParserException
+from .numeric import EXACT
+from .pedigree import Pedigree
+
+__all__ = ['Block', 'BlockParseError', 'DELIMITER', 'open_text', 'read_blocks', 'read_pedigrees', 'PedigreeBlock',
+           'STDIN']
+
+# A line equal to the delimiter (ignoring trailing whitespace) separates pedigrees
+DELIMITER = ''
+
+# The file name that reads from standard input
+STDIN = '-'
+
+# The lines of one pedigree, first_line and last_line are 1 based and inclusive
+Block = namedtuple('Block', ['text', 'first_line', 'last_line'])
+
+PedigreeBlock = namedtuple('PedigreeBlock', ['pedigree', 'first_line', 'last_line'])
+
+
+class BlockParseError(ParserException):
+    """A pedigree block couldn't be parsed, the original error is the __cause__"""
+
+    def __init__(self, first_line, last_line, error):
+        super().__init__(f'lines {first_line}-{last_line}: {type(error).__name__}: {error}')
+        self.first_line = first_line
+        self.last_line = last_line
+
+
+@contextmanager
+def open_text(file):
+    """Open a file name, read standard input for STDIN or use an open file as is"""
+    if file == STDIN:
+        yield sys.stdin
+    elif isinstance(file, str):
+        with open(file, 'r') as f:
+            yield f
+    else:
+        yield file
+
+
+def read_blocks(file, delimiter=DELIMITER):
+    """Split a file of many pedigrees into blocks, reading a line at a time.
+
+    Only the lines of the current block are held in memory. Consecutive delimiters
+    don't make empty blocks.
+
+    Args:
+        file: A file name, STDIN or an open text file
+        delimiter: The line that separates pedigrees
+
+    Returns: generator of Block
+    """
+    with open_text(file) as f:
+        lines = []
+        first_line = None
+        number = 0
+        for number, line in enumerate(f, 1):
+            line = line.rstrip('\r\n')
+            if line.rstrip() == delimiter:
+                if lines:
+                    yield Block('\n'.join(lines), first_line, number - 1)
+                lines = []
+            else:
+                if not lines:
+                    first_line = number
+                lines.append(line)
+        if lines:
+            yield Block('\n'.join(lines), first_line, number)
+
+
+def read_pedigrees(file, delimiter=DELIMITER, backend=EXACT):
+    """Parse each pedigree of a file of many pedigrees, one at a time.
+
+    Args:
+        file: A file name, STDIN or an open text file
+        delimiter: The line that separates pedigrees
+        backend: The numeric backend of each Pedigree
+
+    Returns: generator of PedigreeBlock
+
+    Raises: BlockParseError with the line offsets of a block that can't be parsed
+    """
+    for block in read_blocks(file, delimiter):
+        try:
+            pedigree = Pedigree(block.text, backend)
+        except Exception as error:
+            raise BlockParseError(block.first_line, block.last_line, error) from error
+        yield PedigreeBlock(pedigree, block.first_line, block.last_line)
@@ -0,0 +1,248 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from .core import GENOTYPE_INDEX
+from .exceptions import AnalysisException, NonMendelianPattern
+from .peeling import nuclear_families
+from .vectorized import PHENOTYPE_MASKS, TRANSITION_TENSORS
+
+__all__ = ['FORWARD', 'GIBBS', 'sample', 'Sampled']
+
+# Likelihood weighted forward sampling: each sample draws every individual after
+# its parents, conditioned on its own phenotype, and is weighted by how likely its
+# phenotypes were. Samples are independent and the likelihood is estimated too.
+FORWARD = 'FORWARD'
+# Gibbs sampling: each chain starts from a forward sample and redraws one
+# individual at a time given its parents, partners, children and phenotype, with
+# a jump to a fresh forward sample after every sweep.
+GIBBS = 'GIBBS'
+
+# genotypes: dict of genotype probabilities for each individual
+# standard_errors: dict of the standard error of each of those probabilities
+# log_likelihood: Natural log of the estimated probability of the phenotypes, None for GIBBS
+# samples: The number of samples of each individual the estimates are based on
+# seconds: The time spent sampling
+Sampled = namedtuple('Sampled', ['genotypes', 'standard_errors', 'log_likelihood', 'samples', 'seconds'])
+
+
+class _Model(object):
+    """The arrays of a FamilyGraph needed to sample it, genotypes are positions in
+    GENOTYPE_INDEX"""
+
+    def __init__(self, mode, graph):
+        self.mode = mode
+        self.graph = graph
+        self.size = len(graph.genders)
+        self.states = [GENOTYPE_INDEX[mode, gender] for gender in graph.genders]
+        self.evidence = [np.ones(len(states)) if phenotype is None else PHENOTYPE_MASKS[mode, gender, phenotype]
+                         for states, gender, phenotype in zip(self.states, graph.genders, graph.phenotypes)]
+        self.transitions = [TRANSITION_TENSORS[mode, gender] for gender in graph.genders]
+        # (partner, children) of each family an individual is a parent of
+        self.families = [[] for _ in range(self.size)]
+        for family in nuclear_families(graph):
+            self.families[family.mother].append((family.father, family.children))
+            self.families[family.father].append((family.mother, family.children))
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        """Every individual after its parents, which also holds for pedigrees with loops"""
+        pending = [sum(parent is not None for parent in parents)
+                   for parents in zip(self.graph.mothers, self.graph.fathers)]
+        order = [individual for individual in range(self.size) if pending[individual] == 0]
+        for individual in order:
+            for _, children in self.families[individual]:
+                for child in children:
+                    pending[child] -= 1
+                    if pending[child] == 0:
+                        order.append(child)
+        if len(order) != self.size:
+            raise AnalysisException('The pedigree contains an individual who is their own ancestor.')
+        return order
+
+    def prior(self, genotypes, individual):
+        """The genotype probabilities of an individual given its parents, one row per chain"""
+        mother, father = self.graph.mothers[individual], self.graph.fathers[individual]
+        if mother is None:
+            states = len(self.states[individual])
+            return np.full((len(genotypes), states), 1 / states)
+        return self.transitions[individual][genotypes[:, mother], genotypes[:, father]]
+
+    def conditional(self, genotypes, individual):
+        """The unnormalized genotype probabilities of an individual given every other
+        individual, one row per chain"""
+        weights = self.prior(genotypes, individual) * self.evidence[individual]
+        for partner, children in self.families[individual]:
+            for child in children:
+                transitions = self.transitions[child]
+                # Index the child's transitions by the partner's and child's genotypes,
+                # leaving this individual's axis
+                if self.graph.mothers[child] == individual:
+                    weights = weights * transitions[:, genotypes[:, partner], genotypes[:, child]].T
+                else:
+                    weights = weights * transitions[genotypes[:, partner], :, genotypes[:, child]]
+        return weights
+
+
+def _draw(rng, weights):
+    """Draw a genotype from each row of weights, and the total of each row"""
+    cumulative = np.cumsum(weights, axis=1)
+    totals = cumulative[:, -1]
+    draws = (cumulative < rng.random(len(weights))[:, None] * totals[:, None]).sum(axis=1)
+    return np.minimum(draws, weights.shape[1] - 1), totals
+
+
+def _forward(model, rng, chains):
+    """Draw a forward sample for each chain
+
+    Returns: tuple of the genotypes of each chain and individual, and the natural
+    log of each chain's weight
+    """
+    genotypes = np.zeros((chains, model.size), dtype=np.intp)
+    log_weights = np.zeros(chains)
+    with np.errstate(divide='ignore'):
+        for individual in model.order:
+            weights = model.prior(genotypes, individual) * model.evidence[individual]
+            genotypes[:, individual], totals = _draw(rng, weights)
+            log_weights += np.log(totals)
+    return genotypes, log_weights
+
+
+def _log_weights(model, genotypes):
+    """The natural log of the weight _forward would give each chain's genotypes"""
+    log_weights = np.zeros(len(genotypes))
+    with np.errstate(divide='ignore'):
+        for individual in model.order:
+            log_weights += np.log((model.prior(genotypes, individual) * model.evidence[individual]).sum(axis=1))
+    return log_weights
+
+
+def _one_hot(model, genotypes):
+    return np.eye(max(map(len, model.states)))[genotypes]
+
+
+def _estimates(model, probabilities, standard_errors):
+    """Convert arrays indexed by individual and genotype to dicts, dropping
+    genotypes that were never sampled"""
+    genotypes, errors = [], []
+    for states, individual_probabilities, individual_errors in zip(model.states, probabilities, standard_errors):
+        genotypes.append({genotype: float(probability) for genotype, probability
+                          in zip(states, individual_probabilities) if probability != 0})
+        errors.append({genotype: float(error) for genotype, error, probability
+                       in zip(states, individual_errors, individual_probabilities) if probability != 0})
+    return genotypes, errors
+
+
+def _sample_forward(model, rng, chains, samples, deadline):
+    shift = -np.inf
+    total = squared = 0.0
+    weighted = np.zeros((model.size, max(map(len, model.states))))
+    weighted_squared = np.zeros_like(weighted)
+    drawn = 0
+    for iteration in range(samples):
+        genotypes, log_weights = _forward(model, rng, chains)
+        drawn += chains
+        peak = log_weights.max()
+        if peak != -np.inf:
+            # Keep the running sums relative to the largest weight seen, so they don't underflow
+            if peak > shift:
+                scale, shift = np.exp(shift - peak), peak
+                total, weighted = total * scale, weighted * scale
+                squared, weighted_squared = squared * scale ** 2, weighted_squared * scale ** 2
+            weights = np.exp(log_weights - shift)
+            one_hot = _one_hot(model, genotypes)
+            total += weights.sum()
+            squared += (weights ** 2).sum()
+            weighted += np.einsum('c,cnk->nk', weights, one_hot)
+            weighted_squared += np.einsum('c,cnk->nk', weights ** 2, one_hot)
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+
+    if total == 0:
+        raise NonMendelianPattern(f'No sample of the genotypes explains the observed phenotypes given a '
+                                  f'{model.mode} mode of inheritance.')
+    probabilities = weighted / total
+    # The delta method standard error of a ratio of weighted sums
+    variance = weighted_squared * (1 - 2 * probabilities) + probabilities ** 2 * squared
+    standard_errors = np.sqrt(np.maximum(variance, 0)) / total
+    log_likelihood = float(np.log(total) + shift - np.log(drawn))
+    return probabilities, standard_errors, log_likelihood, drawn
+
+
+def _start(model, rng, chains, attempts=100):
+    """Forward samples resampled in proportion to their weights, so that every
+    chain starts from genotypes that explain the phenotypes"""
+    for _ in range(attempts):
+        genotypes, log_weights = _forward(model, rng, chains)
+        peak = log_weights.max()
+        if peak != -np.inf:
+            weights = np.exp(log_weights - peak)
+            return genotypes[rng.choice(chains, size=chains, p=weights / weights.sum())]
+    raise NonMendelianPattern(f'No sample of the genotypes explains the observed phenotypes given a '
+                              f'{model.mode} mode of inheritance.')
+
+
+def _sample_gibbs(model, rng, chains, samples, burn_in, deadline):
+    if chains < 2:
+        raise AnalysisException('Gibbs sampling needs at least two chains to estimate standard errors.')
+    genotypes = _start(model, rng, chains)
+    counts = np.zeros((chains, model.size, max(map(len, model.states))))
+    sweeps = 0
+    for iteration in range(burn_in + samples):
+        for individual in model.order:
+            genotypes[:, individual], _ = _draw(rng, model.conditional(genotypes, individual))
+        # Single site updates can't change the phase of a parent and its children
+        # together, so the chains also jump to a forward sample with the Metropolis
+        # Hastings probability of an independence sampler, which is the ratio of the
+        # forward weights
+        proposals, proposal_weights = _forward(model, rng, chains)
+        with np.errstate(invalid='ignore'):
+            accept = np.log(rng.random(chains)) < proposal_weights - _log_weights(model, genotypes)
+        genotypes[accept] = proposals[accept]
+        if iteration >= burn_in:
+            counts += _one_hot(model, genotypes)
+            sweeps += 1
+        if deadline is not None and time.perf_counter() > deadline and sweeps:
+            break
+
+    # Chains are independent, so the spread of their means gives the standard error
+    means = counts / sweeps
+    probabilities = means.mean(axis=0)
+    standard_errors = means.std(axis=0, ddof=1) / np.sqrt(chains)
+    return probabilities, standard_errors, None, sweeps * chains
+
+
+def sample(mode, graph, method=GIBBS, chains=256, samples=1000, burn_in=100, seconds=None, seed=None):
+    """Estimate the genotype probabilities of every individual by Monte Carlo.
+
+    Every chain is sampled at once with numpy. Unlike peeling the cost doesn't
+    grow with the loops of the pedigree, only with its size, and the estimates
+    converge to the exact genotype probabilities as the number of samples grows.
+
+    Args:
+        mode: The mode of inheritance
+        graph: FamilyGraph
+        method: FORWARD or GIBBS
+        chains: The number of chains, sampled together
+        samples: The most forward samples or Gibbs sweeps (after burn_in) of each chain
+        burn_in: The Gibbs sweeps discarded at the start of each chain
+        seconds: An optional time budget, sampling stops once it is spent
+        seed: Seed of the random number generator, the same seed gives the same estimates
+
+    Returns: Sampled
+    """
+    start = time.perf_counter()
+    deadline = None if seconds is None else start + seconds
+    model = _Model(mode, graph)
+    rng = np.random.default_rng(seed)
+    if method == FORWARD:
+        probabilities, standard_errors, log_likelihood, drawn = _sample_forward(model, rng, chains, samples,
+                                                                                deadline)
+    elif method == GIBBS:
+        probabilities, standard_errors, log_likelihood, drawn = _sample_gibbs(model, rng, chains, samples,
+                                                                              burn_in, deadline)
+    else:
+        raise AnalysisException(f'Unknown sampling method {method}.')
+    genotypes, errors = _estimates(model, probabilities, standard_errors)
+    return Sampled(genotypes, errors, log_likelihood, drawn, time.perf_counter() - start)
@@ -0,0 +1,407 @@
+"""An HTTP service that scores pedigrees.
+
+    python -m genetics serve --port 8080 --workers 4
+
+POST /score with a JSON body of either a text drawing or a tabular (PED) payload:
+
+    {"pedigree": "f-m\\n|\\nF", "posteriors": true, "modes": ["AUTOSOMAL_RECESSIVE"]}
+    {"ped": [["1", "dad", "0", "0", "1", "1"], ...], "backend": "EXACT"}
+
+The ped payload may also be the text of a PED file, and a text/plain body is read
+as a drawing. The response has a row for each pedigree with the likelihood and
+probability of every mode, and the genotype probabilities of each individual when
+posteriors is set. A row whose FLOAT likelihoods all underflow has an error in place
+of the mode probabilities. GET /metrics reports the latency percentiles of the requests
+served and how well the batches and the result cache are doing.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+
+from .cache import ResultCache
+from .core import ALL_MODES
+from .exceptions import LikelihoodUnderflow, MendelianInferenceException
+from .mode_analysis import rank_modes
+from .numeric import BACKENDS, json_number, LOG
+from .ped import read_ped_stores
+from .pedigree import Pedigree
+from .peeling import peel_all
+
+__all__ = ['Metrics', 'ScoringService', 'main']
+
+# The largest request body read, in bytes
+MAX_BODY = 16 * 2 ** 20
+
+# The fraction of requests served within each reported latency
+PERCENTILES = (0.5, 0.9, 0.99)
+
+# A pedigree of a request to score. names is the output key of each individual by ID
+_Parsed = namedtuple('_Parsed', ['location', 'graph', 'names'])
+
+# A (mode, FamilyGraph) unit waiting for a batch, with the future of its Peeled
+_Pending = namedtuple('_Pending', ['unit', 'backend', 'future'])
+
+
+class _BadRequest(Exception):
+    """A request that can't be scored, answered with a 400"""
+
+
+class Metrics(object):
+    """Counters of the requests served, with the latencies of the most recent"""
+
+    def __init__(self, window=10000):
+        """
+        Args:
+            window: The number of recent latencies the percentiles are taken over
+        """
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.units = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, seconds, status):
+        self.requests += 1
+        self.errors += status >= 400
+        self.latencies.append(seconds)
+
+    def percentiles(self):
+        """The latency in seconds within which each of PERCENTILES of the recent
+        requests were served, by the nearest rank
+
+        Returns: dict of 'p50' etc. -> seconds, None before any request
+        """
+        latencies = sorted(self.latencies)
+        return {f'p{round(100 * fraction)}': latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+                if latencies else None for fraction in PERCENTILES}
+
+    def report(self, cache_stats=None):
+        report = {
+            'requests': self.requests,
+            'errors': self.errors,
+            'latency_seconds': {**self.percentiles(), 'max': max(self.latencies, default=None)},
+            'batches': self.batches,
+            'units': self.units,
+            'mean_batch_size': self.units / self.batches if self.batches else None,
+        }
+        if cache_stats is not None:
+            report['cache'] = cache_stats._asdict()
+        return report
+
+
+def _warm():
+    """Run in each worker as it starts, so the first request it peels doesn't pay
+    for the imports or for filling the transition tables"""
+    graph = Pedigree('f-m\n|\nF').graph
+    for backend in BACKENDS:
+        try:
+            peel_all([(mode, graph) for mode in ALL_MODES], backend=backend)
+        except ImportError:
+            pass
+
+
+def _parse(payload):
+    """The pedigrees of a request body
+
+    Returns: tuple of a list of _Parsed and the options of the request
+    """
+    if not isinstance(payload, dict):
+        raise _BadRequest('The body must be a JSON object or a text drawing')
+    options = {key: payload.get(key, default) for key, default in
+               (('posteriors', False), ('modes', list(ALL_MODES)), ('backend', None))}
+    if not isinstance(options['modes'], list) or not set(options['modes']) <= set(ALL_MODES):
+        raise _BadRequest(f'modes must be some of {", ".join(ALL_MODES)}')
+    if options['backend'] is not None and options['backend'] not in BACKENDS:
+        raise _BadRequest(f'backend must be one of {", ".join(BACKENDS)}')
+
+    try:
+        if isinstance(payload.get('pedigree'), str):
+            pedigree = Pedigree(payload['pedigree'])
+            names = ['{},{}'.format(*generation) for generation in pedigree.generations]
+            return [_Parsed({}, pedigree.graph, names)], options
+        if 'ped' in payload:
+            ped = payload['ped']
+            if isinstance(ped, list):
+                ped = '\n'.join(' '.join(map(str, record)) for record in ped)
+            if not isinstance(ped, str):
+                raise _BadRequest('ped must be the text of a PED file or a list of records')
+            return [_Parsed({'family': family}, Pedigree.from_store(store).graph, individuals)
+                    for family, store, individuals in read_ped_stores(io.StringIO(ped))], options
+    except MendelianInferenceException as error:
+        raise _BadRequest(f'{type(error).__name__}: {error}')
+    raise _BadRequest('The body needs a pedigree drawing or a ped payload')
+
+
+class ScoringService(object):
+    """Scores pedigrees over HTTP.
+
+    Parsing happens on the event loop, inference in a pool of workers that are
+    warmed up as they start and live as long as the service. Units of work from
+    requests that arrive together are gathered into batches, so a worker peels
+    many at once (the NUMPY backend stacks those of the same structure) and
+    repeats are only peeled once. Every result goes into a cache.ResultCache,
+    which outlives the requests, so a pedigree seen before isn't peeled again.
+    """
+
+    def __init__(self, workers=None, backend=LOG, cache=':memory:', batch_size=256, batch_delay=0.002,
+                 window=10000):
+        """
+        Args:
+            workers: The number of processes to peel in, 1 peels in a thread of
+                this process and None uses every CPU
+            backend: The numeric backend of requests that don't choose one
+            cache: A cache.ResultCache or the path of its database
+            batch_size: The most units of work in a batch
+            batch_delay: Seconds to wait for more units once one arrives
+            window: The number of recent latencies the percentiles are taken over
+        """
+        self.workers = workers or os.cpu_count()
+        self.backend = backend
+        self.cache = cache if isinstance(cache, ResultCache) else ResultCache(cache)
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.metrics = Metrics(window)
+        self._executor = None
+        self._queue = None
+        self._batcher = None
+        self._server = None
+
+    @property
+    def port(self):
+        """The port the service is listening on"""
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """Start the workers and listen, port 0 picks a free port"""
+        executor = ThreadPoolExecutor if self.workers == 1 else ProcessPoolExecutor
+        self._executor = executor(max_workers=self.workers, initializer=_warm)
+        # Start every worker now rather than on the first request
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, os.getpid) for _ in range(self.workers)))
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch())
+        self._server = await asyncio.start_server(self._connection, host, port)
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+        self._executor.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def serve_forever(self, host='127.0.0.1', port=8080):
+        await self.start(host, port)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def peel(self, units, backend):
+        """Peel (mode, FamilyGraph) units in the next batches
+
+        Returns: list of Peeled, None where the unit is not valid for its mode
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in units]
+        for unit, future in zip(units, futures):
+            self._queue.put_nowait(_Pending(unit, backend, future))
+        return await asyncio.gather(*futures)
+
+    async def _batch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), max(0, deadline - loop.time())))
+                except asyncio.TimeoutError:
+                    break
+            self.metrics.batches += 1
+            self.metrics.units += len(batch)
+            by_backend = {}
+            for pending in batch:
+                by_backend.setdefault(pending.backend, []).append(pending)
+            for backend, pending in by_backend.items():
+                try:
+                    results = await self._peel_batch([item.unit for item in pending], backend)
+                except Exception as error:
+                    for item in pending:
+                        if not item.future.done():
+                            item.future.set_exception(error)
+                    continue
+                for item, result in zip(pending, results):
+                    if not item.future.done():
+                        item.future.set_result(result)
+
+    async def _peel_batch(self, units, backend):
+        """Peel the units of a batch that miss the cache, split over the workers"""
+        loop = asyncio.get_running_loop()
+        fingerprints, result, missing = self.cache.lookup(units, backend)
+        misses = [units[positions[0]] for positions in missing.values()]
+        size = -(-len(misses) // self.workers)
+        chunks = [misses[start:start + size] for start in range(0, len(misses), size or 1)]
+        peeled = await asyncio.gather(*(loop.run_in_executor(self._executor, peel_all, chunk, 1, backend)
+                                        for chunk in chunks))
+        return self.cache.store(fingerprints, result, missing, [unit for chunk in peeled for unit in chunk])
+
+    async def score(self, payload):
+        """Score the pedigrees of a request body
+
+        Args:
+            payload: The decoded JSON body
+
+        Returns: dict, the response body
+        """
+        parsed, options = _parse(payload)
+        backend = options['backend'] or self.backend
+        peeled = iter(await self.peel([(mode, pedigree.graph) for pedigree in parsed for mode in ALL_MODES],
+                                      backend))
+        zero = BACKENDS[backend].zero
+        rows = []
+        for pedigree in parsed:
+            units = dict(zip(ALL_MODES, peeled))
+            likelihoods = {mode: zero if unit is None else unit.likelihood for mode, unit in units.items()}
+            possible = {mode for mode, unit in units.items() if unit is not None}
+            row = {**pedigree.location, 'individuals': len(pedigree.names),
+                   'likelihoods': {mode: json_number(likelihood) for mode, likelihood in likelihoods.items()},
+                   'modes': None}
+            try:
+                if possible:
+                    row['modes'] = {mode: json_number(probability) for mode, probability
+                                    in rank_modes(likelihoods, backend, possible).items()}
+            except LikelihoodUnderflow as error:
+                row['error'] = str(error)
+            if options['posteriors']:
+                row['posteriors'] = {
+                    mode: None if units[mode] is None else {
+                        name: {genotype: json_number(probability) for genotype, probability in genotypes.items()}
+                        for name, genotypes in zip(pedigree.names, units[mode].genotypes)}
+                    for mode in options['modes']}
+            rows.append(row)
+        return {'pedigrees': rows}
+
+    async def _respond(self, method, path, headers, body):
+        """Returns: tuple of the status and the JSON response body"""
+        if path == '/metrics':
+            if method != 'GET':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Use GET'}
+            return HTTPStatus.OK, self.metrics.report(self.cache.stats)
+        if path != '/score':
+            return HTTPStatus.NOT_FOUND, {'error': f'No such path {path}'}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Use POST'}
+        try:
+            text = body.decode()
+            if headers.get('content-type', '').startswith('text/plain'):
+                payload = {'pedigree': text}
+            else:
+                payload = json.loads(text)
+            return HTTPStatus.OK, await self.score(payload)
+        except (UnicodeDecodeError, json.JSONDecodeError) as error:
+            return HTTPStatus.BAD_REQUEST, {'error': f'The body is not valid JSON: {error}'}
+        except _BadRequest as error:
+            return HTTPStatus.BAD_REQUEST, {'error': str(error)}
+
+    async def _connection(self, reader, writer):
+        """Serve the requests of a connection until it is closed"""
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                start = time.perf_counter()
+                if isinstance(request, HTTPStatus):
+                    status, response, keep_alive = request, {'error': request.phrase}, False
+                else:
+                    method, path, headers, body = request
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+                    try:
+                        status, response = await self._respond(method, path, headers, body)
+                    except Exception as error:
+                        status, response = HTTPStatus.INTERNAL_SERVER_ERROR, {
+                            'error': f'{type(error).__name__}: {error}'}
+                self.metrics.record(time.perf_counter() - start, status)
+                _write_response(writer, status, response, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _read_request(reader):
+    """Read an HTTP/1.1 request
+
+    Returns: tuple of the method, path, headers with lower case names and body,
+    None once the connection is closed, or the HTTPStatus of a bad request
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode('latin-1').split()
+    except ValueError:
+        return HTTPStatus.BAD_REQUEST
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        return HTTPStatus.BAD_REQUEST
+    if length > MAX_BODY:
+        return HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    body = await reader.readexactly(length)
+    return method, target.split('?')[0], headers, body
+
+
+def _write_response(writer, status, response, keep_alive):
+    body = json.dumps(response).encode()
+    writer.write(f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+                 f'Content-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\n'
+                 f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m genetics serve', description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=0, help='processes to peel in, 0 uses every CPU')
+    parser.add_argument('--backend', choices=list(BACKENDS), default=LOG,
+                        help=f'the numeric backend of requests that don\'t choose one (default: {LOG})')
+    parser.add_argument('--cache', default=':memory:', help='the database file of the result cache, by '
+                                                            'default it is kept in memory')
+    parser.add_argument('--batch-size', type=int, default=256, help='the most units of work in a batch')
+    parser.add_argument('--batch-delay', type=float, default=0.002,
+                        help='seconds to wait for more units once one arrives')
+    arguments = parser.parse_args(argv)
+    service = ScoringService(arguments.workers or None, arguments.backend, arguments.cache,
+                             arguments.batch_size, arguments.batch_delay)
+    try:
+        asyncio.run(service.serve_forever(arguments.host, arguments.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    main()
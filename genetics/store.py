@@ -0,0 +1,103 @@
+from array import array
+from collections import namedtuple
+
+from .core import FEMALE, MALE
+from .observation import Observation
+from .peeling import unobserved_parents
+
+__all__ = ['from_store', 'MISSING', 'PedigreeStore', 'SEXES', 'store_graph', 'to_store']
+
+# Sex codes, an individual's sex is its position in this tuple
+SEXES = (FEMALE, MALE)
+
+# Stands in for an unknown parent or a generation index that isn't set
+MISSING = -1
+
+# One column per attribute and one row per individual, an individual's ID is its
+# row. Columns are typed arrays (or memoryviews of a loaded archive, see binary) so
+# they can be written to disk or viewed by numpy without copying. sex and affected
+# are signed chars, mother, father, partner and the generation index (row, column)
+# are C ints. affected is MISSING where the phenotype wasn't observed.
+PedigreeStore = namedtuple('PedigreeStore', ['sex', 'affected', 'mother', 'father', 'partner', 'row', 'column'])
+
+
+def _generation(observation):
+    return observation.generation if observation.generation is not None else (MISSING, MISSING)
+
+
+def to_store(observations):
+    """Build the columns of a list of observations
+
+    Args:
+        observations: A list of Observations, an observation's ID is its position.
+            Parents outside of the list are MISSING
+
+    Returns: PedigreeStore
+    """
+    index = {id(observation): position for position, observation in enumerate(observations)}
+    generations = [_generation(observation) for observation in observations]
+    return PedigreeStore(
+        sex=array('b', (SEXES.index(observation.gender) for observation in observations)),
+        affected=array('b', (MISSING if observation.affected is None else observation.affected
+                             for observation in observations)),
+        mother=array('i', (index.get(id(observation.mother), MISSING) for observation in observations)),
+        father=array('i', (index.get(id(observation.father), MISSING) for observation in observations)),
+        partner=array('i', (index.get(id(observation.partner), MISSING) for observation in observations)),
+        row=array('i', (row for row, _ in generations)),
+        column=array('i', (column for _, column in generations)),
+    )
+
+
+def _symbol(sex, affected):
+    symbol = {FEMALE: 'f', MALE: 'm'}[SEXES[sex]]
+    return symbol.upper() if affected == 1 else symbol
+
+
+def _phenotype(sex, affected):
+    return None if affected == MISSING else _symbol(sex, affected)
+
+
+def from_store(store):
+    """Build linked Observations from the columns of a pedigree
+
+    Partners are taken from the partner column. An individual without one whose
+    children share another parent is partnered with the last such parent.
+
+    Args:
+        store: PedigreeStore
+
+    Returns: list of Observations indexed by ID
+    """
+    observations = [Observation(_symbol(sex, affected), affected != MISSING)
+                    for sex, affected in zip(store.sex, store.affected)]
+    for individual, observation in enumerate(observations):
+        if store.row[individual] != MISSING:
+            observation.generation = (store.row[individual], store.column[individual])
+        mother, father = (None if parent == MISSING else observations[parent]
+                          for parent in (store.mother[individual], store.father[individual]))
+        if mother is not None and father is not None:
+            mother.partner = father
+        observation.set_parents(mother, father)
+
+    # Partners aren't always mutual, Eg. in 'm-f-m' the woman is partnered with the
+    # left man but the right man is partnered with her
+    for observation, partner in zip(observations, store.partner):
+        if partner != MISSING:
+            observation._partner = observations[partner]
+    return observations
+
+
+def store_graph(store):
+    """Build the FamilyGraph of the columns of a pedigree, without linking Observations
+
+    Args:
+        store: PedigreeStore
+
+    Returns: FamilyGraph
+    """
+    return unobserved_parents(
+        genders=[SEXES[sex] for sex in store.sex],
+        phenotype=[_phenotype(sex, affected) for sex, affected in zip(store.sex, store.affected)],
+        mothers=[None if mother == MISSING else mother for mother in store.mother],
+        fathers=[None if father == MISSING else father for father in store.father],
+    )
@@ -0,0 +1,154 @@
+import random
+
+from .core import FEMALE, GENOTYPE_INDEX, MALE
+from .core import phenotypes
+from .core import punnet_square
+from .numeric import EXACT
+from .pedigree import Pedigree
+
+__all__ = ['synthetic_pedigree', 'synthetic_text']
+
+_SYMBOLS = {FEMALE: 'f', MALE: 'm'}
+
+
+class _Person(object):
+    """An individual of a synthetic pedigree, laid out in slots two characters wide"""
+
+    def __init__(self, gender, affected, genotype):
+        self.gender = gender
+        self.affected = affected
+        self.genotype = genotype
+        self.spouse = None
+        self.children = []
+        self.slot = 0
+        self.width = 1
+
+    @property
+    def symbol(self):
+        symbol = _SYMBOLS[self.gender]
+        return symbol.upper() if self.affected else symbol
+
+    @property
+    def parents(self):
+        return (self, self.spouse) if self.gender == FEMALE else (self.spouse, self)
+
+
+def _affected(mode, gender, genotype):
+    return _SYMBOLS[gender].upper() in phenotypes(genotype, mode)
+
+
+def _founder(rng, gender, affected_rate, mode):
+    """A founder, affected with the given probability. Under a mode its genotype is
+    drawn uniformly from those that explain its phenotype, or from every genotype
+    when none do (Eg. an affected female under Y_LINKED)."""
+    affected = rng.random() < affected_rate
+    if mode is None:
+        return _Person(gender, affected, None)
+    genotypes = GENOTYPE_INDEX[mode, gender]
+    genotype = rng.choice([genotype for genotype in genotypes if _affected(mode, gender, genotype) == affected]
+                          or genotypes)
+    return _Person(gender, _affected(mode, gender, genotype), genotype)
+
+
+def _child(rng, mother, father, affected_rate, mode):
+    """A child of either gender. Under a mode its genotype is drawn from the punnet
+    square of its parents and its phenotype follows from the genotype."""
+    gender = rng.choice((FEMALE, MALE))
+    if mode is None:
+        return _Person(gender, rng.random() < affected_rate, None)
+    probabilities = punnet_square(mother.genotype, father.genotype)
+    genotypes = [genotype for genotype in GENOTYPE_INDEX[mode, gender] if genotype in probabilities]
+    genotype = rng.choices(genotypes, [float(probabilities[genotype]) for genotype in genotypes])[0]
+    return _Person(gender, _affected(mode, gender, genotype), genotype)
+
+
+def _generations(rng, generations, sibship_size, marry_in_rate, affected_rate, mode):
+    """Grow the pedigree from a founding couple, one generation at a time.
+
+    Every couple above the last generation has sibship_size children. Each child
+    marries in a founder with probability marry_in_rate, only couples have children.
+    """
+    mother = _founder(rng, FEMALE, affected_rate, mode)
+    mother.spouse = _founder(rng, MALE, affected_rate, mode)
+    result = [[mother]]
+    for _ in range(generations - 1):
+        next_generation = []
+        for person in result[-1]:
+            if person.spouse is None:
+                continue
+            person.children = [_child(rng, *person.parents, affected_rate, mode) for _ in range(sibship_size)]
+            for child in person.children:
+                if rng.random() < marry_in_rate:
+                    child.spouse = _founder(rng, FEMALE if child.gender == MALE else MALE, affected_rate, mode)
+            next_generation.extend(person.children)
+        result.append(next_generation)
+    # Partners of the last generation would have no children
+    for person in result[-1]:
+        person.spouse = None
+    return result
+
+
+def _layout(generations):
+    """Give every individual a slot. The children of a couple start below the
+    partner with the child link and are packed to the right of each other."""
+    for generation in reversed(generations):
+        for person in generation:
+            own = 2 if person.spouse is not None else 1
+            person.width = max(own, sum(child.width for child in person.children))
+    for generation in generations:
+        for person in generation:
+            slot = person.slot
+            for child in person.children:
+                child.slot = slot
+                slot += child.width
+
+
+def _draw(generations, width):
+    lines = []
+    for generation in generations:
+        people = [' '] * (2 * width)
+        links = [' '] * (2 * width)
+        for person in generation:
+            column = 2 * person.slot
+            people[column] = person.symbol
+            if person.spouse is not None:
+                people[column + 1] = '-'
+                people[column + 2] = person.spouse.symbol
+            if person.children:
+                links[column] = '|'
+        lines.append(''.join(people).rstrip())
+        if any(person.children for person in generation):
+            lines.append(''.join(links).rstrip())
+    return '\n'.join(lines)
+
+
+def synthetic_text(generations, sibship_size=3, marry_in_rate=0.5, affected_rate=0.1, mode=None, seed=None):
+    """Draw a random pedigree descended from a single founding couple.
+
+    Without a mode every individual is independently affected, so the pedigree may
+    not be valid for some modes. With a mode genotypes are inherited from the
+    founders, so the phenotypes are always valid for that mode.
+
+    Args:
+        generations: The number of generations, including the founders
+        sibship_size: The number of children of each couple
+        marry_in_rate: The probability a child has a partner, and so children of its own
+        affected_rate: The probability an individual (a founder, under a mode) is affected
+        mode: An optional mode of inheritance to simulate
+        seed: Seed of the random number generator, the same seed draws the same pedigree
+
+    Returns: str, the pedigree in the format read by Pedigree
+    """
+    rng = random.Random(seed)
+    people = _generations(rng, generations, sibship_size, marry_in_rate, affected_rate, mode)
+    _layout(people)
+    return _draw(people, people[0][0].width + 1)
+
+
+def synthetic_pedigree(generations, sibship_size=3, marry_in_rate=0.5, affected_rate=0.1, mode=None, seed=None,
+                       backend=EXACT):
+    """A random Pedigree, see synthetic_text
+
+    Returns: Pedigree
+    """
+    return Pedigree(synthetic_text(generations, sibship_size, marry_in_rate, affected_rate, mode, seed), backend)
@@ -0,0 +1,274 @@
+import numpy as np
+
+from .core import ALL_MODES, FEMALE, MALE
+from .core import GENOTYPE_INDEX
+from .core import phenotypes
+from .exceptions import NonMendelianPattern
+from .numeric import NUMPY
+from .peeling import child_transitions, has_loop, map_units, nuclear_families, peel_unit, Peeled, peeling_schedule
+from .store import PedigreeStore
+
+__all__ = ['constrain_probabilities', 'from_vector', 'normalize_probabilities', 'peel', 'peel_all', 'peel_batch',
+           'phenotype_mask', 'PHENOTYPE_MASKS', 'punnet_occurrences', 'punnet_square', 'store_arrays', 'to_vector',
+           'TRANSITION_TENSORS']
+
+
+def to_vector(mode, gender, genotype_probabilities):
+    """Convert a dict of genotype probabilities to a vector
+
+    Args:
+        mode: The mode of inheritance
+        gender: 'MALE' or 'FEMALE'
+        genotype_probabilities: dict of genotype probabilities
+
+    Returns: numpy array indexed by GENOTYPE_INDEX[mode, gender]
+    """
+    return np.array([float(genotype_probabilities.get(genotype, 0)) for genotype in GENOTYPE_INDEX[mode, gender]])
+
+
+def from_vector(mode, gender, vector):
+    """Convert a vector to a dict of genotype probabilities, dropping impossible genotypes
+
+    Args:
+        mode: The mode of inheritance
+        gender: 'MALE' or 'FEMALE'
+        vector: numpy array indexed by GENOTYPE_INDEX[mode, gender]
+
+    Returns: dict of genotype probabilities
+    """
+    return {genotype: float(probability) for genotype, probability in zip(GENOTYPE_INDEX[mode, gender], vector)
+            if probability != 0}
+
+
+def store_arrays(store):
+    """View each column of a PedigreeStore as a numpy array without copying
+
+    Args:
+        store: PedigreeStore
+
+    Returns: PedigreeStore of numpy arrays that share memory with the columns
+    """
+    return PedigreeStore(*(np.asarray(memoryview(column)) for column in store))
+
+
+def _transition_tensor(mode, gender):
+    transitions = child_transitions(NUMPY, mode, gender)
+    return np.array([[[transitions[m_genotype, f_genotype].get(genotype, 0.0)
+                       for genotype in GENOTYPE_INDEX[mode, gender]]
+                      for f_genotype in GENOTYPE_INDEX[mode, MALE]]
+                     for m_genotype in GENOTYPE_INDEX[mode, FEMALE]])
+
+
+# (mother, father, child) probabilities for a child of a known gender, indexed by
+# GENOTYPE_INDEX. A punnet square is a contraction with one of these.
+TRANSITION_TENSORS = {(mode, gender): _transition_tensor(mode, gender)
+                      for mode in ALL_MODES for gender in (FEMALE, MALE)}
+
+# 1 for each genotype that can show an observed phenotype, indexed by GENOTYPE_INDEX
+PHENOTYPE_MASKS = {(mode, gender, observation): np.array([float(observation in phenotypes(genotype, mode))
+                                                           for genotype in GENOTYPE_INDEX[mode, gender]])
+                   for mode in ALL_MODES for gender, observations in ((FEMALE, 'fF'), (MALE, 'mM'))
+                   for observation in observations}
+
+
+def phenotype_mask(mode, observation):
+    """A vector of 1 where the genotype can produce the observation and 0 otherwise"""
+    if observation.phenotype is None:
+        return np.ones(len(GENOTYPE_INDEX[mode, observation.gender]))
+    return PHENOTYPE_MASKS[mode, observation.gender, observation.phenotype]
+
+
+def normalize_probabilities(vector):
+    total = vector.sum()
+    if total == 0:
+        return vector
+    return vector / total
+
+
+def punnet_square(mode, gender, mother_vector, father_vector):
+    """The genotype probabilities of a child of a known gender"""
+    return np.einsum('m,f,mfc->c', mother_vector, father_vector, TRANSITION_TENSORS[mode, gender])
+
+
+def constrain_probabilities(mode, observation, vector):
+    """Remove the genotypes that can't produce the observation and renormalize"""
+    return normalize_probabilities(vector * phenotype_mask(mode, observation))
+
+
+def punnet_occurrences(mode, observation, vector):
+    """The probability of the observation given a vector of genotype probabilities"""
+    return float(vector @ phenotype_mask(mode, observation))
+
+
+def _local_vectors(mode, graphs, individual):
+    """The founder prior multiplied by the phenotype evidence of an individual,
+    one row per graph"""
+    graph = graphs[0]
+    gender = graph.genders[individual]
+    states = GENOTYPE_INDEX[mode, gender]
+    if graph.phenotypes[individual] is None:
+        local = np.ones((len(graphs), len(states)))
+    else:
+        # Only the affection status of an observed individual can differ between
+        # graphs of the same structure
+        masks = np.stack([PHENOTYPE_MASKS[mode, gender, observation]
+                          for observation in {FEMALE: 'fF', MALE: 'mM'}[gender]])
+        local = masks[np.array([graph.phenotypes[individual].isupper() for graph in graphs], dtype=int)]
+    if graph.mothers[individual] is None:
+        local /= len(states)
+    return local
+
+
+def _family_messages(mode, graph, family, incoming, targets):
+    """Sum out a nuclear family for each of the target members, see peeling._family_messages.
+
+    Every member must have an incoming message, with a leading axis of one row
+    per graph. The incoming message of a target is not used.
+    """
+    tensors = [TRANSITION_TENSORS[mode, graph.genders[child]] for child in family.children]
+
+    # How well each parent combination explains each child
+    explained = np.stack([np.einsum('mfc,bc->bmf', tensor, incoming[child])
+                          for child, tensor in zip(family.children, tensors)])
+
+    # Leave one child out products, without division so zeros are safe
+    ones = np.ones((1,) + explained.shape[1:])
+    prefix = np.concatenate([ones, np.cumprod(explained, axis=0)])
+    suffix = np.concatenate([np.cumprod(explained[::-1], axis=0)[::-1], ones])
+
+    mother_message = incoming[family.mother]
+    father_message = incoming[family.father]
+
+    positions = {child: position for position, child in enumerate(family.children)}
+    messages = {}
+    for target in targets:
+        if target == family.mother:
+            messages[target] = np.einsum('bmf,bf->bm', prefix[-1], father_message)
+        elif target == family.father:
+            messages[target] = np.einsum('bmf,bm->bf', prefix[-1], mother_message)
+        else:
+            position = positions[target]
+            weight = mother_message[:, :, None] * father_message[:, None, :] * prefix[position] * suffix[position + 1]
+            messages[target] = np.einsum('bmf,mfc->bc', weight, tensors[position])
+    return messages
+
+
+def _normalize(messages):
+    """Normalize each row, rows of graphs the messages show to be impossible are left as 0
+
+    Returns: tuple of the normalized rows and the normalizing constant of each row
+    """
+    totals = messages.sum(axis=1)
+    return messages / np.where(totals == 0, 1, totals)[:, None], totals
+
+
+def peel_batch(mode, graphs):
+    """Calculate the genotype probabilities of every individual of many family graphs
+    that share a structure, with array operations. The same schedule as peeling.peel
+    where each message is stacked with one row per graph.
+
+    Args:
+        mode: The mode of inheritance
+        graphs: A list of FamilyGraphs with the same genders, mothers, fathers and
+            unobserved individuals
+
+    Returns: list of Peeled with natural logarithm likelihoods, None where the graph
+    is not valid for the mode
+    """
+    graph = graphs[0]
+    families = nuclear_families(graph)
+    if has_loop(graph, families):
+        # Summed out over the junction tree one graph at a time
+        return [peel_unit((mode, graph), NUMPY) for graph in graphs]
+    membership, order, roots = peeling_schedule(graph, families)
+    local = [_local_vectors(mode, graphs, individual) for individual in range(len(graph.genders))]
+    received = [{} for _ in graph.genders]
+
+    def to_family(individual, position):
+        result = local[individual]
+        for source, message in received[individual].items():
+            if source != position:
+                result = result * message
+        return result
+
+    def belief(individual):
+        result = local[individual]
+        for message in received[individual].values():
+            result = result * message
+        return result
+
+    log_totals = np.zeros(len(graphs))
+    valid = np.ones(len(graphs), dtype=bool)
+
+    def accumulate(totals):
+        valid[totals == 0] = False
+        log_totals[valid] += np.log(totals[valid])
+
+    for position, towards in order:
+        family = families[position]
+        incoming = {member: to_family(member, position) if member != towards else np.ones_like(local[member])
+                    for member in (family.mother, family.father) + family.children}
+        message, totals = _normalize(_family_messages(mode, graph, family, incoming, [towards])[towards])
+        accumulate(totals)
+        received[towards][position] = message
+    for root in roots:
+        accumulate(belief(root).sum(axis=1))
+
+    for position, towards in reversed(order):
+        family = families[position]
+        members = (family.mother, family.father) + family.children
+        incoming = {member: to_family(member, position) for member in members}
+        targets = [member for member in members if member != towards]
+        for target, message in _family_messages(mode, graph, family, incoming, targets).items():
+            received[target][position] = _normalize(message)[0]
+
+    beliefs = [_normalize(belief(individual))[0] for individual in range(len(graph.genders))]
+    return [Peeled([from_vector(mode, graph.genders[individual], beliefs[individual][row])
+                    for individual in range(len(graph.genders))], float(log_totals[row]))
+            if valid[row] else None
+            for row in range(len(graphs))]
+
+
+def peel(mode, graph):
+    """Calculate the genotype probabilities of every individual in a family graph
+    with array operations.
+
+    Args:
+        mode: The mode of inheritance
+        graph: FamilyGraph
+
+    Returns: Peeled of the genotype probabilities for each individual and the natural
+    logarithm of the likelihood of the observed phenotypes
+    """
+    peeled, = peel_batch(mode, [graph])
+    if peeled is None:
+        raise NonMendelianPattern(f'The observed phenotypes are not valid given a {mode} mode of inheritance.')
+    return peeled
+
+
+def _peel_batch_unit(unit):
+    mode, graphs = unit
+    return peel_batch(mode, graphs)
+
+
+def peel_all(units, workers=1):
+    """Peel many independent (mode, FamilyGraph) work units, stacking the units that
+    share a mode and structure so each group is peeled once.
+
+    Args:
+        units: A list of (mode, FamilyGraph)
+        workers: The number of processes to spread the groups over, None uses every CPU
+
+    Returns: list of Peeled, None where the unit is not valid for its mode
+    """
+    groups = {}
+    for position, (mode, graph) in enumerate(units):
+        unobserved = tuple(phenotype is None for phenotype in graph.phenotypes)
+        groups.setdefault((mode, graph.genders, graph.mothers, graph.fathers, unobserved), []).append(position)
+    batches = [(key[0], [units[position][1] for position in positions]) for key, positions in groups.items()]
+
+    result = [None] * len(units)
+    for positions, peeled in zip(groups.values(), map_units(_peel_batch_unit, batches, workers)):
+        for position, unit in zip(positions, peeled):
+            result[position] = unit
+    return result
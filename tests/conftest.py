@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from genetics.numeric import EXACT
+from genetics.pedigree import Pedigree
+
+ROOT = os.path.join(os.path.dirname(__file__), os.pardir)
+
+
+@pytest.fixture
+def pedigree_path():
+    """The path of an example pedigree, pedigree_path(n) -> pedigree_n.txt"""
+    return lambda n: os.path.join(ROOT, f'pedigree_{n}.txt')
+
+
+@pytest.fixture
+def load(pedigree_path):
+    """Read an example pedigree, load(n, backend=EXACT) -> Pedigree"""
+    return lambda n, backend=EXACT: Pedigree.from_file(pedigree_path(n), backend)
+
+
+@pytest.fixture
+def pedigree_text(pedigree_path):
+    """The drawing of an example pedigree, pedigree_text(n) -> str"""
+    def read(n):
+        with open(pedigree_path(n)) as f:
+            return f.read()
+    return read
@@ -1,4 +1,4 @@
-from core import *
+from genetics.core import *
 
 def test_aa_AUTOSOMAL_DOMINANT():
     assert not affected_genotype('aa', AUTOSOMAL_DOMINANT)
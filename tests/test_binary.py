@@ -0,0 +1,85 @@
+from array import array
+
+import pytest
+
+from genetics import binary
+from genetics.binary import Archive, read_stores, save_stores
+from genetics.core import ALL_MODES
+from genetics.exceptions import NonMendelianPattern, ParserException
+from genetics.pedigree import Pedigree
+from genetics.store import PedigreeStore
+
+
+def posteriors(pedigree, mode):
+    try:
+        return pedigree.posteriors(mode)
+    except NonMendelianPattern:
+        return None
+
+
+def links(pedigree):
+    position = {id(observation): observation.generation for observation in pedigree.observations}
+    return [tuple(position.get(id(relative)) for relative in (o.mother, o.father, o.partner))
+            + (tuple(position[id(child)] for child in o.children),) for o in pedigree.observations]
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+def test_save_load_round_trip(tmp_path, n, load):
+    p = load(n)
+    p.save(str(tmp_path / 'p.pedb'))
+    q = Pedigree.load(str(tmp_path / 'p.pedb'))
+    assert q.store == p.store
+    assert links(q) == links(p)
+    assert [str(o) for o in q.observations] == [str(o) for o in p.observations]
+    for mode in ALL_MODES:
+        assert posteriors(q, mode) == posteriors(p, mode)
+
+
+def test_archive_views(tmp_path, load):
+    pedigrees = [load(n) for n in (1, 2, 3)]
+    path = str(tmp_path / 'archive.pedb')
+    save_stores(path, (p.store for p in pedigrees))
+    archive = Archive(path)
+    assert len(archive) == 3
+    stores = list(archive.stores())
+    assert stores == [p.store for p in pedigrees]
+    assert all(isinstance(column, memoryview) for column in stores[1])
+    assert Pedigree.from_store(stores[1]).posteriors(ALL_MODES[1]) == pedigrees[1].posteriors(ALL_MODES[1])
+    del stores
+    archive.close()
+
+
+def test_read_stores_bytes(tmp_path, load):
+    path = str(tmp_path / 'archive.pedb')
+    save_stores(path, [load(5).store, load(1).store])
+    with open(path, 'rb') as f:
+        assert read_stores(f.read()) == [load(5).store, load(1).store]
+
+
+def test_load_not_an_archive(tmp_path, load):
+    path = tmp_path / 'p.pedb'
+    path.write_bytes(b'm-f\n|\nm f m f m f')
+    with pytest.raises(ParserException):
+        Pedigree.load(str(path))
+
+
+# The last 8 bytes of the archive, or half of the count of the first pedigree
+@pytest.mark.parametrize('cut', [slice(None, -8), slice(None, 20)])
+def test_truncated_archive(tmp_path, cut, load):
+    path = tmp_path / 'archive.pedb'
+    save_stores(str(path), [load(5).store, load(1).store])
+    truncated = path.read_bytes()[cut]
+    path.write_bytes(truncated)
+    with pytest.raises(ParserException):
+        read_stores(truncated)
+    with pytest.raises(ParserException):
+        Archive(str(path))
+    with pytest.raises(ParserException):
+        Pedigree.load(str(path))
+
+
+def test_big_endian_columns(monkeypatch, load):
+    # Swapped on the way in and out, so the round trip holds on any machine
+    monkeypatch.setattr(binary, '_LITTLE_ENDIAN', False)
+    store = read_stores(binary._HEADER.pack(binary.MAGIC, binary.VERSION, 1) + binary._encode(load(5).store))[0]
+    assert PedigreeStore(*(array(column.format, column) for column in store)) == load(5).store
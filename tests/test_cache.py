@@ -0,0 +1,85 @@
+import io
+
+import pytest
+
+from genetics.cache import ResultCache
+from genetics.core import ALL_MODES, AUTOSOMAL_DOMINANT, AUTOSOMAL_RECESSIVE, X_LINKED_RECESSIVE
+from genetics.exceptions import NonMendelianPattern
+from genetics.fingerprint import fingerprint
+from genetics.mode_analysis import marginal_likelihoods, mode_likelihoods
+from genetics.numeric import EXACT
+from genetics.ped import read_ped, write_ped
+from genetics.pedigree import Pedigree
+from genetics.peeling import peel_all
+
+
+def test_fingerprint_isomorphic():
+    first = Pedigree('f-m\n|\nM f-m\n  |\n  m')
+    second = Pedigree('m-f\n  |\n  M f-m\n    |\n    m')
+    third = Pedigree('f-m\n|\nM f-m\n  |\n  M')
+    assert fingerprint(X_LINKED_RECESSIVE, first.graph).digest == fingerprint(X_LINKED_RECESSIVE, second.graph).digest
+    assert fingerprint(X_LINKED_RECESSIVE, first.graph).digest != fingerprint(X_LINKED_RECESSIVE, third.graph).digest
+    assert fingerprint(X_LINKED_RECESSIVE, first.graph).digest != fingerprint(AUTOSOMAL_RECESSIVE, first.graph).digest
+
+
+def test_cache_isomorphic_hit(load):
+    p2 = load(2)
+    f = io.StringIO()
+    write_ped(f, [p2])
+    f.seek(0)
+    (renumbered,) = (family.pedigree for family in read_ped(f))
+    with ResultCache(':memory:') as cache:
+        assert p2.posteriors(X_LINKED_RECESSIVE, cache=cache) == p2.posteriors(X_LINKED_RECESSIVE)
+        expected = renumbered.posteriors(X_LINKED_RECESSIVE)
+        assert renumbered.posteriors(X_LINKED_RECESSIVE, cache=cache) == expected
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_cache_mode_likelihoods(tmp_path, load):
+    path = str(tmp_path / 'cache.sqlite')
+    p1 = load(1)
+    with ResultCache(path) as cache:
+        assert mode_likelihoods(p1, cache=cache) == mode_likelihoods(p1)
+        assert cache.stats.misses == len(ALL_MODES)
+    with ResultCache(path) as cache:
+        assert marginal_likelihoods(p1, cache=cache) == marginal_likelihoods(p1)
+        assert cache.stats.hits == len(ALL_MODES)
+        with pytest.raises(NonMendelianPattern):
+            p1.posteriors(AUTOSOMAL_DOMINANT, cache=cache)
+
+
+def test_cache_evicts_least_recently_used(load):
+    with ResultCache(':memory:', max_size=0) as cache:
+        load(1).posteriors(AUTOSOMAL_RECESSIVE, cache=cache)
+        assert cache.stats.entries == 0
+    with ResultCache(':memory:') as cache:
+        for n in (1, 2, 3):
+            load(n).posteriors(AUTOSOMAL_RECESSIVE, cache=cache)
+        load(1).posteriors(AUTOSOMAL_RECESSIVE, cache=cache)
+        cache.max_size = cache.stats.size - 1
+        load(5).posteriors(AUTOSOMAL_RECESSIVE, cache=cache)
+        hits = cache.stats.hits
+        load(1).posteriors(AUTOSOMAL_RECESSIVE, cache=cache)
+        assert cache.stats.hits == hits + 1
+        load(2).posteriors(AUTOSOMAL_RECESSIVE, cache=cache)
+        assert cache.stats.hits == hits + 1
+
+
+def test_cache_shared_between_connections(tmp_path, load):
+    path = str(tmp_path / 'cache.sqlite')
+    with ResultCache(path) as first, ResultCache(path) as second:
+        load(1).posteriors(AUTOSOMAL_RECESSIVE, cache=first)
+        load(2).posteriors(AUTOSOMAL_RECESSIVE, cache=second)
+        # A hit doesn't hold the write lock while the misses of the same call are peeled
+        units = [(AUTOSOMAL_RECESSIVE, load(n).graph) for n in (1, 3)]
+        fingerprints, result, missing = first.lookup(units, EXACT)
+        second.peel_all([(AUTOSOMAL_RECESSIVE, load(5).graph)])
+        first.store(fingerprints, result, missing, peel_all([units[1]]))
+        # Pedigree 2 is the least recently used for both connections
+        second.max_size = second.stats.size - 1
+        second.peel_all([(X_LINKED_RECESSIVE, load(1).graph)])
+        hits = first.stats.hits
+        load(2).posteriors(AUTOSOMAL_RECESSIVE, cache=first)
+        assert first.stats.hits == hits
+        load(1).posteriors(AUTOSOMAL_RECESSIVE, cache=first)
+        assert first.stats.hits == hits + 1
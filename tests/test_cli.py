@@ -0,0 +1,103 @@
+import io
+import json
+import math
+import sys
+from fractions import Fraction
+
+import pytest
+
+from genetics.cli import main
+from genetics.core import ALL_MODES, AUTOSOMAL_RECESSIVE, X_LINKED_RECESSIVE
+from genetics.mode_analysis import marginal_likelihoods
+from genetics.ped import write_ped
+
+
+def run(*argv):
+    output = io.StringIO()
+    status = main(['score', *argv], output=output)
+    return status, [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_score_files(load, pedigree_path):
+    status, rows = run(pedigree_path(1), pedigree_path(2))
+    assert status == 0
+    assert [row['individuals'] for row in rows] == [len(load(1).observations), len(load(2).observations)]
+    for row in rows:
+        assert row['seconds'] >= 0
+        assert sum(row['modes'].values()) == pytest.approx(1)
+        assert 'posteriors' not in row
+
+
+def test_score_glob(pedigree_path):
+    status, rows = run(pedigree_path('[12]'), '--workers', '2')
+    assert status == 0
+    assert sorted(row['source'] for row in rows) == [pedigree_path(n) for n in (1, 2)]
+
+
+def test_score_exact(load, pedigree_path):
+    status, rows = run(pedigree_path(2), '--backend', 'EXACT', '--posteriors',
+                       '--mode', X_LINKED_RECESSIVE, '--no-ranking')
+    row, = rows
+    p = load(2)
+    assert status == 0
+    assert 'modes' not in row
+    assert list(row['posteriors']) == [X_LINKED_RECESSIVE]
+    expected = p.posteriors(X_LINKED_RECESSIVE)
+    assert row['posteriors'][X_LINKED_RECESSIVE]['1,1'] == {genotype: str(probability) for genotype, probability
+                                                            in expected[1, 1].items()}
+
+
+def test_score_log(load, pedigree_path):
+    status, rows = run(pedigree_path(2))
+    likelihoods = marginal_likelihoods(load(2))
+    for mode in ALL_MODES:
+        if likelihoods[mode] == 0:
+            assert rows[0]['likelihoods'][mode] is None
+        else:
+            assert rows[0]['likelihoods'][mode] == pytest.approx(math.log(likelihoods[mode]))
+
+
+def test_score_stdin(monkeypatch):
+    monkeypatch.setattr(sys, 'stdin', io.StringIO('f-m\n|\nF\n\n|\nf\n'))
+    status, rows = run('--posteriors', '--mode', AUTOSOMAL_RECESSIVE)
+    good, bad = rows
+    assert status == 1
+    assert (good['first_line'], good['last_line']) == (1, 3)
+    assert good['posteriors'][AUTOSOMAL_RECESSIVE]['1,0'] == {'aa': 1.0}
+    assert bad['error'].startswith('InvalidChild')
+    assert 'seconds' in bad
+
+
+def test_score_ped_and_archive(tmp_path, load):
+    pedigrees = [load(1), load(3)]
+    write_ped(str(tmp_path / 'cohort.ped'), pedigrees)
+    pedigrees[1].save(str(tmp_path / 'cohort.pedb'))
+    status, rows = run(str(tmp_path / 'cohort.ped'), str(tmp_path / 'cohort.pedb'), '--backend', 'EXACT')
+    assert status == 0
+    assert [row.get('family') for row in rows] == ['1', '2', None]
+    assert rows[1]['likelihoods'] == rows[2]['likelihoods']
+    assert Fraction(rows[0]['likelihoods'][AUTOSOMAL_RECESSIVE]) == load(1).likelihood(AUTOSOMAL_RECESSIVE)
+
+
+def test_score_no_match(tmp_path):
+    assert main(['score', str(tmp_path / 'no_such_*.txt')], output=io.StringIO()) == 2
+
+
+def test_score_ped_errors(tmp_path):
+    ped = tmp_path / 'cohort.ped'
+    ped.write_text('1 dad 0 0 1 1\n1 mum 0 0 2 1\n1 son dad mum 1 2\n'
+                   '2 a b 0 2 1\n'
+                   '3 a 0 0 1\n'
+                   '4 a 0 0 2 2\n')
+    status, rows = run(str(ped))
+    assert status == 1
+    assert [row['family'] for row in rows] == ['1', '2', '3', '4']
+    assert [row['error'].split(':')[0] for row in rows if 'error' in row] == ['ParserException'] * 2
+    assert 'line 4' in rows[1]['error'] and 'line 5' in rows[2]['error']
+    assert 'modes' in rows[0] and 'modes' in rows[3]
+
+
+def test_score_bad_archive(tmp_path):
+    archive = tmp_path / 'cohort.pedb'
+    archive.write_bytes(b'not an archive')
+    assert main(['score', str(archive)], output=io.StringIO()) == 2
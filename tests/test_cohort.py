@@ -0,0 +1,24 @@
+from genetics.cohort import cohort_mode_likelihoods, cohort_posteriors
+from genetics.core import AUTOSOMAL_RECESSIVE, X_LINKED_DOMINANT
+from genetics.mode_analysis import mode_likelihoods
+from genetics.pedigree import Pedigree
+
+
+def test_cohort_posteriors(load):
+    pedigrees = [load(n) for n in (1, 2, 3, 5)]
+    assert cohort_posteriors(pedigrees, AUTOSOMAL_RECESSIVE) == \
+           [p.posteriors(AUTOSOMAL_RECESSIVE) for p in pedigrees]
+    assert cohort_posteriors(pedigrees, X_LINKED_DOMINANT) == [None, None, None, None]
+
+
+def test_cohort_mode_likelihoods(load):
+    pedigrees = [load(n) for n in (1, 2, 3, 5)] + [Pedigree('f-m   F-M\n|     |\nM     f')]
+    assert cohort_mode_likelihoods(pedigrees) == [mode_likelihoods(p) for p in pedigrees[:-1]] + [None]
+
+
+def test_parallel_matches_serial(load):
+    pedigrees = [load(n) for n in (1, 2, 3, 5)]
+    assert cohort_mode_likelihoods(pedigrees, workers=2) == cohort_mode_likelihoods(pedigrees)
+    assert cohort_posteriors(pedigrees, AUTOSOMAL_RECESSIVE, workers=2) == \
+           cohort_posteriors(pedigrees, AUTOSOMAL_RECESSIVE)
+    assert mode_likelihoods(pedigrees[0], workers=2) == mode_likelihoods(pedigrees[0])
@@ -0,0 +1,68 @@
+from fractions import Fraction
+
+from genetics.core import _affected_genotype, _phenotypes, AFFECTED_TABLES, affected_genotype, ALL_MODES
+from genetics.core import AUTOSOMAL_DOMINANT, AUTOSOMAL_RECESSIVE, collapse_phase, constrain_probabilities
+from genetics.core import GENOTYPE_CODES, GENOTYPES, observable_genotypes, PHENOTYPE_TABLES, phenotypes
+from genetics.core import punnet_occurrences
+from genetics.core import UNORDERED_CODES, X_LINKED_RECESSIVE
+from genetics.observation import Observation
+
+
+def test_tables_match_rules():
+    for mode in ALL_MODES:
+        for genotype in GENOTYPES:
+            code = GENOTYPE_CODES[genotype]
+            assert PHENOTYPE_TABLES[mode][code] == phenotypes(genotype, mode) == _phenotypes(genotype, mode)
+            assert AFFECTED_TABLES[mode][code] == affected_genotype(mode, genotype) == \
+                _affected_genotype(mode, genotype)
+            for observed in 'fFmM':
+                assert (genotype in observable_genotypes(mode, observed)) == (observed in _phenotypes(genotype, mode))
+
+
+def test_unknown_genotypes_follow_rules():
+    assert affected_genotype(AUTOSOMAL_DOMINANT, 'A') is True
+    assert phenotypes('aa', 'NOT_A_MODE') is None
+    assert affected_genotype('aa', AUTOSOMAL_DOMINANT) is False
+
+
+def test_constrain_probabilities():
+    probabilities = {'AA': Fraction(1, 4), 'Aa': Fraction(1, 4), 'aA': Fraction(1, 4), 'aa': Fraction(1, 4)}
+    assert constrain_probabilities(AUTOSOMAL_RECESSIVE, Observation('F'), probabilities) == {'aa': 1}
+    assert constrain_probabilities(AUTOSOMAL_RECESSIVE, Observation('m'), probabilities) == \
+        {'AA': Fraction(1, 3), 'Aa': Fraction(1, 3), 'aA': Fraction(1, 3)}
+    # Plain symbols are matched like Observations, an unobserved individual matches anything
+    assert constrain_probabilities(AUTOSOMAL_RECESSIVE, 'F', probabilities) == {'aa': 1}
+    assert constrain_probabilities(AUTOSOMAL_RECESSIVE, Observation('f', observed=False), probabilities) == \
+        {genotype: Fraction(1, 4) for genotype in probabilities}
+
+
+def test_punnet_occurrences():
+    assert punnet_occurrences(AUTOSOMAL_RECESSIVE, 'F', {'AA': 1}) == 0
+    assert punnet_occurrences(AUTOSOMAL_RECESSIVE, 'f', {'AA': Fraction(1, 2), 'aa': Fraction(1, 2)}) == \
+        punnet_occurrences(AUTOSOMAL_RECESSIVE, Observation('f'), {'AA': Fraction(1, 2), 'aa': Fraction(1, 2)}) == \
+        Fraction(1, 2)
+
+
+def test_unordered_codes():
+    unordered = {genotype: GENOTYPES[UNORDERED_CODES[code]] for genotype, code in GENOTYPE_CODES.items()}
+    assert unordered['aA'] == unordered['Aa'] == 'Aa'
+    assert unordered['xX'] == unordered['Xx'] == 'Xx'
+    # A male's X and Y alleles are different chromosomes
+    assert unordered['xY'] == 'xY' and unordered['Xy'] == 'Xy'
+    assert len(set(unordered.values())) == len(GENOTYPES) - 2
+
+
+def test_collapse_phase():
+    assert collapse_phase({'Aa': Fraction(1, 3), 'aA': Fraction(1, 3), 'AA': Fraction(1, 3)}) == \
+        {'Aa': Fraction(2, 3), 'AA': Fraction(1, 3)}
+
+
+def test_unordered_posteriors(load):
+    p = load(2)
+    for mode in (AUTOSOMAL_RECESSIVE, X_LINKED_RECESSIVE):
+        ordered = p.posteriors(mode)
+        unordered = p.posteriors(mode, unordered=True)
+        for generation, probabilities in unordered.items():
+            assert not {'aA', 'xX'} & set(probabilities)
+            assert probabilities == collapse_phase(ordered[generation])
+            assert sum(probabilities.values()) == 1
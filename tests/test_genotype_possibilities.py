@@ -1,6 +1,6 @@
 from fractions import Fraction
 import pytest
-from exceptions import InvalidState
+from genetics.exceptions import InvalidState
 from analysis import genotype_possibilities
 from constants import *
 
@@ -0,0 +1,68 @@
+import pytest
+
+from genetics.core import ALL_MODES, AUTOSOMAL_DOMINANT, AUTOSOMAL_RECESSIVE, collapse_phase, X_LINKED_RECESSIVE
+from genetics.exceptions import NonMendelianPattern
+from genetics.incremental import IncrementalPeeler
+from genetics.mode_analysis import marginal_likelihoods
+from genetics.numeric import LOG
+from genetics.pedigree import Pedigree
+from genetics.peeling import peel
+
+
+def fresh_posteriors(pedigree, mode):
+    try:
+        return Pedigree.from_store(pedigree.store).posteriors(mode)
+    except NonMendelianPattern:
+        return None
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+def test_setitem_updates_posteriors(n, load):
+    p = load(n)
+    for mode in ALL_MODES:
+        fresh_posteriors(p, mode) and p.posteriors(mode) and p.posteriors(mode, unordered=True)
+    for generation in p.generations[::3]:
+        p[generation] = str(p[generation]).swapcase()
+        for mode in ALL_MODES:
+            expected = fresh_posteriors(p, mode)
+            if expected is None:
+                with pytest.raises(NonMendelianPattern):
+                    p.posteriors(mode)
+            else:
+                assert p.posteriors(mode) == expected
+                assert p.posteriors(mode, unordered=True) == {generation: collapse_phase(genotypes)
+                                                              for generation, genotypes in expected.items()}
+
+
+def test_setitem_updates_mode_likelihoods(load):
+    p = load(1)
+    before = marginal_likelihoods(p)
+    assert before[AUTOSOMAL_DOMINANT] == 0
+    p[1, 1] = 'm'
+    after = marginal_likelihoods(p)
+    assert after == marginal_likelihoods(Pedigree.from_store(p.store))
+    assert after[AUTOSOMAL_DOMINANT] != 0
+    assert p.affected == ()
+
+
+def test_incremental_recomputes_path_only(load):
+    p = load(2)
+    graph = p.graph
+    peeler = IncrementalPeeler(X_LINKED_RECESSIVE, graph, LOG)
+    peeler.peeled()
+    computed = peeler._computed
+    individual = next(i for i, phenotype in enumerate(graph.phenotypes) if phenotype == 'm')
+    peeler.set_phenotype(individual, 'M')
+    peeler.likelihood
+    assert peeler._computed == computed
+    peeler.posterior(individual)
+    assert peeler._computed == computed
+    expected = peel(X_LINKED_RECESSIVE, graph._replace(phenotypes=tuple(
+        'M' if i == individual else phenotype for i, phenotype in enumerate(graph.phenotypes))), LOG)
+    assert peeler.likelihood == pytest.approx(expected.likelihood)
+
+
+def test_posterior_single(load):
+    p = load(2)
+    assert p.posterior(X_LINKED_RECESSIVE, (1, 1)) == p.posteriors(X_LINKED_RECESSIVE)[1, 1]
+    assert p.likelihood(AUTOSOMAL_RECESSIVE) == peel(AUTOSOMAL_RECESSIVE, p.graph).likelihood
@@ -0,0 +1,48 @@
+import pytest
+
+from genetics import core
+from genetics import genotype_analysis
+from genetics.core import X_LINKED_RECESSIVE
+from genetics.exceptions import InvalidState
+from genetics.genotype_analysis import genotypes_n_mode, SUBTREE_CACHE
+from genetics.instrumentation import profile
+
+
+def test_profile_counts_calls(load):
+    p = load(2)
+    SUBTREE_CACHE.clear()
+    expected = genotypes_n_mode(X_LINKED_RECESSIVE, p[2, 4])
+    SUBTREE_CACHE.clear()
+    with profile() as stats:
+        assert genotypes_n_mode(X_LINKED_RECESSIVE, p[2, 4]) == expected
+    functions = stats.functions()
+    assert set(functions) == {'punnet_square', 'parent_likelihood', '_back_propagate', '_fit_parent_probabilities'}
+    assert all(function.calls > 0 and function.seconds >= 0 for function in functions.values())
+    assert functions['parent_likelihood'].max_depth >= 2
+    assert functions['parent_likelihood'].max_denominator_bits > 0
+    assert stats.max_depth >= functions['parent_likelihood'].max_depth
+    assert max(stats.denominator_bits.values()) == max(function.max_denominator_bits
+                                                       for function in functions.values())
+    assert stats.subtree_cache_misses > 0
+    assert 'parent_likelihood' in stats.report()
+
+
+def test_profile_restores_functions():
+    originals = core.punnet_square, genotype_analysis.punnet_square, genotype_analysis.parent_likelihood
+    with pytest.raises(ZeroDivisionError):
+        with profile():
+            assert genotype_analysis.parent_likelihood is not originals[2]
+            raise ZeroDivisionError
+    assert (core.punnet_square, genotype_analysis.punnet_square, genotype_analysis.parent_likelihood) == originals
+    with profile() as stats:
+        pass
+    assert stats.functions() == {}
+
+
+def test_profile_is_not_reentrant(load):
+    with profile():
+        with pytest.raises(InvalidState):
+            with profile():
+                pass
+    with profile():
+        genotypes_n_mode(X_LINKED_RECESSIVE, load(2)[2, 4])
@@ -0,0 +1,97 @@
+import math
+from fractions import Fraction
+from itertools import product
+
+import pytest
+
+from genetics.cohort import cohort_posteriors
+from genetics.core import ALL_MODES, AUTOSOMAL_RECESSIVE, X_LINKED_RECESSIVE
+from genetics.exceptions import NonMendelianPattern
+from genetics.junction import JunctionTree, peel as junction_peel
+from genetics.numeric import EXACT, LOG, NUMPY
+from genetics.pedigree import Pedigree
+from genetics.peeling import CHILD_TRANSITIONS, has_loop, local_probabilities, peel
+
+
+# First cousins with an affected child
+COUSINS = '  f-m\n  |\nf-m f-m\n  | |\n  m-f\n  |\n  F'
+
+
+def brute_force(mode, graph):
+    """Sum over every assignment of genotypes"""
+    individuals = range(len(graph.genders))
+    local = [local_probabilities(EXACT, mode, graph, individual) for individual in individuals]
+    domains = [[genotype for genotype, value in probabilities.items() if value] for probabilities in local]
+    marginals = [dict.fromkeys(domain, 0) for domain in domains]
+    total = 0
+    for assignment in product(*domains):
+        weight = 1
+        for individual in individuals:
+            weight *= local[individual][assignment[individual]]
+            mother, father = graph.mothers[individual], graph.fathers[individual]
+            if mother is not None:
+                transitions = CHILD_TRANSITIONS[EXACT, mode, graph.genders[individual], False]
+                weight *= transitions[assignment[mother], assignment[father]].get(assignment[individual], 0)
+        total += weight
+        for individual in individuals:
+            marginals[individual][assignment[individual]] += weight
+    return total, [{genotype: Fraction(value) / total for genotype, value in marginal.items() if value}
+                   for marginal in marginals]
+
+
+def test_has_loop(load):
+    assert has_loop(Pedigree(COUSINS).graph)
+    assert has_loop(load(4).graph)
+    assert not any(has_loop(load(n).graph) for n in (1, 2, 3, 5))
+
+
+@pytest.mark.parametrize('mode, text', [(AUTOSOMAL_RECESSIVE, COUSINS),
+                                        (X_LINKED_RECESSIVE, COUSINS.replace('m-f\n', 'M-f\n'))])
+def test_loop_brute_force(mode, text):
+    graph = Pedigree(text).graph
+    likelihood, genotypes = brute_force(mode, graph)
+    peeled = peel(mode, graph)
+    assert peeled.likelihood == likelihood
+    assert peeled.genotypes == genotypes
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+def test_junction_matches_peel(n, load):
+    graph = load(n).graph
+    for mode in ALL_MODES:
+        try:
+            expected = peel(mode, graph)
+        except NonMendelianPattern:
+            with pytest.raises(NonMendelianPattern):
+                junction_peel(mode, graph)
+        else:
+            assert junction_peel(mode, graph) == expected
+
+
+def test_loop_backends(load):
+    graph = load(4).graph
+    exact = peel(AUTOSOMAL_RECESSIVE, graph)
+    for backend in (LOG, NUMPY):
+        approximate = peel(AUTOSOMAL_RECESSIVE, graph, backend)
+        assert approximate.likelihood == pytest.approx(math.log(exact.likelihood))
+        for expected, actual in zip(exact.genotypes, approximate.genotypes):
+            assert actual == pytest.approx({genotype: float(value) for genotype, value in expected.items()})
+    posteriors, = cohort_posteriors([load(4)], AUTOSOMAL_RECESSIVE, backend=NUMPY)
+    for generation, expected in load(4).posteriors(AUTOSOMAL_RECESSIVE).items():
+        assert posteriors[generation] == pytest.approx({genotype: float(value) for genotype, value in expected.items()})
+
+
+def test_loop_width(load):
+    tree = JunctionTree(load(4).graph)
+    assert tree.width <= 3
+    assert sorted(tree.order) == list(range(len(load(4).graph.genders)))
+
+
+def test_loop_setitem():
+    p = Pedigree(COUSINS)
+    before = p.posteriors(AUTOSOMAL_RECESSIVE)
+    p[3, 1] = 'f'
+    assert p.posteriors(AUTOSOMAL_RECESSIVE) == Pedigree(COUSINS.replace('F', 'f')).posteriors(AUTOSOMAL_RECESSIVE)
+    p[3, 1] = 'F'
+    assert p.posteriors(AUTOSOMAL_RECESSIVE) == before
+    assert p.likelihood(AUTOSOMAL_RECESSIVE) == brute_force(AUTOSOMAL_RECESSIVE, p.graph)[0]
@@ -0,0 +1,58 @@
+from fractions import Fraction
+
+import pytest
+
+from genetics.core import AUTOSOMAL_DOMINANT, AUTOSOMAL_RECESSIVE, X_LINKED_DOMINANT, X_LINKED_RECESSIVE, Y_LINKED
+from genetics.benchmark import DEFAULT_SYNTHETIC
+from genetics.exceptions import LikelihoodUnderflow, NonMendelianPattern
+from genetics.mode_analysis import marginal_likelihoods, mode_likelihoods, rank_modes
+from genetics.numeric import FLOAT, LOG
+from genetics.pedigree import Pedigree
+from genetics.synthetic import synthetic_pedigree
+
+
+def test_marginal_likelihoods(load):
+    assert marginal_likelihoods(load(1)) == {
+        AUTOSOMAL_DOMINANT: 0,
+        AUTOSOMAL_RECESSIVE: Fraction(107, 4096),
+        X_LINKED_DOMINANT: 0,
+        X_LINKED_RECESSIVE: Fraction(9, 256),
+        Y_LINKED: 0,
+    }
+
+
+def test_mode_likelihoods(load):
+    assert mode_likelihoods(load(1)) == {
+        AUTOSOMAL_DOMINANT: 0,
+        AUTOSOMAL_RECESSIVE: Fraction(107, 251),
+        X_LINKED_DOMINANT: 0,
+        X_LINKED_RECESSIVE: Fraction(144, 251),
+        Y_LINKED: 0,
+    }
+
+
+def test_mode_likelihoods_sum_to_one(load):
+    for n in (2, 3, 5):
+        assert sum(mode_likelihoods(load(n)).values()) == 1
+
+
+def test_mode_likelihoods_non_mendelian():
+    with pytest.raises(NonMendelianPattern):
+        mode_likelihoods(Pedigree('f-m   F-M\n|     |\nM     f'))
+
+
+def test_rank_modes_possible():
+    likelihoods = {AUTOSOMAL_DOMINANT: 0.0, AUTOSOMAL_RECESSIVE: 1e-300, X_LINKED_DOMINANT: 0.0}
+    # An underflowed mode that peeling reported as valid still ranks, at 0
+    assert rank_modes(likelihoods, FLOAT, {AUTOSOMAL_DOMINANT, AUTOSOMAL_RECESSIVE}) == {
+        AUTOSOMAL_DOMINANT: 0.0, AUTOSOMAL_RECESSIVE: 1.0, X_LINKED_DOMINANT: 0.0}
+    with pytest.raises(NonMendelianPattern):
+        rank_modes(likelihoods, FLOAT, set())
+
+
+def test_float_underflow():
+    p = synthetic_pedigree(18, *DEFAULT_SYNTHETIC)
+    assert set(marginal_likelihoods(p, backend=FLOAT).values()) == {0.0}
+    with pytest.raises(LikelihoodUnderflow, match='LOG'):
+        mode_likelihoods(p, backend=FLOAT)
+    assert mode_likelihoods(p, backend=LOG)[AUTOSOMAL_DOMINANT] == 1.0
@@ -0,0 +1,42 @@
+import math
+from fractions import Fraction
+
+from genetics.core import ALL_MODES, AUTOSOMAL_RECESSIVE, X_LINKED_RECESSIVE
+from genetics.mode_analysis import marginal_likelihoods, mode_likelihoods
+from genetics.numeric import EXACT, FLOAT, LOG, TOLERANCE
+
+
+def close(exact, approximate):
+    return exact.keys() == approximate.keys() and \
+           all(math.isclose(exact[key], approximate[key], rel_tol=TOLERANCE) for key in exact)
+
+
+def test_float_posteriors(load):
+    exact = load(2).posteriors(X_LINKED_RECESSIVE)
+    for backend in (FLOAT, LOG):
+        approximate = load(2, backend).posteriors(X_LINKED_RECESSIVE)
+        assert all(close(exact[index], approximate[index]) for index in exact)
+        assert all(isinstance(probability, float) for probability in approximate[0, 0].values())
+
+
+def test_float_mode_likelihoods(load):
+    for n in (1, 2, 5):
+        exact = mode_likelihoods(load(n))
+        assert close(exact, mode_likelihoods(load(n), backend=FLOAT))
+        assert close(exact, mode_likelihoods(load(n), backend=LOG))
+
+
+def test_log_likelihoods(load):
+    exact = marginal_likelihoods(load(1))
+    logs = marginal_likelihoods(load(1, LOG))
+    for mode in ALL_MODES:
+        if exact[mode]:
+            assert math.isclose(math.log(exact[mode]), logs[mode], rel_tol=TOLERANCE)
+        else:
+            assert logs[mode] == -math.inf
+
+
+def test_backend_per_call(load):
+    p = load(1, FLOAT)
+    assert p.posteriors(AUTOSOMAL_RECESSIVE)[0, 0]['Aa'] == 0.5
+    assert p.posteriors(AUTOSOMAL_RECESSIVE, EXACT)[0, 0]['Aa'] == Fraction(1, 2)
@@ -1,7 +1,7 @@
 import pytest
 
-from exceptions import InvalidObservation
-from observation import Observation
+from genetics.exceptions import InvalidObservation
+from genetics.observation import Observation
 
 
 def test_observation_raises_error_with_invalid_input():
@@ -36,3 +36,36 @@ def test_observation_adds_father_to_child_when_child_added_to_father():
     a.add_children(b)
     assert b in a.children
     assert b.father == a
+
+
+def test_observation_has_no_instance_dict():
+    assert not hasattr(Observation('f'), '__dict__')
+
+
+def test_observation_str():
+    assert str(Observation('F')) == 'F'
+    assert Observation('F').affected
+    assert not Observation('m').affected
+
+
+def test_observation_add_children_sets_both_parents():
+    mother = Observation('f')
+    father = Observation('M')
+    mother.partner = father
+    children = [Observation('f'), Observation('m')]
+    mother.add_children(children)
+    mother.add_children(Observation('M'))
+    assert len(mother.children) == 3
+    assert all(child.mother is mother and child.father is father for child in mother.children)
+    assert children[0].siblings == mother.children
+
+
+def test_observation_children_is_cached():
+    mother, father = Observation('f'), Observation('m')
+    child = Observation('F')
+    mother.add_children(child)
+    assert mother.children is mother.children
+    other = Observation('m')
+    other.set_parents(mother, father)
+    assert mother.children == (child, other)
+    assert father.children == (other,)
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import genetics
+from genetics.benchmark import run_benchmarks
+from genetics.genotype_analysis import genotypes_n_mode
+from genetics.mode_analysis import mode_likelihoods
+from genetics.pedigree import Pedigree
+
+ROOT = os.path.join(os.path.dirname(__file__), os.pardir)
+
+
+def run(code):
+    """The modules a fresh interpreter has imported after running code"""
+    result = subprocess.run([sys.executable, '-c', f'{code}\nimport sys\nprint(" ".join(sys.modules))'],
+                            cwd=ROOT, check=True, capture_output=True, text=True)
+    return set(result.stdout.split())
+
+
+def test_exports():
+    assert genetics.Pedigree is Pedigree
+    assert genetics.genotypes_n_mode is genotypes_n_mode
+    assert genetics.mode_likelihoods is mode_likelihoods
+    assert set(genetics.__all__) <= set(dir(genetics))
+    with pytest.raises(AttributeError):
+        genetics.peel
+
+
+def test_import_is_lazy():
+    modules = run('import genetics')
+    assert not {module for module in modules if module.startswith('genetics.')}
+
+
+def test_parse_is_light():
+    modules = run("from genetics.pedigree import Pedigree\nPedigree('f-m\\n|\\nF')")
+    assert not {'genetics.binary', 'genetics.genotype_analysis', 'genetics.incremental'} & modules
+
+
+def test_exact_path_is_light():
+    modules = run("import genetics\n"
+                  "genetics.mode_likelihoods(genetics.Pedigree('f-m\\n|\\nF'))")
+    assert 'numpy' not in modules
+    assert 'genetics.vectorized' not in modules
+    assert 'concurrent.futures.process' not in modules
+
+
+def test_numpy_when_selected():
+    pytest.importorskip('numpy')
+    modules = run("import genetics\n"
+                  "genetics.cohort_analysis([genetics.Pedigree('f-m\\n|\\nF')], backend=genetics.NUMPY)")
+    assert 'numpy' in modules
+
+
+def test_main_module():
+    result = subprocess.run([sys.executable, '-m', 'genetics', 'score', '--no-ranking', '--posteriors',
+                             '--mode', 'AUTOSOMAL_RECESSIVE'], input='f-m\n|\nF\n', cwd=ROOT,
+                            capture_output=True, text=True)
+    assert result.returncode == 0
+    assert '"aa": 1.0' in result.stdout
+
+
+def test_import_benchmark():
+    results = run_benchmarks(['import_exact'], quick=True, repeat=1)['results']
+    assert [result['value'] for result in results] == ['python', 'likelihood']
+    assert all(result['median'] > 0 for result in results)
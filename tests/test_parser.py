@@ -0,0 +1,30 @@
+import pytest
+
+from genetics.exceptions import InvalidChild, ParserException
+from genetics.parser import parse_text
+
+
+def test_parse_children_run_to_next_link():
+    parsed = parse_text('f-m     m-f\n'
+                        '|         |\n'
+                        'm f-m m f m f')
+    observations = parsed.indexed_observations
+    first, second = observations[0, 0], observations[0, 10]
+    assert [o.generation for o in first.children] == [(1, 0), (1, 1), (1, 3), (1, 4)]
+    assert [o.generation for o in second.children] == [(1, 5), (1, 6)]
+    assert observations[2, 4].mother is None and observations[2, 2].partner is observations[2, 4]
+
+
+def test_parse_shape_and_array():
+    parsed = parse_text('f-m\n|\nM')
+    assert parsed.shape == (3, 3)
+    assert parsed.array[1] == ['|', ' ', ' ']
+    assert parsed.array[2][0] is parsed.indexed_observations[2, 0]
+    assert parsed.affected_observations == [(2, 0)]
+
+
+def test_parse_invalid_links():
+    with pytest.raises(InvalidChild):
+        parse_text('f-m\n |')
+    with pytest.raises(ParserException):
+        parse_text('f- m')
@@ -0,0 +1,101 @@
+import io
+
+import pytest
+
+from genetics.core import ALL_MODES, AUTOSOMAL_RECESSIVE, FEMALE, MALE
+from genetics.exceptions import InvalidObservation, NonMendelianPattern, ParserException
+from genetics.ped import read_ped, write_ped
+from genetics.store import MISSING, to_store
+
+
+PED = '''# family individual father mother sex phenotype
+1 dad 0 0 1 1
+1 mum 0 0 2 1
+1 son dad mum 1 2
+1 stepmum 0 0 2 1
+1 half dad stepmum 2 1
+2 a 0 0 2 2 A A
+2 b 0 a 1 1 A a
+'''
+
+
+def by_individual(family, mode):
+    try:
+        posteriors = family.pedigree.posteriors(mode)
+    except NonMendelianPattern:
+        return None
+    return {individual: posteriors[generation]
+            for individual, generation in zip(family.individuals, family.pedigree.generations)}
+
+
+def test_read_ped():
+    first, second = read_ped(io.StringIO(PED))
+    assert (first.family, second.family) == ('1', '2')
+    assert first.individuals == ['dad', 'mum', 'stepmum', 'son', 'half']
+    observations = first.pedigree.observations
+    dad = observations[0]
+    assert [str(child) for child in dad.children] == ['M', 'f']
+    assert observations[4].mother is observations[2]
+    assert second.pedigree.graph.phenotypes == ('F', 'm', None)
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+def test_write_read_round_trip(n, load):
+    p = load(n)
+    f = io.StringIO()
+    write_ped(f, [p, p], families=['x', 'y'])
+    f.seek(0)
+    families = list(read_ped(f))
+    assert [family.family for family in families] == ['x', 'y']
+    generations = p.generations
+    for mode in ALL_MODES:
+        try:
+            expected = p.posteriors(mode)
+        except NonMendelianPattern:
+            expected = None
+        result = by_individual(families[0], mode)
+        assert result == (None if expected is None else
+                          {str(i + 1): expected[generation] for i, generation in enumerate(generations)})
+
+
+@pytest.mark.parametrize('text, error', [
+    ('1 a 0 0 0 1\n', InvalidObservation),
+    ('1 a 0 0 1 3\n', InvalidObservation),
+    ('1 a 0 0 0 1\n1 b 0 a 1 1\n1 c a 0 1 1\n', ParserException),
+    ('1 dad 0 0 2 1\n1 mum 0 0 2 1\n1 son dad mum 1 2\n', ParserException),
+    ('1 a 0 0 1\n', ParserException),
+    ('1 a b 0 2 1\n', ParserException),
+    ('1 a 0 0 1 1\n2 b 0 0 1 1\n1 c 0 0 1 1\n', ParserException),
+    ('1 a b 0 1 1\n1 b a 0 1 1\n', ParserException),
+])
+def test_read_ped_invalid(text, error):
+    with pytest.raises(error):
+        list(read_ped(io.StringIO(text)))
+
+
+def test_missing_phenotype():
+    text = '1 dad 0 0 1 0\n1 mum 0 0 2 -9\n1 son dad mum 1 2\n'
+    family, = read_ped(io.StringIO(text))
+    p = family.pedigree
+    assert p.graph.phenotypes == (None, None, 'M')
+    assert [observation.affected for observation in p.observations] == [None, None, True]
+    assert list(to_store(p.observations).affected) == [MISSING, MISSING, 1]
+    # Unobserved parents are free to be affected, unlike parents observed as unaffected
+    observed, = read_ped(io.StringIO('1 dad 0 0 1 1\n1 mum 0 0 2 1\n1 son dad mum 1 2\n'))
+    assert p.likelihood(AUTOSOMAL_RECESSIVE) > observed.pedigree.likelihood(AUTOSOMAL_RECESSIVE)
+    assert p.posteriors(AUTOSOMAL_RECESSIVE)[0, 0].keys() == {'Aa', 'aA', 'aa'}
+    f = io.StringIO()
+    write_ped(f, [p])
+    assert f.getvalue().split('\n')[:2] == ['1 1 0 0 1 0', '1 2 0 0 2 0']
+
+
+def test_unknown_sex_of_parent():
+    family, = read_ped(io.StringIO('1 dad 0 0 0 1\n1 mum 0 0 0 1\n1 son dad mum 1 2\n'))
+    assert [observation.gender for observation in family.pedigree.observations] == [MALE, FEMALE, MALE]
+    with pytest.raises(InvalidObservation, match='line 3'):
+        list(read_ped(io.StringIO('1 dad 0 0 1 1\n1 mum 0 0 2 1\n1 kid dad mum 0 2\n')))
+
+
+def test_parent_of_wrong_sex():
+    with pytest.raises(ParserException, match='line 3: the father dad is not male'):
+        list(read_ped(io.StringIO('1 dad 0 0 2 1\n1 mum 0 0 2 1\n1 son dad mum 1 2\n')))
@@ -0,0 +1,11 @@
+from fractions import Fraction
+
+from genetics.core import X_LINKED_RECESSIVE
+
+
+def test_posteriors(load):
+    p = load(2)
+    posteriors = p.posteriors(X_LINKED_RECESSIVE)
+    assert len(posteriors) == len(p._indexed_observations)
+    assert posteriors[1, 1] == {'XX': Fraction(8, 9), 'xX': Fraction(1, 9)}
+    assert posteriors[2, 4] == {'XX': Fraction(17, 18), 'xX': Fraction(1, 18)}
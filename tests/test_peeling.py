@@ -0,0 +1,85 @@
+from fractions import Fraction
+
+import pytest
+
+from genetics.core import ALL_MODES, AUTOSOMAL_DOMINANT, AUTOSOMAL_RECESSIVE, collapse_phase, FEMALE
+from genetics.exceptions import NonMendelianPattern
+from genetics.genotype_analysis import genotypes_n_mode
+from genetics.numeric import EXACT
+from genetics.observation import Observation
+from genetics.peeling import all_genotypes_n_mode, family_graph, FamilyGraph, local_probabilities, peel
+
+
+def test_peel_exact_posterior(load):
+    p = load(1)
+    assert all_genotypes_n_mode(AUTOSOMAL_RECESSIVE, [p[1, 2], p[2, 2]]) == [
+        {'AA': Fraction(48, 107), 'Aa': Fraction(59, 214), 'aA': Fraction(59, 214)},
+        {'AA': Fraction(57, 107), 'Aa': Fraction(25, 107), 'aA': Fraction(25, 107)},
+    ]
+
+
+def test_peel_likelihood(load):
+    p = load(1)
+    assert peel(AUTOSOMAL_RECESSIVE, family_graph([p[0, 0]])).likelihood == Fraction(107, 4096)
+
+
+def test_peel_unobserved_parent():
+    father, son, daughter = Observation('m'), Observation('m'), Observation('F')
+    father.add_children((son, daughter))
+    graph = family_graph([son])
+    assert graph.phenotypes == ('m', 'm', 'F', None)
+    assert graph.mothers == (3, None, 3, None)
+    assert graph.fathers == (1, None, 1, None)
+
+
+def test_peel_non_mendelian(load):
+    with pytest.raises(NonMendelianPattern):
+        all_genotypes_n_mode(AUTOSOMAL_DOMINANT, [load(1)[0, 0]])
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+def test_peel_agrees_with_genotypes_n_mode(n, load):
+    p = load(n)
+    observations = list(p._indexed_observations.values())
+    for mode in ALL_MODES:
+        try:
+            peeled = all_genotypes_n_mode(mode, observations)
+        except NonMendelianPattern:
+            peeled = None
+        for position, observation in enumerate(observations):
+            try:
+                expected = genotypes_n_mode(mode, observation)
+            except NonMendelianPattern:
+                assert peeled is None
+            else:
+                assert set(peeled[position]) == set(expected)
+
+
+def test_peel_loop(load):
+    p = load(4)
+    observations = list(p._indexed_observations.values())
+    posteriors = all_genotypes_n_mode(AUTOSOMAL_RECESSIVE, observations)
+    assert len(posteriors) == len(observations)
+    assert all(sum(posterior.values()) == 1 for posterior in posteriors)
+    assert peel(AUTOSOMAL_RECESSIVE, p.graph).likelihood == Fraction(570807, 35184372088832)
+
+
+def test_unordered_founder_prior():
+    graph = FamilyGraph((FEMALE,), (None,), (None,), (None,))
+    assert local_probabilities(EXACT, AUTOSOMAL_RECESSIVE, graph, 0, unordered=True) == \
+        {'AA': Fraction(1, 4), 'Aa': Fraction(1, 2), 'aa': Fraction(1, 4)}
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 4, 5])
+def test_peel_unordered(n, load):
+    graph = load(n).graph
+    for mode in ALL_MODES:
+        try:
+            expected = peel(mode, graph)
+        except NonMendelianPattern:
+            with pytest.raises(NonMendelianPattern):
+                peel(mode, graph, unordered=True)
+        else:
+            peeled = peel(mode, graph, unordered=True)
+            assert peeled.likelihood == expected.likelihood
+            assert peeled.genotypes == [collapse_phase(genotypes) for genotypes in expected.genotypes]
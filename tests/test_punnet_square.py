@@ -1,9 +1,33 @@
 from fractions import Fraction
 
-from analysis import punnet_square
+from genetics.core import _cross, ALL_MODES, FEMALE, GENOTYPE_INDEX, GENOTYPES, MALE, punnet_square, TRANSITION_TABLE
 
 
 def test_punnet_square():
     assert punnet_square(['xx', 'xX'], ['xy', 'xY']) == \
            {'xx': Fraction(3, 8), 'xy': Fraction(3, 16), 'xY': Fraction(3, 16), 'Xx': Fraction(1, 8),
             'Xy': Fraction(1, 16), 'XY': Fraction(1, 16)}
+
+
+def test_punnet_square_single_genotypes():
+    assert punnet_square('Xx', 'xY') == \
+           {'Xx': Fraction(1, 4), 'XY': Fraction(1, 4), 'xx': Fraction(1, 4), 'xY': Fraction(1, 4)}
+
+
+def test_transition_table_matches_crosses():
+    for (mother, father), children in TRANSITION_TABLE.items():
+        assert children == _cross(mother, father)
+
+
+def test_transition_table_covers_mode_genotypes():
+    assert len(TRANSITION_TABLE) == len(GENOTYPES) ** 2
+    for mode in ALL_MODES:
+        for mother in GENOTYPE_INDEX[mode, FEMALE]:
+            for father in GENOTYPE_INDEX[mode, MALE]:
+                assert punnet_square(mother, father) == TRANSITION_TABLE[mother, father]
+
+
+def test_transition_table_is_bounded():
+    size = len(TRANSITION_TABLE)
+    assert punnet_square('AAa', 'aa') == _cross('AAa', 'aa')
+    assert len(TRANSITION_TABLE) == size
@@ -0,0 +1,35 @@
+import io
+
+import pytest
+
+from genetics.reader import BlockParseError, read_blocks, read_pedigrees
+
+@pytest.fixture
+def text(pedigree_text):
+    return lambda *numbers: [pedigree_text(n) for n in numbers]
+
+
+def test_read_blocks_offsets(text):
+    blocks = list(read_blocks(io.StringIO('\n' + '\n\n\n'.join(text(1, 2)) + '\n')))
+    assert [(block.first_line, block.last_line) for block in blocks] == [(2, 6), (9, 13)]
+    assert [block.text for block in blocks] == text(1, 2)
+
+
+def test_read_blocks_delimiter(text):
+    blocks = list(read_blocks(io.StringIO('\n#\n'.join(text(1, 3)) + '\n#'), delimiter='#'))
+    assert [block.text for block in blocks] == text(1, 3)
+
+
+def test_read_pedigrees(tmp_path, text):
+    path = tmp_path / 'cohort.txt'
+    path.write_text('\n\n'.join(text(1, 2, 3)))
+    shapes = [block.pedigree.shape for block in read_pedigrees(str(path))]
+    assert shapes == [(5, 9), (5, 16), (7, 15)]
+
+
+def test_read_pedigrees_parse_error(text):
+    pedigrees = read_pedigrees(io.StringIO(text(1)[0] + '\n\nf-m\n-|\n'))
+    assert next(pedigrees).last_line == 5
+    with pytest.raises(BlockParseError) as error:
+        next(pedigrees)
+    assert (error.value.first_line, error.value.last_line) == (7, 8)
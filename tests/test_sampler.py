@@ -0,0 +1,65 @@
+import math
+
+import pytest
+
+from genetics.core import ALL_MODES, AUTOSOMAL_RECESSIVE, X_LINKED_RECESSIVE, Y_LINKED
+from genetics.exceptions import NonMendelianPattern
+from genetics.pedigree import Pedigree
+from genetics.sampler import FORWARD, GIBBS, sample
+
+
+def assert_converged(sampled, exact):
+    for generation, expected in exact.items():
+        estimates = sampled.genotypes[generation]
+        errors = sampled.standard_errors[generation]
+        for genotype in set(expected) | set(estimates):
+            difference = abs(float(expected.get(genotype, 0)) - estimates.get(genotype, 0))
+            assert difference <= 5 * errors.get(genotype, 0) + 0.01
+
+
+@pytest.mark.parametrize('method', [FORWARD, GIBBS])
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+def test_sample_converges(n, method, load):
+    p = load(n)
+    for mode in ALL_MODES:
+        try:
+            exact = p.posteriors(mode)
+        except NonMendelianPattern:
+            continue
+        assert_converged(p.sample(mode, method=method, chains=128, samples=200, burn_in=20, seed=n), exact)
+
+
+def test_forward_likelihood(load):
+    p = load(2)
+    sampled = p.sample(X_LINKED_RECESSIVE, method=FORWARD, samples=200, seed=1)
+    assert sampled.samples == 256 * 200
+    assert sampled.log_likelihood == pytest.approx(math.log(p.likelihood(X_LINKED_RECESSIVE)), abs=0.05)
+    assert p.sample(X_LINKED_RECESSIVE, seed=1, samples=10).log_likelihood is None
+
+
+def test_sample_is_seeded(load):
+    p = load(3)
+    first = p.sample(AUTOSOMAL_RECESSIVE, samples=20, seed=7)
+    second = p.sample(AUTOSOMAL_RECESSIVE, samples=20, seed=7)
+    assert first.genotypes == second.genotypes
+    assert first.standard_errors == second.standard_errors
+
+
+def test_sample_budget(load):
+    p = load(5)
+    sampled = p.sample(AUTOSOMAL_RECESSIVE, chains=16, samples=10 ** 6, burn_in=0, seconds=0.2, seed=1)
+    assert sampled.samples < 16 * 10 ** 6
+    assert sampled.seconds < 5
+
+
+@pytest.mark.parametrize('method', [FORWARD, GIBBS])
+def test_sample_not_valid(method):
+    with pytest.raises(NonMendelianPattern):
+        sample(Y_LINKED, Pedigree('f-m\n|\nm').graph, method=method, chains=8, samples=5)
+
+
+def test_sample_loop(load):
+    p = load(4)
+    sampled = p.sample(AUTOSOMAL_RECESSIVE, samples=50, seed=1)
+    for estimates in sampled.genotypes.values():
+        assert sum(estimates.values()) == pytest.approx(1)
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import math
+from fractions import Fraction
+
+import pytest
+
+from genetics.core import ALL_MODES, AUTOSOMAL_RECESSIVE, X_LINKED_RECESSIVE
+from genetics.mode_analysis import marginal_likelihoods
+from genetics.service import Metrics, ScoringService
+
+
+PED = [['1', 'dad', '0', '0', '1', '1'],
+       ['1', 'mum', '0', '0', '2', '1'],
+       ['1', 'son', 'dad', 'mum', '1', '2'],
+       ['2', 'a', '0', '0', '2', '2']]
+
+
+async def request(port, method, path, body=b'', content_type='application/json'):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: {content_type}\r\n'
+                 f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(content)
+
+
+def serve(test, **options):
+    """Run a coroutine test against a service on a free port"""
+    async def run():
+        service = ScoringService(workers=1, **options)
+        await service.start(port=0)
+        async with service:
+            return await test(service)
+    return asyncio.run(run())
+
+
+def score(port, payload):
+    return request(port, 'POST', '/score', json.dumps(payload).encode())
+
+
+def test_score_drawing(load, pedigree_text):
+    async def test(service):
+        return await score(service.port, {'pedigree': pedigree_text(2), 'posteriors': True,
+                                          'modes': [X_LINKED_RECESSIVE]})
+
+    status, response = serve(test)
+    row, = response['pedigrees']
+    p = load(2)
+    likelihoods = marginal_likelihoods(p)
+    assert status == 200
+    assert row['individuals'] == len(p.observations)
+    for mode in ALL_MODES:
+        expected = None if likelihoods[mode] == 0 else pytest.approx(math.log(likelihoods[mode]))
+        assert row['likelihoods'][mode] == expected
+    assert sum(row['modes'].values()) == pytest.approx(1)
+    assert list(row['posteriors']) == [X_LINKED_RECESSIVE]
+    expected = p.posteriors(X_LINKED_RECESSIVE)[1, 1]
+    assert row['posteriors'][X_LINKED_RECESSIVE]['1,1'] == pytest.approx({genotype: float(probability)
+                                                                          for genotype, probability in expected.items()})
+
+
+def test_score_text_body(load, pedigree_text):
+    async def test(service):
+        return await request(service.port, 'POST', '/score', pedigree_text(1).encode(), 'text/plain')
+
+    status, response = serve(test, backend='EXACT')
+    assert status == 200
+    likelihood = Fraction(response['pedigrees'][0]['likelihoods'][AUTOSOMAL_RECESSIVE])
+    assert likelihood == load(1).likelihood(AUTOSOMAL_RECESSIVE)
+
+
+@pytest.mark.parametrize('ped', [PED, '\n'.join(' '.join(record) for record in PED)])
+def test_score_ped(ped):
+    async def test(service):
+        return await score(service.port, {'ped': ped, 'posteriors': True, 'modes': [AUTOSOMAL_RECESSIVE],
+                                          'backend': 'EXACT'})
+
+    status, response = serve(test)
+    first, second = response['pedigrees']
+    assert status == 200
+    assert (first['family'], second['family']) == ('1', '2')
+    assert first['posteriors'][AUTOSOMAL_RECESSIVE]['son'] == {'aa': '1'}
+    assert set(second['posteriors'][AUTOSOMAL_RECESSIVE]) == {'a'}
+
+
+def test_batches_and_cache(pedigree_text):
+    async def test(service):
+        drawings = [pedigree_text(n) for n in (1, 2, 3)] * 4
+        responses = await asyncio.gather(*(score(service.port, {'pedigree': drawing}) for drawing in drawings))
+        _, metrics = await request(service.port, 'GET', '/metrics')
+        return responses, metrics
+
+    responses, metrics = serve(test, batch_delay=0.05)
+    assert all(status == 200 for status, _ in responses)
+    assert responses[0][1] == responses[3][1]
+    assert metrics['requests'] == 12
+    assert metrics['units'] == 12 * len(ALL_MODES)
+    assert metrics['batches'] < 12
+    # Each of the three pedigrees is only peeled once for each mode
+    assert metrics['cache']['entries'] == 3 * len(ALL_MODES)
+    latencies = metrics['latency_seconds']
+    assert 0 < latencies['p50'] <= latencies['p90'] <= latencies['p99'] <= latencies['max']
+
+
+@pytest.mark.parametrize('method, path, body, expected', [
+    ('POST', '/score', b'not json', 400),
+    ('POST', '/score', b'{"pedigree": "|\\nf"}', 400),
+    ('POST', '/score', b'{"pedigree": "f-m", "modes": ["NOT_A_MODE"]}', 400),
+    ('POST', '/score', b'{}', 400),
+    ('GET', '/score', b'', 405),
+    ('GET', '/nowhere', b'', 404),
+])
+def test_bad_requests(method, path, body, expected):
+    async def test(service):
+        status, response = await request(service.port, method, path, body)
+        _, metrics = await request(service.port, 'GET', '/metrics')
+        return status, response, metrics
+
+    status, response, metrics = serve(test)
+    assert status == expected
+    assert 'error' in response
+    assert metrics['errors'] == 1
+
+
+def test_percentiles():
+    metrics = Metrics(window=100)
+    assert metrics.percentiles() == {'p50': None, 'p90': None, 'p99': None}
+    for latency in range(1, 201):
+        metrics.record(latency, 200)
+    assert metrics.percentiles() == {'p50': 151, 'p90': 191, 'p99': 200}
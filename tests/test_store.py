@@ -0,0 +1,82 @@
+from array import array
+
+import pytest
+
+from genetics.core import ALL_MODES
+from genetics.exceptions import InvalidState, NonMendelianPattern
+from genetics.observation import Observation
+from genetics.pedigree import Pedigree
+from genetics.store import from_store, MISSING, PedigreeStore, store_graph, to_store
+
+
+def posteriors(pedigree, mode):
+    try:
+        return pedigree.posteriors(mode)
+    except NonMendelianPattern:
+        return None
+
+
+def test_store_columns(load):
+    store = load(1).store
+    assert store.sex == array('b', [1, 0, 1, 0, 1, 1, 1, 1])
+    assert store.affected == array('b', [0, 0, 1, 0, 0, 0, 0, 0])
+    assert store.mother == array('i', [MISSING, MISSING, 1, 1, MISSING, 3, 3, 3])
+    assert store.father == array('i', [MISSING, MISSING, 0, 0, MISSING, 4, 4, 4])
+    assert list(zip(store.row, store.column)) == [(0, 0), (0, 1), (1, 1), (1, 2), (1, 3), (2, 2), (2, 3), (2, 4)]
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+def test_store_round_trip(n, load):
+    p = load(n)
+    q = Pedigree.from_store(p.store)
+    assert q.store == p.store
+    assert q.affected == p.affected
+    for generation in p.generations:
+        assert str(q[generation]) == str(p[generation])
+    for mode in ALL_MODES:
+        assert posteriors(q, mode) == posteriors(p, mode)
+
+
+def test_store_observations(load):
+    observations = from_store(load(2).store)
+    assert to_store(observations) == load(2).store
+    child = observations[-1]
+    assert child.mother.partner is child.father
+    assert child in child.mother.children and child in child.father.children
+
+
+def test_store_graph_half_siblings():
+    # A father with a child by each of two mothers and a child with an unknown mother
+    store = PedigreeStore(sex=array('b', [1, 0, 0, 1, 1, 0]), affected=array('b', [0, 0, 0, 1, 0, 0]),
+                          mother=array('i', [-1, -1, -1, 1, 2, -1]), father=array('i', [-1, -1, -1, 0, 0, 0]),
+                          partner=array('i', [-1] * 6),
+                          row=array('i', [0, 0, 0, 1, 1, 1]), column=array('i', [1, 0, 2, 0, 1, 2]))
+    graph = store_graph(store)
+    assert graph.mothers == (None, None, None, 1, 2, 6, None)
+    assert graph.fathers == (None, None, None, 0, 0, 0, None)
+    observations = from_store(store)
+    assert [child.mother for child in observations[0].children] == [observations[1], observations[2], None]
+
+
+def test_store_setitem_invalidates(load):
+    p = load(1)
+    store = p.store
+    p[2, 2] = 'M'
+    assert p.store is not store
+    assert list(p.store.affected) == [0, 0, 1, 0, 0, 1, 0, 0]
+    assert p.store._replace(affected=store.affected) == store
+    assert p.graph.phenotypes[5] == 'M'
+
+
+@pytest.mark.parametrize('key, value', [((2, 2), 'f'), ((2, 2), ' '), ((1, 0), 'F'), ((0, 0), 'x')])
+def test_store_setitem_structure(load, key, value):
+    p = load(1)
+    store = p.store
+    with pytest.raises(InvalidState):
+        p[key] = value
+    assert p.store is store
+
+
+def test_from_store_needs_generations():
+    with pytest.raises(InvalidState):
+        Pedigree.from_store(to_store([Observation('f')]))
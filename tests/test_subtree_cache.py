@@ -0,0 +1,34 @@
+from genetics.core import X_LINKED_RECESSIVE
+from genetics.genotype_analysis import genotypes_n_mode, SUBTREE_CACHE, SubtreeCache
+
+
+def test_subtree_cache_hits(load):
+    SUBTREE_CACHE.clear()
+    p = load(2)
+    first = genotypes_n_mode(X_LINKED_RECESSIVE, p[1, 1])
+    info = SUBTREE_CACHE.info()
+    assert info.misses == info.currsize > 0
+    assert genotypes_n_mode(X_LINKED_RECESSIVE, p[1, 1]) == first
+    assert SUBTREE_CACHE.info().misses == info.misses
+    assert SUBTREE_CACHE.info().hits > info.hits
+
+
+def test_subtree_cache_bounded():
+    cache = SubtreeCache(maxsize=2)
+    for key in 'abc':
+        cache.put(key, 1)
+    assert cache.get('a') is None and cache.get('c') == 1
+    assert cache.info() == (1, 1, 2, 2)
+
+
+def test_subtree_cache_setitem_invalidates(load):
+    SUBTREE_CACHE.clear()
+    p = load(2)
+    genotypes_n_mode(X_LINKED_RECESSIVE, p[2, 4])
+    genotypes_n_mode(X_LINKED_RECESSIVE, p[2, 1])
+    size = SUBTREE_CACHE.info().currsize
+    affected = p[2, 4]
+    p[2, 4] = 'F'
+    remaining = SUBTREE_CACHE.info().currsize
+    assert 0 < remaining < size
+    assert not any(affected in key[1] for key in SUBTREE_CACHE._entries)
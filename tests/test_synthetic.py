@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from genetics.benchmark import compare, DEFAULT_SYNTHETIC, run_benchmarks
+from genetics.core import ALL_MODES, AUTOSOMAL_DOMINANT, AUTOSOMAL_RECESSIVE
+from genetics.pedigree import Pedigree
+from genetics.synthetic import synthetic_pedigree, synthetic_text
+
+
+def test_synthetic_text_is_seeded():
+    assert synthetic_text(5, seed=3) == synthetic_text(5, seed=3)
+    assert synthetic_text(5, seed=3) != synthetic_text(5, seed=4)
+
+
+def test_synthetic_sibships():
+    p = synthetic_pedigree(3, sibship_size=4, marry_in_rate=1, affected_rate=0, seed=1)
+    founder = p.observations[0]
+    assert founder.partner is not None
+    assert len(founder.children) == 4
+    assert all(len(child.children) == 4 for child in founder.children)
+    # 2 founders, 4 children with their partners and 16 grandchildren
+    assert len(p.store.sex) == 2 + 8 + 16
+    assert not p.affected
+
+
+def test_synthetic_without_partners():
+    p = synthetic_pedigree(4, sibship_size=3, marry_in_rate=0, seed=1)
+    assert len(p.store.sex) == 5
+
+
+@pytest.mark.parametrize('mode', ALL_MODES)
+def test_synthetic_mode_is_valid(mode):
+    for seed in range(10):
+        p = synthetic_pedigree(5, affected_rate=0.3, mode=mode, seed=seed)
+        assert p.likelihood(mode) > 0
+
+
+def test_synthetic_round_trip():
+    text = synthetic_text(6, seed=2, mode=AUTOSOMAL_DOMINANT)
+    assert Pedigree(text).store == synthetic_pedigree(6, seed=2, mode=AUTOSOMAL_DOMINANT).store
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(['parse_text', 'peel_float'], quick=True, repeat=1)
+    json.dumps(results)
+    assert [(result['benchmark'], result['value']) for result in results['results']] == \
+           [('parse_text', 3), ('parse_text', 4), ('peel_float', 3), ('peel_float', 4)]
+    assert all(result['individuals'] > 0 for result in results['results'])
+
+    slower = json.loads(json.dumps(results))
+    slower['results'][0]['median'] *= 2
+    assert compare(results, slower) == [('parse_text', 3, results['results'][0]['median'],
+                                         slower['results'][0]['median'])]
+    assert compare(results, results) == []
+
+
+def test_posteriors_json_benchmark():
+    synthetic = DEFAULT_SYNTHETIC._replace(mode=AUTOSOMAL_RECESSIVE)
+    ordered, unordered = run_benchmarks(['posteriors_json'], quick=True, repeat=1, synthetic=synthetic)['results']
+    assert (ordered['value'], unordered['value']) == (False, True)
+    assert unordered['size'] < ordered['size']
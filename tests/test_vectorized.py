@@ -0,0 +1,77 @@
+import math
+from fractions import Fraction
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from genetics.core import AUTOSOMAL_RECESSIVE, FEMALE, MALE, X_LINKED_RECESSIVE
+from genetics.core import constrain_probabilities as dict_constrain_probabilities
+from genetics.numeric import NUMPY, TOLERANCE
+from genetics.observation import Observation
+from genetics.pedigree import Pedigree
+from genetics.vectorized import constrain_probabilities, from_vector, punnet_occurrences, punnet_square, store_arrays, to_vector
+
+
+def test_vector_round_trip():
+    probabilities = {'XX': Fraction(8, 9), 'xX': Fraction(1, 9)}
+    vector = to_vector(X_LINKED_RECESSIVE, FEMALE, probabilities)
+    assert vector.shape == (4,)
+    assert from_vector(X_LINKED_RECESSIVE, FEMALE, vector) == {'XX': 8 / 9, 'xX': 1 / 9}
+
+
+def test_punnet_square():
+    mother = to_vector(X_LINKED_RECESSIVE, FEMALE, {'Xx': 1})
+    father = to_vector(X_LINKED_RECESSIVE, MALE, {'xY': 1})
+    assert from_vector(X_LINKED_RECESSIVE, MALE, punnet_square(X_LINKED_RECESSIVE, MALE, mother, father)) == \
+           {'XY': 0.5, 'xY': 0.5}
+
+
+def test_constrain_probabilities():
+    probabilities = {'AA': Fraction(1, 4), 'Aa': Fraction(1, 4), 'aA': Fraction(1, 4), 'aa': Fraction(1, 4)}
+    observation = Observation('f')
+    vector = constrain_probabilities(AUTOSOMAL_RECESSIVE, observation,
+                                     to_vector(AUTOSOMAL_RECESSIVE, FEMALE, probabilities))
+    expected = dict_constrain_probabilities(AUTOSOMAL_RECESSIVE, observation, probabilities)
+    assert from_vector(AUTOSOMAL_RECESSIVE, FEMALE, vector) == pytest.approx({k: float(v) for k, v in expected.items()})
+    assert punnet_occurrences(AUTOSOMAL_RECESSIVE, observation,
+                              to_vector(AUTOSOMAL_RECESSIVE, FEMALE, probabilities)) == 0.75
+
+
+def test_numpy_posteriors(load):
+    exact = load(2).posteriors(X_LINKED_RECESSIVE)
+    vectorized = load(2, NUMPY).posteriors(X_LINKED_RECESSIVE)
+    for index, probabilities in exact.items():
+        assert probabilities.keys() == vectorized[index].keys()
+        assert all(math.isclose(probabilities[genotype], vectorized[index][genotype], rel_tol=TOLERANCE)
+                   for genotype in probabilities)
+
+
+def test_peel_batch_mixed_validity():
+    from genetics.core import AUTOSOMAL_DOMINANT
+    from genetics.peeling import family_graph
+    from genetics.vectorized import peel_batch
+    graphs = [family_graph(Pedigree(text).observations) for text in ('f-m\n|\nM f', 'F-m\n|\nM f', 'f-m\n|\nm F')]
+    unaffected, affected, daughter = peel_batch(AUTOSOMAL_DOMINANT, graphs)
+    assert unaffected is None and daughter is None
+    assert affected.genotypes[2] == {'Aa': 1.0}
+
+
+def test_cohort_analysis(load):
+    from genetics.cohort import cohort_analysis
+    from genetics.mode_analysis import mode_likelihoods
+    pedigrees = [load(n) for n in (1, 2, 1, 5)]
+    for pedigree, result in zip(pedigrees, cohort_analysis(pedigrees)):
+        expected = mode_likelihoods(pedigree)
+        assert all(math.isclose(expected[mode], result.mode_likelihoods[mode], rel_tol=TOLERANCE, abs_tol=TOLERANCE)
+                   for mode in expected)
+        assert result.posteriors[X_LINKED_RECESSIVE] is None or \
+               result.posteriors[X_LINKED_RECESSIVE].keys() == pedigree.posteriors(X_LINKED_RECESSIVE).keys()
+
+
+def test_store_arrays_share_memory(load):
+    store = load(1).store
+    arrays = store_arrays(store)
+    assert arrays.mother.tolist() == list(store.mother)
+    arrays.affected[0] = 1
+    assert store.affected[0] == 1